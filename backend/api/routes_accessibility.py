@@ -1,72 +1,368 @@
+# backend/api/routes_accessibility.py
+# Accessibility points: submission (single and bulk import), nearby listing, map tiles and
+# viewports, and single point details.
+
 import os
-import requests
+import csv
+import hashlib
+import io
+import json
+import threading
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, current_app, jsonify, request
+from pymongo.errors import BulkWriteError
+from services.database_service import get_db
+from services.local_router import local_router
+from services.overlay_service import invalidate_overlays_near, overlay_versions
+from services.route_ranking import ALLOWED_SEVERITIES
+from services.spatial_index import accessibility_index
+from services.tile_service import (
+    get_tile, tiles_covering, is_valid_tile, record_points, tile_cache, TILE_CACHE_TTL_SECONDS, TILE_VIEWPORT_MAX_TILES,
+)
+from utils.auth import get_current_user_id
+from utils.http_cache import conditional_json, etag_for
+
+accessibility_bp = Blueprint('accessibility_api', __name__, url_prefix='/api')
+
+# --- HTTP Caching ---
+# Public point data may be reused briefly by browsers, like map tiles
+POINTS_CACHE_MAX_AGE_SECONDS = int(os.getenv("POINTS_CACHE_MAX_AGE_SECONDS", "60"))
+POINTS_CACHE_CONTROL = f"public, max-age={POINTS_CACHE_MAX_AGE_SECONDS}"
+
+ALLOWED_POINT_TYPES = ['ramp', 'elevator', 'hazard', 'accessible_restroom', 'missing_curb_cut', 'step_free_entrance']
+
+# Bulk import: rows are validated one by one and written in unordered batches, so memory stays
+# flat regardless of upload size; only the first BULK_IMPORT_MAX_ERRORS row errors are reported
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+BULK_IMPORT_CSV_FIELDS = ['lat', 'lng', 'type', 'description', 'severity', 'imageUrl', 'source']
+
+
+def build_accessibility_point(data, user_id, default_source='user_submitted'):
+    """
+    Validates a submitted accessibility point and builds its document.
+    Returns (point_doc, None) or (None, error message).
+    """
+    lat = data.get('lat')
+    lng = data.get('lng')
+    point_type = data.get('type')
+    description = data.get('description', '')
+    severity = data.get('severity') # Optional; weighs hazards when ranking alternative routes
+
+    if lat is None or lng is None or not point_type:
+        return None, "Missing required fields: lat, lng, type"
+
+    try:
+        lat = float(lat); lng = float(lng)
+    except (ValueError, TypeError):
+        return None, "Invalid coordinates: lat and lng must be numbers"
+
+    if point_type not in ALLOWED_POINT_TYPES:
+        return None, f"Invalid type. Allowed: {', '.join(ALLOWED_POINT_TYPES)}"
+    if severity is not None and severity not in ALLOWED_SEVERITIES:
+        return None, f"Invalid severity. Allowed: {', '.join(ALLOWED_SEVERITIES)}"
+
+    now = datetime.utcnow()
+    return {
+        "location": {"type": "Point", "coordinates": [lng, lat]},
+        "type": point_type,
+        "description": description,
+        "severity": severity,
+        "imageUrl": data.get('imageUrl'),
+        "source": data.get('source', default_source),
+        "status": 'unverified', # New submissions start as unverified
+        "submittedBy": user_id,
+        "createdAt": now,
+        "updatedAt": now
+    }, None
+
 
-GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
-DIRECTIONS_API_URL = "https://maps.googleapis.com/maps/api/directions/json"
-GEOCODING_API_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+@accessibility_bp.route('/accessibility-points', methods=['POST'])
+def add_accessibility_point():
+    """Adds a new accessibility point (requires auth)."""
+    user_id = get_current_user_id()
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    # TODO: Add role check if needed
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
 
-def fetch_google_directions(params):
+    data = request.get_json()
+    if not data: return jsonify({"error": "Request body required"}), 400
+
+    point_doc, error = build_accessibility_point(data, user_id)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        result = db.accessibility_points.insert_one(point_doc)
+        accessibility_index.add_point(point_doc) # insert_one sets point_doc['_id']
+        local_router.add_point(point_doc) # Re-weights local routing edges around the point
+        lng, lat = point_doc['location']['coordinates']
+        invalidate_overlays_near(lat, lng) # Cached route overlays around this point get recomputed
+        record_points([point_doc]) # Map tile cluster counts
+        tile_cache.clear() # This worker's map tiles; other workers' expire within TILE_CACHE_TTL_SECONDS
+        # Return the created point ID and message
+        return jsonify({"message": "Accessibility point added successfully", "pointId": str(result.inserted_id)}), 201
+    except Exception as e:
+        current_app.logger.error(f"Error adding accessibility point submitted by {user_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to add accessibility point"}), 500
+
+
+@accessibility_bp.route('/accessibility-points/bulk', methods=['POST'])
+def bulk_import_accessibility_points():
     """
-    Fetches directions from the Google Directions API.
-    Args:
-        params (dict): Dictionary of parameters for the API call
-                       (origin, destination, key, mode, avoid, transit_mode etc.).
-    Returns:
-        dict: The JSON response from Google.
-    Raises:
-        requests.exceptions.RequestException: If the request fails.
-        ValueError: If the API returns a non-OK status.
+    Imports accessibility points from a streamed upload (requires auth): NDJSON (one point object
+    per line, Content-Type application/x-ndjson) or CSV with a header row (text/csv; columns
+    lat, lng, type and optionally description, severity, imageUrl, source).
+    Rows failing validation or insertion are reported by row number; the import carries on.
     """
-    if not GOOGLE_MAPS_API_KEY:
-        raise ValueError("Missing Google Maps API Key environment variable.")
+    user_id = get_current_user_id()
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
+    content_type = request.mimetype
+    if content_type not in ('application/x-ndjson', 'application/jsonl', 'text/csv'):
+        return jsonify({"error": "Content-Type must be application/x-ndjson or text/csv"}), 415
+
+    # Read the body incrementally instead of buffering it (request.get_data would load it all)
+    text_stream = io.TextIOWrapper(request.stream, encoding='utf-8', errors='replace', newline='')
+    rows = iter_csv_rows(text_stream) if content_type == 'text/csv' else iter_ndjson_rows(text_stream)
+
+    inserted, failed, errors = 0, 0, []
+    touched_cells = {} # Overlay version cell -> a point in it, so each cell is bumped once
+    batch, batch_rows = [], []
+
+    def record_error(row_number, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_IMPORT_MAX_ERRORS:
+            errors.append({"row": row_number, "error": message})
+
+    def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        try:
+            inserted += len(db.accessibility_points.insert_many(batch, ordered=False).inserted_ids)
+            failed_indexes = set()
+        except BulkWriteError as e:
+            inserted += e.details.get('nInserted', 0)
+            failed_indexes = set()
+            for write_error in e.details.get('writeErrors', []):
+                failed_indexes.add(write_error['index'])
+                record_error(batch_rows[write_error['index']], write_error.get('errmsg', 'Insert failed'))
+        except Exception as e:
+            current_app.logger.error(f"Error inserting bulk accessibility point batch: {e}", exc_info=True)
+            failed_indexes = set(range(len(batch)))
+            for row_number in batch_rows:
+                record_error(row_number, "Failed to insert row")
+        stored = [point_doc for index, point_doc in enumerate(batch) if index not in failed_indexes]
+        for point_doc in stored:
+            lng, lat = point_doc['location']['coordinates']
+            touched_cells.setdefault(overlay_versions.cell_of(lat, lng), (lat, lng))
+        record_points(stored) # Map tile cluster counts, one bulk write per batch
+        batch.clear()
+        batch_rows.clear()
+
+    for row_number, data, parse_error in rows:
+        if parse_error:
+            record_error(row_number, parse_error)
+            continue
+        point_doc, error = build_accessibility_point(data, user_id, default_source='bulk_import')
+        if error:
+            record_error(row_number, error)
+            continue
+        batch.append(point_doc)
+        batch_rows.append(row_number)
+        if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+
+    if inserted:
+        for lat, lng in touched_cells.values():
+            invalidate_overlays_near(lat, lng)
+        tile_cache.clear()
+        refresh_point_indexes()
+
+    print(f"Bulk import by {user_id}: {inserted} inserted, {failed} failed.")
+    return jsonify({
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errorsTruncated": failed > len(errors),
+    }), 200
+
 
-    # Ensure the key is in the params sent to Google
-    params['key'] = GOOGLE_MAPS_API_KEY
+def iter_ndjson_rows(text_stream):
+    """Yields (row number, point dict or None, parse error or None) per non-blank NDJSON line."""
+    for row_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row_number, None, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, data, None
+
+
+def iter_csv_rows(text_stream):
+    """Yields (row number, point dict, None) per CSV data row; empty cells count as missing."""
+    reader = csv.DictReader(text_stream)
+    for row_number, row in enumerate(reader, start=2): # Row 1 is the header
+        yield row_number, {key: value for key, value in row.items() if key in BULK_IMPORT_CSV_FIELDS and value not in (None, '')}, None
+
+
+def refresh_point_indexes():
+    """Reloads the in-memory point indexes in the background after a bulk import (cheaper than per-point adds)."""
+    def reload():
+        db = get_db()
+        try:
+            if accessibility_index.is_ready():
+                accessibility_index.load(db.accessibility_points)
+            if local_router.is_ready():
+                local_router.load_accessibility_points(db.accessibility_points)
+        except Exception as e:
+            print(f"Error refreshing point indexes after bulk import: {e}")
+    threading.Thread(target=reload, name="bulk-import-refresh", daemon=True).start()
+
+@accessibility_bp.route('/accessibility-points', methods=['GET'])
+def get_accessibility_points():
+    """Retrieves accessibility points near a given location (public)."""
+    # Note: Decided to make this public for easier map display without login
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
+    try:
+        lat = float(request.args.get('lat'))
+        lng = float(request.args.get('lng'))
+        radius = int(request.args.get('radius', '500')) # Default radius 500m
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"error": "Missing or invalid required query parameters: lat (number), lng (number)"}), 400
+
+    point_type_filter = request.args.get('type')
+
+    try:
+        query = {
+            "location": {
+                "$nearSphere": {
+                    "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+                    "$maxDistance": radius
+                }
+            },
+            # Only show verified points on the public map?
+            # "status": "verified"
+        }
+        if point_type_filter:
+            query["type"] = point_type_filter
+
+        # Project fields needed for map display (updatedAt only for the ETag)
+        projection = {"_id": 1, "type": 1, "description": 1, "location.coordinates": 1, "updatedAt": 1}
+        points = list(db.accessibility_points.find(query, projection).limit(200)) # Limit results
+
+        # Same points (in the same distance order) at the same versions give the same body
+        etag = etag_for(*((point['_id'], point.get('updatedAt')) for point in points))
+
+        def format_points():
+            # Format for easier frontend consumption
+            formatted_points = []
+            for point in points:
+                formatted_points.append({
+                    "id": str(point['_id']),
+                    "type": point.get("type"),
+                    "description": point.get("description"),
+                    "lat": point.get("location", {}).get("coordinates", [None, None])[1],
+                    "lng": point.get("location", {}).get("coordinates", [None, None])[0],
+                })
+            return formatted_points
+
+        return conditional_json(etag, POINTS_CACHE_CONTROL, format_points)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching accessibility points near ({lat}, {lng}): {e}", exc_info=True)
+        return jsonify({"error": "Failed to fetch accessibility points"}), 500
+
+def tile_response(body, etag):
+    """JSON response that browsers may cache briefly and revalidate with If-None-Match (304 if unchanged)."""
+    return conditional_json(etag, f"public, max-age={TILE_CACHE_TTL_SECONDS}", lambda: body)
+
+
+@accessibility_bp.route('/accessibility-points/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_accessibility_tile(z, x, y):
+    """
+    Map tile of accessibility points (public), z/x/y as in Google/OSM web map tiles.
+    Returns individual points at high zoom and grid clusters with per-type counts below it.
+    """
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+    if not is_valid_tile(z, x, y):
+        return jsonify({"error": "Invalid tile coordinates"}), 400
 
     try:
-        response = requests.get(DIRECTIONS_API_URL, params=params, timeout=10)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        data = response.json()
-
-        if data['status'] != 'OK':
-            error_msg = data.get('error_message', f"Google Directions API status: {data['status']}")
-            # Consider logging the full error details here
-            print(f"Google Directions API Error: {error_msg}")
-            raise ValueError(error_msg) # Raise a value error for non-OK status
-
-        return data
-
-    except requests.exceptions.Timeout:
-        print("Error: Google Maps API request timed out.")
-        raise requests.exceptions.Timeout("Routing service request timed out")
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Google Maps API: {e}")
-        raise requests.exceptions.RequestException(f"Could not connect to routing service: {e}")
+        body, etag = get_tile(z, x, y, request.args.get('type'))
+        return tile_response(body, etag)
     except Exception as e:
-         # Catch any other unexpected errors
-        print(f"Unexpected error in fetch_google_directions: {e}")
-        raise Exception(f"Unexpected error processing Google Directions request: {e}")
+        current_app.logger.error(f"Error building accessibility tile {z}/{x}/{y}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to fetch accessibility points"}), 500
 
 
-# Example: Placeholder for Geocoding Service function
-def geocode_address(address):
+@accessibility_bp.route('/accessibility-points/viewport', methods=['GET'])
+def get_accessibility_viewport():
     """
-    (Placeholder) Converts an address string to lat/lng coordinates using Google Geocoding API.
+    Tiles covering a map viewport (public): ?bbox=west,south,east,north&zoom=z[&type=].
+    Each tile is built and cached exactly like /tiles/z/x/y, so overlapping viewports share work.
+    A viewport crossing the antimeridian has west > east and gets the tiles on both sides.
     """
-    if not GOOGLE_MAPS_API_KEY:
-        raise ValueError("Missing Google Maps API Key environment variable.")
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
+    try:
+        west, south, east, north = (float(value) for value in request.args.get('bbox', '').split(','))
+        zoom = int(request.args.get('zoom'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Missing or invalid query parameters: bbox (west,south,east,north), zoom (integer)"}), 400
+    if not is_valid_tile(zoom, 0, 0) or south > north or not (-180 <= west <= 180 and -180 <= east <= 180):
+        return jsonify({"error": "Invalid bbox or zoom"}), 400
+
+    tiles = tiles_covering(south, west, north, east, zoom)
+    if len(tiles) > TILE_VIEWPORT_MAX_TILES:
+        return jsonify({"error": f"Viewport covers too many tiles at this zoom (max {TILE_VIEWPORT_MAX_TILES})"}), 400
+
+    try:
+        results = [get_tile(zoom, x, y, request.args.get('type')) for x, y in tiles]
+        etag = hashlib.sha1("".join(tile_etag for _, tile_etag in results).encode()).hexdigest()
+        return tile_response({"zoom": zoom, "tiles": [body for body, _ in results]}, etag)
+    except Exception as e:
+        current_app.logger.error(f"Error building accessibility viewport {west},{south},{east},{north} z{zoom}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to fetch accessibility points"}), 500
+
+
+@accessibility_bp.route('/accessibility-points/<point_id>', methods=['GET'])
+def get_single_accessibility_point(point_id):
+    """Retrieves details for a single accessibility point (public)."""
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
+    try:
+        obj_id = ObjectId(point_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid point ID format"}), 400
 
-    params = {'address': address, 'key': GOOGLE_MAPS_API_KEY}
     try:
-        response = requests.get(GEOCODING_API_URL, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        if data['status'] == 'OK' and data.get('results'):
-            location = data['results'][0]['geometry']['location'] # lat, lng
-            return location
+        # Project fields, potentially excluding submitter info for public view
+        projection = {"submittedBy": 0}
+        point = db.accessibility_points.find_one({"_id": obj_id}, projection)
+        if point:
+            # Points written by this API carry updatedAt; hash older ones by content
+            etag = etag_for(point['_id'], point.get('updatedAt') or current_app.json.dumps(point, sort_keys=True))
+            return conditional_json(etag, POINTS_CACHE_CONTROL, lambda: point) # The JSON provider serializes ObjectId/datetime
         else:
-            print(f"Geocoding failed for '{address}'. Status: {data['status']}")
-            return None
+            return jsonify({"error": "Accessibility point not found"}), 404
     except Exception as e:
-        print(f"Error during geocoding for '{address}': {e}")
-        return None
\ No newline at end of file
+        current_app.logger.error(f"Error fetching accessibility point {point_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to fetch accessibility point details"}), 500
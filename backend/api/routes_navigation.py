@@ -1,112 +1,363 @@
-# Note: To use this Blueprint, you would import and register it in backend/app.py
-# and remove the original '/api/route' definition from app.py.
+# backend/api/routes_navigation.py
+# Route calculation: /api/route, /api/route/batch and the cache counters. Also the shared
+# pieces of the route pipeline (request parsing, route cache, coalescing) that asgi.py reuses.
 
 import os
 import requests
-import polyline # Assuming polyline library is installed
-from flask import Blueprint, jsonify, request
-# --- Dependencies that would likely be needed ---
-# from ..app import db, route_cache, clean_cache # Example: Import from main app context (adjust based on structure)
-# from ..services.google_maps_service import fetch_google_directions
-# from ..services.database_service import find_nearby_accessibility_issues
-# from ..utils.helpers import decode_google_polyline
-
-# Using placeholder imports/variables for demonstration
-db = None # Placeholder
-route_cache = {} # Placeholder
-def clean_cache(): pass # Placeholder
-def fetch_google_directions(params): return {"status": "OK", "routes": []} # Placeholder
-def find_nearby_accessibility_issues(points): return [] # Placeholder
-def decode_google_polyline(pline): return [] # Placeholder
-
-# Create Blueprint
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from services.cache_store import MongoCacheStore, SQLiteCacheStore
+from services.database_service import get_db
+from services.google_maps_service import (
+    fetch_google_directions, geocode_address, geocode_cache_stats, GoogleMapsAPIError,
+)
+from services.local_router import local_router, ROUTING_ENGINE
+from services.overlay_service import get_route_overlay, get_route_overlays, overlay_cache
+from services.preferences_service import peek_preferences, preferences_cache
+from services.route_ranking import rank_routes
+from utils.auth import get_current_user_id, token_verifier
+from utils.cache import LRUCache, TieredCache, SingleFlight
+from utils.cache_keys import build_route_cache_key
+from utils.rate_limit import TokenBucket
+from utils.timing import span
+
 nav_bp = Blueprint('navigation_api', __name__, url_prefix='/api')
 
+# --- Google Maps API Setup ---
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+if not GOOGLE_MAPS_API_KEY:
+     print("Warning: GOOGLE_MAPS_API_KEY environment variable not set. Route calculation disabled.")
+
+
+# --- Route Cache (per-worker LRU + optional shared second tier) ---
+# The in-memory tier is per worker and lost on restart/deploy; the second tier is shared:
+# 'mongo' (TTL collection, shared across hosts) or 'sqlite' (on-disk, shared by workers on one host).
+ROUTE_CACHE_MAX_BYTES = int(os.getenv("ROUTE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))) # Keep small for free tier memory
+ROUTE_CACHE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_TTL_SECONDS", "21600")) # Google data only; hazards are layered on per request
+ROUTE_CACHE_L2 = os.getenv("ROUTE_CACHE_L2", "").lower() # '', 'mongo' or 'sqlite'
+ROUTE_CACHE_SQLITE_PATH = os.getenv("ROUTE_CACHE_SQLITE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "route_cache.sqlite3"))
+
+def create_route_cache_store():
+    """Builds the configured second-tier store, or None if disabled/unavailable."""
+    try:
+        if ROUTE_CACHE_L2 == 'mongo':
+            db = get_db() # No network I/O here; the TTL index comes from 'flask --app app create-indexes'
+            if db is None:
+                print("Warning: ROUTE_CACHE_L2=mongo but database unavailable. Shared route cache disabled.")
+                return None
+            return MongoCacheStore(db.route_cache)
+        if ROUTE_CACHE_L2 == 'sqlite':
+            return SQLiteCacheStore(ROUTE_CACHE_SQLITE_PATH)
+    except Exception as e:
+        print(f"Error initializing shared route cache ({ROUTE_CACHE_L2}): {e}")
+    return None
+
+route_cache = TieredCache(
+    LRUCache(max_bytes=ROUTE_CACHE_MAX_BYTES, ttl_seconds=ROUTE_CACHE_TTL_SECONDS, name="route_cache"),
+    store=create_route_cache_store(),
+)
+
 
+# Single-flight coalescing of identical concurrent route computations (per worker)
+ROUTE_COALESCE_TIMEOUT_SECONDS = float(os.getenv("ROUTE_COALESCE_TIMEOUT_SECONDS", "30"))
+route_flights = SingleFlight()
+
+# Batch routing: cache misses fan out over a bounded per-worker pool. Their Directions calls come
+# out of one token bucket per worker (cache hits and duplicates are free), so concurrent batches
+# share a burst of ROUTE_BATCH_GOOGLE_BUDGET calls refilled at ROUTE_BATCH_GOOGLE_REFILL_PER_MINUTE
+ROUTE_BATCH_MAX_ITEMS = int(os.getenv("ROUTE_BATCH_MAX_ITEMS", "100"))
+ROUTE_BATCH_GOOGLE_BUDGET = int(os.getenv("ROUTE_BATCH_GOOGLE_BUDGET", "25"))
+ROUTE_BATCH_GOOGLE_REFILL_PER_MINUTE = float(os.getenv("ROUTE_BATCH_GOOGLE_REFILL_PER_MINUTE", "25"))
+ROUTE_BATCH_CONCURRENCY = int(os.getenv("ROUTE_BATCH_CONCURRENCY", "4"))
+route_batch_pool = ThreadPoolExecutor(max_workers=ROUTE_BATCH_CONCURRENCY, thread_name_prefix="route-batch")
+route_batch_budget = TokenBucket(ROUTE_BATCH_GOOGLE_BUDGET, ROUTE_BATCH_GOOGLE_REFILL_PER_MINUTE / 60)
+
+
+# --- Stored Preferences in Route Requests ---
+# Route preferences a request leaves out default from the user's stored defaultMobility.
+# Wheelchair users get every Google alternative ranked by accessibility (same single Directions call).
+MOBILITY_ROUTE_DEFAULTS = {
+    'wheelchair': {'avoidStairs': True, 'wheelchairAccessibleTransit': True, 'alternatives': True},
+}
+
+
+
+# --- Route Calculation Endpoint ---
 @nav_bp.route('/route', methods=['POST'])
-def get_route_blueprint():
+def get_route():
+    """Calculates a route using Google Directions API, checks cache, and supplements with custom data."""
+    if not GOOGLE_MAPS_API_KEY:
+         return jsonify({"error": "Server configuration error: Missing Google API Key"}), 503 # Service Unavailable
+    if get_db() is None:
+        print("Warning: Route calculation attempted but database unavailable.")
+        # Proceed without custom data, or return error? Depends on requirements.
+        # return jsonify({"error": "Server configuration error: Database not available"}), 503
+
+    # Stored defaults only if this worker already has them cached: no extra DB round trip per route
+    with span("auth"):
+        stored_preferences = peek_preferences(get_current_user_id())
+    (cache_key, params), error = parse_route_request(request.get_json(silent=True), stored_preferences)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    body, status = resolve_route(cache_key, params)
+    with span("serialize"):
+        return jsonify(body), status
+
+
+def resolve_route(cache_key, params):
     """
-    (Blueprint Version) Calculates a route using Google Directions API,
-    checks cache, and supplements with custom data.
+    Cache check, coalesced computation and hazard overlay for a parsed route request.
+    Shared by /api/route and /api/route/batch. Returns a (response body, HTTP status) tuple.
+    Stages are timed as cache, directions (including waits on a coalesced leader) and overlay.
+    """
+    # --- Cache Check ---
+    with span("cache"):
+        cached_data = route_cache.get(cache_key)
+    if cached_data is not None:
+         print(f"Returning cached route for key: {cache_key}")
+         # The hazard overlay is cached separately, so newly added points still show up here
+         with span("overlay"):
+             return with_accessibility_overlay(cached_data), 200
+
+    # --- Compute (coalesced) ---
+    # Identical concurrent misses share one Google call + overlay; waiters get the leader's response
+    try:
+        with span("directions"):
+            body, status = route_flights.do(
+                cache_key, lambda: compute_route(cache_key, params), timeout=ROUTE_COALESCE_TIMEOUT_SECONDS
+            )
+    except TimeoutError:
+        print(f"Timed out waiting for in-flight route computation for key: {cache_key}")
+        return {"error": "Routing service request timed out"}, 504 # Gateway Timeout
+    if status == 200:
+        with span("overlay"):
+            body = with_accessibility_overlay(body)
+    return body, status
+
+
+# --- Batch Route Endpoint ---
+@nav_bp.route('/route/batch', methods=['POST'])
+def get_route_batch():
+    """
+    Routes many origin/destination pairs in one call. Body: {"requests": [{origin, destination,
+    preferences, id?}, ...]}. Each item gets its own status; identical items are computed once.
+    Send 'Accept: application/x-ndjson' to stream items as they finish instead of one JSON array.
     """
     if not GOOGLE_MAPS_API_KEY:
          return jsonify({"error": "Server configuration error: Missing Google API Key"}), 503
 
-    data = request.get_json()
-    if not data: return jsonify({"error": "Request body required"}), 400
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request body must contain a non-empty 'requests' list"}), 400
+    if len(items) > ROUTE_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many requests in batch (max {ROUTE_BATCH_MAX_ITEMS})"}), 400
+
+    results = [None] * len(items)
+    unique = {} # cache key -> (params, [item indexes])
+    stored_preferences = peek_preferences(get_current_user_id())
+    for index, item in enumerate(items):
+        (cache_key, params), error = parse_route_request(item, stored_preferences)
+        if error:
+            results[index] = batch_item_result(items, index, error[0], error[1])
+        else:
+            unique.setdefault(cache_key, (params, []))[1].append(index)
+
+    # Only cache misses spend the worker's Google budget; whatever is over budget is rejected up front
+    google_calls = 0
+    futures = {}
+    app = current_app._get_current_object()
+    for cache_key, (params, indexes) in unique.items():
+        cached = route_cache.get(cache_key) is not None
+        if not cached:
+            if not route_batch_budget.try_acquire():
+                for index in indexes:
+                    results[index] = batch_item_result(items, index, {"error": "Batch routing quota exceeded; retry this item later"}, 429)
+                continue
+            google_calls += 1
+        futures[route_batch_pool.submit(run_in_app_context, app, resolve_route, cache_key, params)] = (indexes, cached)
+    summary = {
+        "total": len(items),
+        "unique": len(unique),
+        "cacheHits": sum(1 for _, cached in futures.values() if cached),
+        "googleCalls": google_calls,
+    }
+
+    def completed_results():
+        """Yields (index, result) pairs as items finish: rejected ones first, then in completion order."""
+        for index, result in enumerate(results):
+            if result is not None:
+                yield index, result
+        for future in as_completed(futures):
+            indexes, cached = futures[future]
+            try:
+                body, status = future.result()
+            except Exception as e:
+                current_app.logger.error(f"Unexpected error in batch route item: {e}", exc_info=True)
+                body, status = {"error": "Internal server error during route calculation"}, 500
+            for index in indexes:
+                yield index, batch_item_result(items, index, body, status, cached)
 
-    origin = data.get('origin')
+    if 'application/x-ndjson' in request.headers.get('Accept', ''):
+        def stream():
+            # The app's JSON provider, so lines match the non-streamed response (orjson, key order)
+            yield current_app.json.dumps({"summary": summary}) + "\n"
+            for _, result in completed_results():
+                yield current_app.json.dumps(result) + "\n"
+        return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+    for index, result in completed_results():
+        results[index] = result
+    return jsonify({"results": results, "summary": summary})
+
+
+def run_in_app_context(app, func, *args):
+    """Pool thread entry point: the route pipeline logs through current_app."""
+    with app.app_context():
+        return func(*args)
+
+
+def batch_item_result(items, index, body, status, cached=False):
+    result = {"index": index, "status": status, "cached": cached, "body": body}
+    if isinstance(items[index], dict) and items[index].get('id') is not None:
+        result["id"] = items[index]['id'] # Client-side correlation id, echoed back
+    return result
+
+
+def parse_route_request(data, stored_preferences=None):
+    """
+    Validates a /api/route body and builds its cache key and Google Directions params.
+    Preferences missing from the body default from the user's stored defaultMobility, if given.
+    Returns ((cache_key, params), None) or ((None, None), (error body, HTTP status)).
+    """
+    if not isinstance(data, dict):
+        return (None, None), ({"error": "Request body required"}, 400)
+    origin = data.get('origin') # Expecting {lat: number, lng: number} or address string
     destination = data.get('destination')
-    preferences = data.get('preferences', {})
-    avoid_stairs = preferences.get('avoidStairs', True)
-    wheelchair_accessible_transit = preferences.get('wheelchairAccessibleTransit', True)
-    preferred_mode = preferences.get('mode', 'walking')
+    preferences = data.get('preferences') or {}
+    defaults = MOBILITY_ROUTE_DEFAULTS.get((stored_preferences or {}).get('defaultMobility'), {})
+    avoid_stairs = preferences.get('avoidStairs', defaults.get('avoidStairs', True))
+    wheelchair_accessible_transit = preferences.get('wheelchairAccessibleTransit', defaults.get('wheelchairAccessibleTransit', True))
+    preferred_mode = preferences.get('mode', 'walking') # Allow mode selection ('walking', 'transit', 'driving')
+    # Rank every Google alternative by accessibility
+    alternatives = bool(preferences.get('alternatives', defaults.get('alternatives', False)))
 
     if not origin or not destination:
-        return jsonify({"error": "Origin and destination are required"}), 400
+        return (None, None), ({"error": "Origin and destination are required"}, 400)
 
-    # --- Cache Check ---
-    cache_key = f"{origin}_{destination}_{avoid_stairs}_{wheelchair_accessible_transit}_{preferred_mode}"
-    if cache_key in route_cache:
-         print(f"Returning cached route for key: {cache_key}")
-         return jsonify(route_cache[cache_key])
+    # Keys snap coordinates and canonicalize addresses/preferences so nearby GPS fixes share routes
+    try:
+        cache_key = build_route_cache_key(origin, destination, {
+            "avoidStairs": avoid_stairs,
+            "wheelchairAccessibleTransit": wheelchair_accessible_transit,
+            "mode": preferred_mode,
+            "alternatives": alternatives,
+        })
+    except (KeyError, TypeError, ValueError):
+        return (None, None), ({"error": "Origin and destination must be address strings or objects with lat, lng"}, 400)
 
-    # --- Format Params and Call Google ---
+    # Ensure origin/destination are formatted correctly for Google
     origin_param = f"{origin['lat']},{origin['lng']}" if isinstance(origin, dict) else origin
     destination_param = f"{destination['lat']},{destination['lng']}" if isinstance(destination, dict) else destination
 
     params = {
         'origin': origin_param,
         'destination': destination_param,
-        'key': GOOGLE_MAPS_API_KEY,
         'mode': preferred_mode,
     }
-    if params['mode'] == 'walking' and avoid_stairs: params['avoid'] = 'stairs'
-    elif params['mode'] == 'transit' and wheelchair_accessible_transit: params['transit_mode'] = 'wheelchair'
+    if alternatives:
+        params['alternatives'] = 'true'
+
+    # Apply accessibility parameters based on mode
+    if params['mode'] == 'walking' and avoid_stairs:
+         params['avoid'] = 'stairs' # Note: Google's support for this varies by region
+    elif params['mode'] == 'transit' and wheelchair_accessible_transit:
+         params['transit_mode'] = 'wheelchair' # Specifically requests WC-accessible transit
+
+    return (cache_key, params), None
+
+
+def directions_error_response(error):
+    """Maps a non-OK Google Directions status to a (response body, HTTP status) tuple."""
+    # Avoid caching errors unless specific ones like ZERO_RESULTS
+    if error.status == 'ZERO_RESULTS':
+        return {"error": "No route found matching criteria.", "status": error.status}, 404
+    # Log the detailed error from Google if available
+    error_detail = error.error_message or 'Unknown Google API error'
+    return {"error": f"Failed to calculate route. Google status: {error.status}", "detail": error_detail}, 502 # Bad Gateway
 
+
+def with_accessibility_overlay(route_data):
+    """
+    Returns a copy of the (cached) Google response with the current custom accessibility warnings.
+    When Google returned alternatives, every route is overlaid (in parallel) and they're ranked best-first.
+    """
+    if len(route_data.get('routes') or []) > 1:
+        try:
+            return rank_routes(route_data, get_route_overlays(route_data))
+        except Exception as e:
+            current_app.logger.error(f"Error ranking alternative routes: {e}", exc_info=True)
     try:
-        # --- Ideally use the service function ---
-        # route_data = fetch_google_directions(params)
-        # Using placeholder directly for now:
-        api_url = "https://maps.googleapis.com/maps/api/directions/json"
-        response = requests.get(api_url, params=params, timeout=10)
-        response.raise_for_status()
-        route_data = response.json()
-        # --- End Placeholder ---
-
-        if route_data['status'] != 'OK':
-             # Handle Google API errors as in the main app.py version
-            if route_data['status'] == 'ZERO_RESULTS':
-                 return jsonify({"error": "No route found matching criteria.", "status": route_data['status']}), 404
-            else:
-                 error_detail = route_data.get('error_message', 'Unknown Google API error')
-                 return jsonify({"error": f"Failed to calculate route. Google status: {route_data['status']}", "detail": error_detail}), 502
-
-        # --- Supplement with Custom Data ---
+        custom_warnings = get_route_overlay(route_data)
+    except Exception as e:
+        current_app.logger.error(f"Error computing accessibility overlay: {e}", exc_info=True)
         custom_warnings = []
-        if db and route_data.get('routes'):
-             overview_polyline = route_data['routes'][0].get('overview_polyline', {}).get('points')
-             if overview_polyline:
-                 decoded_points = decode_google_polyline(overview_polyline)
-                 if decoded_points:
-                     custom_warnings = find_nearby_accessibility_issues(decoded_points)
-        route_data['custom_accessibility_warnings'] = custom_warnings
+    return {**route_data, 'custom_accessibility_warnings': custom_warnings}
 
-        # --- Cache Result ---
-        clean_cache()
-        route_cache[cache_key] = route_data
-        print(f"Calculated and cached route (Blueprint). Cache size: {len(route_cache)}")
 
-        return jsonify(route_data)
+def fetch_directions(params):
+    """Directions from the local walking router when it can serve the request, otherwise from Google."""
+    if ROUTING_ENGINE == 'local':
+        route_data = local_router.route(params, geocode=geocode_address) # Cached geocoding for address inputs
+        if route_data is not None:
+            return route_data
+    return fetch_google_directions(params)
+
+
+def compute_route(cache_key, params):
+    """
+    Calls Google Directions and caches the raw response (the hazard overlay is layered on by the caller).
+    Returns a (response body, HTTP status) tuple so errors can be shared with coalesced waiters.
+    """
+    # A request that missed the cache just before an identical computation finished lands here
+    cached_data = route_cache.get(cache_key)
+    if cached_data is not None:
+        return cached_data, 200
 
+    print(f"Requesting directions: {params}")
+
+    try:
+        # Local router when enabled and able to serve it, else Google (pooled session, bounded retries)
+        route_data = fetch_directions(params)
+
+        # --- Cache the successful result ---
+        route_cache.set(cache_key, route_data) # Evicts LRU entries to stay within the byte budget
+        print(f"Calculated and cached route. Cache stats: {route_cache.stats()}")
+
+        return route_data, 200
+
+    except GoogleMapsAPIError as e:
+        return directions_error_response(e)
     except requests.exceptions.Timeout:
-        print("Error: Google Maps API request timed out (Blueprint).")
-        return jsonify({"error": "Routing service request timed out"}), 504
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Google Maps API (Blueprint): {e}")
-        return jsonify({"error": "Could not connect to routing service"}), 503
+        return {"error": "Routing service request timed out"}, 504 # Gateway Timeout
+    except requests.exceptions.RequestException:
+        return {"error": "Could not connect to routing service"}, 503 # Service Unavailable
     except Exception as e:
-        # In a real app, use app logger: app.logger.error(...)
-        print(f"An unexpected error occurred during route calculation (Blueprint): {e}")
-        return jsonify({"error": "Internal server error during route calculation"}), 500
\ No newline at end of file
+        current_app.logger.error(f"An unexpected error occurred during route calculation: {e}", exc_info=True)
+        return {"error": "Internal server error during route calculation"}, 500
+
+
+# --- Cache Stats Endpoint ---
+@nav_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Exposes route cache counters (hits, misses, evictions, byte usage) for scraping."""
+    return jsonify({
+        "routeCache": route_cache.stats(),
+        "routeCoalescing": route_flights.stats(),
+        "batchGoogleBudget": route_batch_budget.stats(),
+        "overlayCache": overlay_cache.stats(),
+        "geocodeCache": geocode_cache_stats(),
+        "preferencesCache": preferences_cache.stats(),
+        "tokenCache": token_verifier.stats() if token_verifier else None,
+    })
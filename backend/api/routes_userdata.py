@@ -1,155 +1,236 @@
-# Note: To use this Blueprint, you would import and register it in backend/app.py
-# and remove the original user/routes endpoints from app.py.
+# backend/api/routes_userdata.py
+# Per-user data: saved routes (CRUD, keyset-paginated listing) and user preferences.
 
-from flask import Blueprint, jsonify, request
+import os
+import base64
+import json
+from datetime import datetime, timedelta
 from bson import ObjectId
 from bson.errors import InvalidId
-from datetime import datetime
-# --- Dependencies that would likely be needed ---
-# from ..app import db # Example: Import from main app context (adjust based on structure)
-# from ..utils.auth import get_current_user_id # Import auth helper
+from flask import Blueprint, current_app, jsonify, request
+from services.database_service import get_db
+from services.preferences_service import get_preferences, update_preferences
+from services.route_storage import pack_route_data, unpack_route_data, route_projection
+from utils.auth import get_current_user_id
+from utils.http_cache import conditional_json, etag_for, PRIVATE_CACHE_CONTROL
 
-# Using placeholder imports/variables for demonstration
-db = None # Placeholder
-def get_current_user_id(): return "temp_user_id_for_testing" # Placeholder
-
-# Create Blueprint
 userdata_bp = Blueprint('userdata_api', __name__, url_prefix='/api')
 
-# === Routes CRUD ===
+# --- Saved Routes Listing ---
+SAVED_ROUTES_PAGE_SIZE = int(os.getenv("SAVED_ROUTES_PAGE_SIZE", "20"))
+SAVED_ROUTES_MAX_PAGE_SIZE = 100
+EPOCH = datetime(1970, 1, 1) # pymongo returns naive UTC datetimes
+
+
+# --- Routes CRUD Endpoints ---
 
 @userdata_bp.route('/routes', methods=['POST'])
-def save_route_blueprint():
-    """(Blueprint Version) Saves a calculated route for the authenticated user."""
+def save_route():
+    """Saves a calculated route for the authenticated user."""
     user_id = get_current_user_id()
     if not user_id: return jsonify({"error": "Authentication required"}), 401
-    if not db: return jsonify({"error": "Database service unavailable"}), 503
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
 
     data = request.get_json()
     if not data: return jsonify({"error": "Request body required"}), 400
 
-    # Validation as in app.py
     route_name = data.get('name')
     origin = data.get('origin')
     destination = data.get('destination')
     google_route_data = data.get('googleRouteData')
+    custom_warnings = data.get("customWarnings", [])
+
+    # Basic Validation
     if not all([route_name, origin, destination, google_route_data]):
-        return jsonify({"error": "Missing required route data"}), 400
+         return jsonify({"error": "Missing required fields (name, origin, destination, googleRouteData)"}), 400
+    if not isinstance(origin, dict) or 'lat' not in origin or 'lng' not in origin or \
+       not isinstance(destination, dict) or 'lat' not in destination or 'lng' not in destination:
+         return jsonify({"error": "Origin and Destination must be objects with lat, lng"}), 400
+    if not isinstance(google_route_data, dict):
+         return jsonify({"error": "googleRouteData must be a Directions response object"}), 400
 
     try:
-        route_doc = {
-            "userId": user_id, "name": route_name, "origin": origin,
-            "destination": destination, "googleRouteData": google_route_data,
-            "customWarnings": data.get("customWarnings", []), "createdAt": datetime.utcnow()
-        }
-        result = db.routes.insert_one(route_doc)
-        return jsonify({"message": "Route saved successfully", "routeId": str(result.inserted_id)}), 201
+         route_doc = {
+             "userId": user_id,
+             "name": route_name,
+             "origin": origin,
+             "destination": destination,
+             **pack_route_data(google_route_data), # Pruned, remainder compressed; see services/route_storage.py
+             "customWarnings": custom_warnings,
+             "createdAt": datetime.utcnow()
+         }
+         result = db.routes.insert_one(route_doc)
+         return jsonify({"message": "Route saved successfully", "routeId": str(result.inserted_id)}), 201
     except Exception as e:
-        print(f"Error saving route (Blueprint): {e}")
-        return jsonify({"error": "Failed to save route"}), 500
+         current_app.logger.error(f"Error saving route for user {user_id}: {e}", exc_info=True)
+         return jsonify({"error": "Failed to save route due to server error"}), 500
 
 @userdata_bp.route('/routes', methods=['GET'])
-def get_saved_routes_blueprint():
-    """(Blueprint Version) Retrieves saved routes (summary) for the authenticated user."""
+def get_saved_routes():
+    """
+    Retrieves saved routes (summary) for the authenticated user, newest first, one page at a time.
+    Query: ?limit= (page size) and ?cursor= (the nextCursor of the previous page; null on the last page).
+    """
     user_id = get_current_user_id()
     if not user_id: return jsonify({"error": "Authentication required"}), 401
-    if not db: return jsonify({"error": "Database service unavailable"}), 503
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
+    try:
+        limit = min(int(request.args.get('limit', SAVED_ROUTES_PAGE_SIZE)), SAVED_ROUTES_MAX_PAGE_SIZE)
+        if limit < 1: raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be an integer between 1 and {SAVED_ROUTES_MAX_PAGE_SIZE}"}), 400
+
+    query = {"userId": user_id}
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_routes_cursor(cursor)
+        except (ValueError, KeyError, TypeError, InvalidId):
+            return jsonify({"error": "Invalid cursor"}), 400
+        # Keyset: everything strictly after the last route of the previous page in (createdAt, _id) order
+        query["$or"] = [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": last_id}},
+        ]
 
     try:
         user_routes = list(db.routes.find(
-            {"userId": user_id},
+            query,
+            # Project only necessary fields for the list view
             {"name": 1, "origin.address": 1, "destination.address": 1, "createdAt": 1}
-        ).sort("createdAt", -1))
-        for route in user_routes: route['_id'] = str(route['_id'])
-        return jsonify(user_routes)
+          ).sort([("createdAt", -1), ("_id", -1)]).limit(limit + 1)) # Newest first; one extra to detect a next page
+
+        next_cursor = None
+        if len(user_routes) > limit:
+            user_routes = user_routes[:limit]
+            next_cursor = encode_routes_cursor(user_routes[-1])
+        return jsonify({"routes": user_routes, "nextCursor": next_cursor})
     except Exception as e:
-        print(f"Error fetching routes (Blueprint): {e}")
+        current_app.logger.error(f"Error fetching routes for user {user_id}: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch saved routes"}), 500
 
+def encode_routes_cursor(route):
+    """Opaque cursor for the page after `route`: its createdAt (epoch ms) and _id."""
+    created_at_ms = (route['createdAt'] - EPOCH) // timedelta(milliseconds=1) # Mongo dates have ms precision
+    payload = json.dumps({"t": created_at_ms, "id": str(route['_id'])}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_routes_cursor(cursor):
+    payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    return EPOCH + timedelta(milliseconds=int(payload["t"])), ObjectId(payload["id"])
+
+
 @userdata_bp.route('/routes/<route_id>', methods=['GET'])
-def get_single_route_blueprint(route_id):
-    """(Blueprint Version) Retrieves full details for a specific saved route."""
+def get_single_route(route_id):
+    """
+    Retrieves full details for a specific saved route. googleRouteData holds the fields the
+    frontend renders; ?full=1 returns the Directions payload exactly as it was saved.
+    """
     user_id = get_current_user_id()
-    # ... (Auth & DB checks) ...
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
     try:
         obj_id = ObjectId(route_id)
-        route = db.routes.find_one({"_id": obj_id, "userId": user_id})
+    except InvalidId:
+        return jsonify({"error": "Invalid route ID format"}), 400
+
+    try:
+        full = request.args.get('full', '').lower() in ('1', 'true')
+        route = db.routes.find_one({"_id": obj_id, "userId": user_id}, route_projection(full))
         if route:
-            route['_id'] = str(route['_id'])
-            return jsonify(route)
+            # Saved routes aren't edited in place; the storage format changes the stored representation
+            etag = etag_for(route['_id'], route.get('updatedAt') or route.get('createdAt'), route.get('storageFormat'), full)
+            # Built only on a cache miss; format 3 routes decompress only for ?full=1, the listing never
+            return conditional_json(etag, PRIVATE_CACHE_CONTROL, lambda: unpack_route_data(route, full=full))
         else:
             return jsonify({"error": "Route not found or access denied"}), 404
-    except InvalidId:
-        return jsonify({"error": "Invalid route ID format"}), 400
     except Exception as e:
-        print(f"Error fetching single route (Blueprint): {e}")
+        current_app.logger.error(f"Error fetching route {route_id} for user {user_id}: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch route details"}), 500
 
 @userdata_bp.route('/routes/<route_id>', methods=['DELETE'])
-def delete_route_blueprint(route_id):
-    """(Blueprint Version) Deletes a specific saved route."""
+def delete_route(route_id):
+    """Deletes a specific saved route."""
     user_id = get_current_user_id()
-    # ... (Auth & DB checks) ...
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
     try:
         obj_id = ObjectId(route_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid route ID format"}), 400
+
+    try:
         result = db.routes.delete_one({"_id": obj_id, "userId": user_id})
         if result.deleted_count == 1:
             return jsonify({"message": "Route deleted successfully"}), 200
         else:
             return jsonify({"error": "Route not found or access denied"}), 404
-    except InvalidId:
-        return jsonify({"error": "Invalid route ID format"}), 400
     except Exception as e:
-        print(f"Error deleting route (Blueprint): {e}")
+        current_app.logger.error(f"Error deleting route {route_id} for user {user_id}: {e}", exc_info=True)
         return jsonify({"error": "Failed to delete route"}), 500
 
-# === User Preferences ===
+
+# --- User Preferences Endpoints ---
 
 @userdata_bp.route('/user/preferences', methods=['GET'])
-def get_user_preferences_blueprint():
-    """(Blueprint Version) Retrieves preferences for the authenticated user."""
+def get_user_preferences():
+    """Retrieves preferences for the authenticated user."""
     user_id = get_current_user_id()
-    # ... (Auth & DB checks) ...
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
     try:
-        user_data = db.users.find_one({"userId": user_id}, {"preferences": 1, "_id": 0})
-        if user_data and 'preferences' in user_data:
-            return jsonify(user_data['preferences'])
-        else:
-            return jsonify({"defaultMobility": "standard", "voiceURI": None}) # Defaults
+        preferences = get_preferences(db, user_id) # Read-through cache; defaults for unset fields
+        # A handful of fields: hashing the content is cheaper than tracking a version
+        etag = etag_for(*sorted(preferences.items()))
+        return conditional_json(etag, PRIVATE_CACHE_CONTROL, lambda: preferences)
     except Exception as e:
-        print(f"Error fetching preferences (Blueprint): {e}")
+        current_app.logger.error(f"Error fetching preferences for user {user_id}: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch user preferences"}), 500
 
 @userdata_bp.route('/user/preferences', methods=['PUT'])
-def update_user_preferences_blueprint():
-    """(Blueprint Version) Updates preferences for the authenticated user."""
+def update_user_preferences():
+    """Updates preferences for the authenticated user."""
     user_id = get_current_user_id()
-    # ... (Auth & DB checks) ...
+    if not user_id: return jsonify({"error": "Authentication required"}), 401
+    db = get_db()
+    if db is None: return jsonify({"error": "Database service unavailable"}), 503
+
     data = request.get_json()
     if not data: return jsonify({"error": "Request body required"}), 400
 
-    # Validation as in app.py
     allowed_mobility = ['standard', 'wheelchair']
     prefs_to_update = {}
     valid_update = False
+
     if 'defaultMobility' in data:
-        if data['defaultMobility'] not in allowed_mobility: return jsonify({"error": "Invalid defaultMobility"}), 400
-        prefs_to_update['preferences.defaultMobility'] = data['defaultMobility']
+        if data['defaultMobility'] not in allowed_mobility:
+            return jsonify({"error": f"Invalid defaultMobility. Allowed: {allowed_mobility}"}), 400
+        prefs_to_update['defaultMobility'] = data['defaultMobility']
         valid_update = True
+
     if 'voiceURI' in data:
-        if data['voiceURI'] is not None and not isinstance(data['voiceURI'], str): return jsonify({"error": "Invalid voiceURI"}), 400
-        prefs_to_update['preferences.voiceURI'] = data['voiceURI']
+        if data['voiceURI'] is not None and not isinstance(data['voiceURI'], str):
+            return jsonify({"error": "Invalid voiceURI. Must be a string or null."}), 400
+        prefs_to_update['voiceURI'] = data['voiceURI']
         valid_update = True
 
-    if not valid_update: return jsonify({"error": "No valid preference fields provided"}), 400
+    if not valid_update:
+        return jsonify({"error": "No valid preference fields provided for update"}), 400
 
     try:
-        # Using upsert=True to handle potential initial creation
-        db.users.update_one(
-            {"userId": user_id}, {"$set": prefs_to_update}, upsert=True
-        )
-        updated_user = db.users.find_one({"userId": user_id}, {"preferences": 1, "_id": 0})
-        return jsonify(updated_user.get('preferences', {}))
+        # One atomic upsert returning the post-image; also refreshes this worker's preferences cache
+        return jsonify(update_preferences(db, user_id, prefs_to_update))
+
     except Exception as e:
-        print(f"Error updating preferences (Blueprint): {e}")
-        return jsonify({"error": "Failed to update user preferences"}), 500
\ No newline at end of file
+        current_app.logger.error(f"Error updating preferences for user {user_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to update user preferences"}), 500
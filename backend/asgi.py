@@ -0,0 +1,176 @@
+# backend/asgi.py
+# ASGI entry point. POST /api/route runs on a native asyncio pipeline (async Google client,
+# concurrent async Mongo corridor queries) so in-flight route requests don't each hold a
+# worker; every other endpoint is served by the Flask app through a WSGI adapter.
+#
+# Run with:  uvicorn asgi:application --host 0.0.0.0 --port $PORT
+# (The Procfile's 'gunicorn app:app' sync deployment keeps working unchanged.)
+# The native route gets the same stage timing (Server-Timing header, JSON log) as the Flask one;
+# the 1-in-N profiler only covers Flask requests, as a sampled event loop thread would mix requests.
+
+import asyncio
+import json
+import time
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from app import app as flask_app, frontend_url, start_background_services, COMPRESS_RESPONSES
+from api.routes_navigation import (
+    route_cache, parse_route_request, directions_error_response, GOOGLE_MAPS_API_KEY, ROUTE_COALESCE_TIMEOUT_SECONDS,
+)
+from services.async_route_service import (
+    fetch_google_directions_async, get_route_overlay_async, close_clients,
+)
+from services.google_maps_service import GoogleMapsAPIError, geocode_address
+from services.local_router import local_router, ROUTING_ENGINE
+from services.preferences_service import peek_preferences
+from services.route_ranking import rank_routes
+from utils.auth import user_id_from_authorization
+from utils.cache import AsyncSingleFlight
+from utils.compression import negotiate_encoding, compress_body, COMPRESS_MIN_BYTES
+from utils.metrics import observe_request, METRICS_ENABLED
+from utils.timing import span, start_timing, stop_timing, SERVER_TIMING_ENABLED
+
+wsgi_application = WsgiToAsgi(flask_app)
+route_flights_async = AsyncSingleFlight()
+
+async def _cache_get(key):
+    # A configured second tier does blocking I/O; only then hop to a thread
+    if getattr(route_cache, 'store', None) is not None:
+        return await asyncio.to_thread(route_cache.get, key)
+    return route_cache.get(key)
+
+async def compute_route_async(cache_key, params):
+    """Async counterpart of app.compute_route. Returns a (response body, HTTP status) tuple."""
+    cached_data = await _cache_get(cache_key)
+    if cached_data is not None:
+        return cached_data, 200
+
+    print(f"Requesting Google Directions (async): {params}")
+    try:
+        route_data = None
+        if ROUTING_ENGINE == 'local': # CPU-bound A*, keep it off the event loop
+            route_data = await asyncio.to_thread(local_router.route, params, geocode_address)
+        if route_data is None:
+            route_data = await fetch_google_directions_async(params)
+    except GoogleMapsAPIError as e:
+        return directions_error_response(e)
+    except httpx.TimeoutException:
+        return {"error": "Routing service request timed out"}, 504 # Gateway Timeout
+    except httpx.HTTPError:
+        return {"error": "Could not connect to routing service"}, 503 # Service Unavailable
+    except Exception as e:
+        flask_app.logger.error(f"An unexpected error occurred during async route calculation: {e}", exc_info=True)
+        return {"error": "Internal server error during route calculation"}, 500
+
+    route_cache.set(cache_key, route_data)
+    return route_data, 200
+
+async def get_route_async(data, authorization=None):
+    """Async equivalent of app.get_route: cache, coalesced Google call, then the hazard overlay."""
+    if not GOOGLE_MAPS_API_KEY:
+        return {"error": "Server configuration error: Missing Google API Key"}, 503
+
+    # Off the loop: a token cache miss verifies a signature and may (rarely) fetch the JWKS
+    with span("auth"):
+        user_id = await asyncio.to_thread(user_id_from_authorization, authorization)
+    (cache_key, params), error = parse_route_request(data, peek_preferences(user_id))
+    if error:
+        return error
+
+    with span("cache"):
+        route_data = await _cache_get(cache_key)
+    if route_data is None:
+        try:
+            with span("directions"):
+                route_data, status = await route_flights_async.do(
+                    cache_key, lambda: compute_route_async(cache_key, params), timeout=ROUTE_COALESCE_TIMEOUT_SECONDS
+                )
+        except TimeoutError:
+            return {"error": "Routing service request timed out"}, 504
+        if status != 200:
+            return route_data, status
+
+    with span("overlay"):
+        return await overlay_route_async(route_data)
+
+async def overlay_route_async(route_data):
+    """Async equivalent of with_accessibility_overlay: every route overlaid concurrently and ranked, or just the primary."""
+    route_count = len(route_data.get('routes') or [])
+    if route_count > 1:
+        try:
+            warnings_per_route = await asyncio.gather(*(
+                get_route_overlay_async(route_data, route_index=i) for i in range(route_count)
+            ))
+            return rank_routes(route_data, warnings_per_route), 200
+        except Exception as e:
+            flask_app.logger.error(f"Error ranking alternative routes (async): {e}", exc_info=True)
+    try:
+        custom_warnings = await get_route_overlay_async(route_data)
+    except Exception as e:
+        flask_app.logger.error(f"Error computing accessibility overlay (async): {e}", exc_info=True)
+        custom_warnings = []
+    return {**route_data, 'custom_accessibility_warnings': custom_warnings}, 200
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def _send_json(send, scope, body, status, timings=None):
+    with span("serialize"):
+        payload = flask_app.json.dumps(body).encode() # Same provider (orjson when available) as the Flask app
+    request_headers = dict(scope.get("headers", []))
+    headers = [(b"content-type", b"application/json")]
+    vary = [b"Origin"]
+    if COMPRESS_RESPONSES:
+        vary.append(b"Accept-Encoding")
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode())
+        if encoding and len(payload) >= COMPRESS_MIN_BYTES:
+            # Compressing a large route is CPU work; keep it off the event loop
+            with span("compress"):
+                payload = await asyncio.to_thread(compress_body, payload, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+    headers += [(b"content-length", str(len(payload)).encode()), (b"vary", b", ".join(vary))]
+    if timings is not None and SERVER_TIMING_ENABLED:
+        headers.append((b"server-timing", timings.server_timing(timings.elapsed()).encode()))
+    request_origin = request_headers.get(b"origin", b"").decode()
+    if request_origin == frontend_url: # Mirror the Flask-CORS policy for /api/*
+        headers.append((b"access-control-allow-origin", request_origin.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+async def handle_route(scope, receive, send):
+    started = time.perf_counter()
+    timings, timings_token = start_timing() # Each ASGI request runs in its own task, so this is per request
+    try:
+        start_background_services() # Normally already done at lifespan startup; a cheap check otherwise
+        try:
+            data = json.loads(await _read_body(receive) or b"null")
+        except ValueError:
+            data = None
+        authorization = dict(scope.get("headers", [])).get(b"authorization", b"").decode("latin-1")
+        body, status = await get_route_async(data, authorization)
+        await _send_json(send, scope, body, status, timings)
+        if METRICS_ENABLED: # Same series as the Flask endpoint's requests
+            observe_request("POST", "/api/route", status, time.perf_counter() - started)
+        timings.log("POST", "/api/route", status, timings.elapsed(), endpoint="asgi.route")
+    finally:
+        stop_timing(timings_token)
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                start_background_services() # Non-blocking: indexes load on daemon threads
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close_clients()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "http" and scope["path"] == "/api/route" and scope["method"] == "POST":
+        return await handle_route(scope, receive, send)
+    return await wsgi_application(scope, receive, send)
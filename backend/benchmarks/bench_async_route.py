@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_async_route.py
+# Concurrent throughput of POST /api/route: sync Flask path (one request at a time, like a
+# gunicorn sync worker) vs the asyncio pipeline in asgi.py, against a local mock Directions
+# server with fixed upstream latency.
+#
+# Usage (from backend/):  MONGO_URI= GOOGLE_MAPS_API_KEY=test python -m benchmarks.bench_async_route
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import polyline
+import uvicorn
+from werkzeug.serving import make_server
+
+UPSTREAM_LATENCY_SECONDS = 0.1
+NUM_REQUESTS = 200
+CONCURRENCY = 50
+MOCK_ROUTE = {"status": "OK", "routes": [{"overview_polyline": {"points": polyline.encode([(6.5244, 3.3692), (6.5244, 3.3892)])}}]}
+
+class MockDirectionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(UPSTREAM_LATENCY_SECONDS)
+        body = json.dumps(MOCK_ROUTE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_in_thread(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+async def drive(base_url, offset):
+    """Fires NUM_REQUESTS distinct (uncacheable) route requests, CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def one(i):
+            async with semaphore:
+                body = {"origin": {"lat": 6.5 + (offset + i) * 0.001, "lng": 3.37}, "destination": "Ikeja"}
+                response = await client.post("/api/route", json=body)
+                return response.status_code
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(one(i) for i in range(NUM_REQUESTS)))
+        elapsed = time.perf_counter() - start
+    assert all(status == 200 for status in statuses), statuses
+    return NUM_REQUESTS / elapsed
+
+def main():
+    mock = ThreadingHTTPServer(("127.0.0.1", 0), MockDirectionsHandler)
+    start_in_thread(mock.serve_forever)
+
+    from services import google_maps_service
+    google_maps_service.DIRECTIONS_API_URL = f"http://127.0.0.1:{mock.server_port}/directions"
+    import asgi
+    from app import app as flask_app
+
+    sync_server = make_server("127.0.0.1", 0, flask_app, threaded=False)
+    start_in_thread(sync_server.serve_forever)
+    sync_rps = asyncio.run(drive(f"http://127.0.0.1:{sync_server.server_port}", 0))
+
+    async_server = uvicorn.Server(uvicorn.Config(asgi.application, host="127.0.0.1", port=8765, log_level="warning"))
+    start_in_thread(async_server.run)
+    while not async_server.started:
+        time.sleep(0.05)
+    async_rps = asyncio.run(drive("http://127.0.0.1:8765", NUM_REQUESTS))
+
+    print(f"{NUM_REQUESTS} requests, concurrency {CONCURRENCY}, upstream latency {UPSTREAM_LATENCY_SECONDS * 1000:.0f} ms")
+    print(f"  sync (single sync worker): {sync_rps:7.1f} req/s")
+    print(f"  async (single process):    {async_rps:7.1f} req/s  ({async_rps / sync_rps:.1f}x)")
+    async_server.should_exit = True
+    sync_server.shutdown()
+    mock.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_auth.py
+# Per-request authentication overhead of utils.auth: first sight of a token (signature check,
+# JWKS already loaded), repeat requests with the same token (token cache hit), and the full
+# get_current_user_id() path inside a Flask request. Uses a locally generated RSA keypair and a
+# stub JWKS server on localhost, so no identity provider is needed.
+#
+# Usage (from backend/):  python -m benchmarks.bench_auth
+
+import json
+import threading
+import time
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask
+from utils.auth import JWKSCache, TokenVerifier, user_id_from_authorization
+import utils.auth as auth
+
+KEY_ID = "bench-key"
+TOKENS = 2000 # Distinct tokens for the cold (cache miss) measurement
+REPEATS = 20000
+
+def start_jwks_server(public_key):
+    jwk = {**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(public_key)), "kid": KEY_ID, "use": "sig", "alg": "RS256"}
+    body = json.dumps({"keys": [jwk]}).encode()
+    requests_served = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_served.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests_served
+
+def issue_token(private_key, subject):
+    now = int(time.time())
+    claims = {"sub": subject, "iss": "https://issuer.example", "aud": "accessible-nav", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": KEY_ID})
+
+def main():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    server, requests_served = start_jwks_server(private_key.public_key())
+    jwks = JWKSCache(f"http://127.0.0.1:{server.server_port}/.well-known/jwks.json")
+    verifier = TokenVerifier(jwks, issuer="https://issuer.example", audience="accessible-nav", algorithms=["RS256"])
+    tokens = [issue_token(private_key, f"user-{index}") for index in range(TOKENS)]
+
+    started = time.perf_counter()
+    verifier.verify(tokens[0]) # Loads the JWKS and starts the refresh thread
+    print(f"First request (JWKS fetch + verify): {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    started = time.perf_counter()
+    for token in tokens[1:]:
+        verifier.verify(token)
+    miss_us = (time.perf_counter() - started) / (TOKENS - 1) * 1e6
+    print(f"Token cache miss (RS256 verify):     {miss_us:.1f} us/request")
+
+    header = f"Bearer {tokens[1]}"
+    hit_us = min(timeit.repeat(lambda: verifier.verify(tokens[1]), number=REPEATS, repeat=5)) / REPEATS * 1e6
+    print(f"Token cache hit:                     {hit_us:.2f} us/request")
+    header_us = min(timeit.repeat(lambda: user_id_from_authorization(header, verifier), number=REPEATS, repeat=5)) / REPEATS * 1e6
+    print(f"Header parse + cache hit:            {header_us:.2f} us/request")
+
+    # Full per-request path: get_current_user_id() resolves once and memoizes on g
+    auth.token_verifier = verifier
+    app = Flask(__name__)
+    def request_cycle():
+        with app.test_request_context(headers={"Authorization": header}):
+            auth.get_current_user_id()
+            auth.get_current_user_id() # Second call within the request reads g.user_id
+    def empty_cycle():
+        with app.test_request_context(headers={"Authorization": header}):
+            pass
+    baseline_us = min(timeit.repeat(empty_cycle, number=2000, repeat=5)) / 2000 * 1e6
+    cycle_us = min(timeit.repeat(request_cycle, number=2000, repeat=5)) / 2000 * 1e6
+    print(f"get_current_user_id in a request:    {cycle_us - baseline_us:.2f} us/request "
+          f"(request context alone {baseline_us:.1f} us)")
+    print(f"JWKS requests served: {len(requests_served)}; token cache: {verifier.stats()}")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
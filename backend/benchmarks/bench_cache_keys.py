@@ -0,0 +1,69 @@
+# backend/benchmarks/bench_cache_keys.py
+# Replays a /api/route request log and compares route cache hit rates for the legacy
+# f"{origin}_{destination}_..." key and the normalized key from utils.cache_keys.
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_cache_keys [requests.jsonl]
+# Each log line is a /api/route JSON body ({"origin", "destination", "preferences"}).
+# Without a log, a synthetic one is generated: clients near a few popular places with GPS jitter.
+
+import json
+import random
+import sys
+from utils.cache_keys import build_route_cache_key
+
+PLACES = [(6.5244, 3.3792), (6.4550, 3.3841), (6.6018, 3.3515), (6.4281, 3.4219), (6.5000, 3.3500)]
+ADDRESS_VARIANTS = ["Lagos University Teaching Hospital", "lagos university teaching hospital ", "Lagos  University Teaching Hospital."]
+GPS_JITTER_DEGREES = 0.00004 # ~4-5 m, typical phone fix noise when standing still
+NUM_REQUESTS = 5000
+
+def synthetic_log():
+    random.seed(42)
+    for _ in range(NUM_REQUESTS):
+        lat, lng = random.choice(PLACES)
+        origin = {"lat": lat + random.uniform(-GPS_JITTER_DEGREES, GPS_JITTER_DEGREES),
+                  "lng": lng + random.uniform(-GPS_JITTER_DEGREES, GPS_JITTER_DEGREES)}
+        destination = random.choice(ADDRESS_VARIANTS) if random.random() < 0.5 else random.choice(PLACES[1:])
+        if isinstance(destination, tuple):
+            destination = {"lat": destination[0], "lng": destination[1]}
+        preferences = random.choice([{}, {"mode": "walking"}, {"avoidStairs": True, "mode": "walking"}])
+        yield {"origin": origin, "destination": destination, "preferences": preferences}
+
+def legacy_key(body):
+    preferences = body.get('preferences', {})
+    return (f"{body['origin']}_{body['destination']}_{preferences.get('avoidStairs', True)}_"
+            f"{preferences.get('wheelchairAccessibleTransit', True)}_{preferences.get('mode', 'walking')}")
+
+def normalized_key(body):
+    preferences = body.get('preferences', {})
+    return build_route_cache_key(body['origin'], body['destination'], {
+        "avoidStairs": preferences.get('avoidStairs', True),
+        "wheelchairAccessibleTransit": preferences.get('wheelchairAccessibleTransit', True),
+        "mode": preferences.get('mode', 'walking'),
+    })
+
+def hit_rate(bodies, key_func):
+    """Hit rate of an unbounded cache (upper bound, isolates the effect of the key)."""
+    seen, hits = set(), 0
+    for body in bodies:
+        key = key_func(body)
+        hits += key in seen
+        seen.add(key)
+    return hits / len(bodies), len(seen)
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as log_file:
+            bodies = [json.loads(line) for line in log_file if line.strip()]
+    else:
+        bodies = list(synthetic_log())
+
+    legacy_rate, legacy_keys = hit_rate(bodies, legacy_key)
+    normalized_rate, normalized_keys = hit_rate(bodies, normalized_key)
+    print(f"Replayed {len(bodies)} requests")
+    print(f"  legacy key:     hit rate {legacy_rate:6.1%}, {legacy_keys} distinct keys")
+    print(f"  normalized key: hit rate {normalized_rate:6.1%}, {normalized_keys} distinct keys")
+    print(f"  improvement:    {normalized_rate - legacy_rate:+.1%} ({len(bodies) * (normalized_rate - legacy_rate):.0f} fewer upstream calls)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# backend/benchmarks/bench_cold_start.py
+# Worker cold start: time for a fresh interpreter to import the app (what each gunicorn worker
+# does before it can accept requests) and answer its first request, with MongoDB unset,
+# unreachable (connection refused) and, if MONGO_URI is set in the environment, the real cluster.
+#
+# Usage (from backend/):  python -m benchmarks.bench_cold_start
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 3
+UNREACHABLE_MONGO_URI = "mongodb://127.0.0.1:1/" # Nothing listens on port 1: refused, until server selection times out
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import": imported - started, "firstRequest": time.perf_counter() - started}))
+"""
+
+def measure(mongo_uri):
+    env = {**os.environ, "MONGO_URI": mongo_uri, "PYTHONDONTWRITEBYTECODE": "1"}
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return (statistics.median(sample["import"] for sample in samples),
+            statistics.median(sample["firstRequest"] for sample in samples))
+
+def main():
+    scenarios = [("MONGO_URI unset", ""), ("Mongo unreachable", UNREACHABLE_MONGO_URI)]
+    if os.getenv("MONGO_URI"):
+        scenarios.append(("MONGO_URI from environment", os.environ["MONGO_URI"]))
+    print(f"{'scenario':<28} {'import s':>9} {'first response s':>17}   (median of {RUNS})")
+    for label, mongo_uri in scenarios:
+        import_s, first_s = measure(mongo_uri)
+        print(f"{label:<28} {import_s:>9.3f} {first_s:>17.3f}")
+
+if __name__ == '__main__':
+    main()
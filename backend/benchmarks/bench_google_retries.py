@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_google_retries.py
+# Worst-case latency of one Directions call under the retry policy (google_maps_service.
+# get_with_retries and its async twin), against a local stub server that misbehaves on purpose:
+# a stalled response, 5xx answers (fast, and just before the read timeout), and a refused port.
+# Prints how many attempts reached the stub and how long each client took; every call has to
+# finish within GOOGLE_HTTP_DEADLINE_SECONDS.
+#
+# Usage (from backend/):  MONGO_URI= GOOGLE_MAPS_API_KEY=test python -m benchmarks.bench_google_retries
+# The defaults take about a minute; for a quick run, scale the timeouts down, e.g.
+#   GOOGLE_HTTP_READ_TIMEOUT=2 GOOGLE_HTTP_DEADLINE_SECONDS=2.5 GOOGLE_HTTP_CONNECT_TIMEOUT=0.5 ...
+
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services import google_maps_service
+from services.google_maps_service import fetch_google_directions, GOOGLE_HTTP_READ_TIMEOUT, GOOGLE_HTTP_DEADLINE_SECONDS
+from services.async_route_service import fetch_google_directions_async, get_async_http_client, close_clients
+
+SCENARIOS = [
+    # (path, what the stub does, attempts expected with the default 2 retries)
+    ("/stall", "never answers within the read timeout", 1),
+    ("/error", "answers 503 at once", 3),
+    ("/slow-error", "answers 503 just before the read timeout", 1),
+    ("/ok", "answers 200 at once", 1),
+]
+attempts = {}
+attempts_lock = threading.Lock()
+
+class StubDirectionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        with attempts_lock:
+            attempts[path] = attempts.get(path, 0) + 1
+        if path == "/stall":
+            time.sleep(GOOGLE_HTTP_DEADLINE_SECONDS + 2)
+            return
+        if path == "/slow-error":
+            time.sleep(GOOGLE_HTTP_READ_TIMEOUT * 0.9)
+        body, status = (b'{"status": "OK", "routes": []}', 200) if path == "/ok" else (b"upstream unavailable", 503)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass # The client gave up first
+
+    def log_message(self, *args):
+        pass
+
+def closed_port():
+    """A local port with nothing listening, so connecting is refused."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def timed(call):
+    started = time.perf_counter()
+    try:
+        call()
+        outcome = "ok"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - started, outcome
+
+def run_sync():
+    return timed(lambda: fetch_google_directions({"origin": "a", "destination": "b"}))
+
+def run_async():
+    async def call():
+        get_async_http_client() # Created outside the timed call, like a warm worker's
+        started = time.perf_counter()
+        try:
+            await fetch_google_directions_async({"origin": "a", "destination": "b"})
+            outcome = "ok"
+        except Exception as e:
+            outcome = type(e).__name__
+        finally:
+            elapsed = time.perf_counter() - started
+            await close_clients()
+        return elapsed, outcome
+    return asyncio.run(call())
+
+def run_scenario(url, path):
+    google_maps_service.DIRECTIONS_API_URL = url
+    results = {}
+    for client, run in (("sync", run_sync), ("async", run_async)):
+        with attempts_lock:
+            attempts.pop(path, None)
+        elapsed, outcome = run()
+        results[client] = (elapsed, outcome, attempts.get(path, 0))
+    return results
+
+def main():
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubDirectionsHandler)
+    stub.daemon_threads = True
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    scenarios = [(f"{base_url}{path}", path, description, expected) for path, description, expected in SCENARIOS]
+    scenarios.append((f"http://127.0.0.1:{closed_port()}/refused", "/refused", "refuses the connection", 0))
+    print(f"Deadline {GOOGLE_HTTP_DEADLINE_SECONDS}s, read timeout {GOOGLE_HTTP_READ_TIMEOUT}s")
+    print(f"{'upstream':<44}{'client':>7}{'attempts':>10}{'seconds':>10}  outcome")
+    worst = 0.0
+    for url, path, description, expected in scenarios:
+        for client, (elapsed, outcome, seen) in run_scenario(url, path).items():
+            worst = max(worst, elapsed)
+            note = "" if expected == seen else f"  (expected {expected} attempts)"
+            print(f"{description:<44}{client:>7}{seen:>10}{elapsed:>10.2f}  {outcome}{note}")
+    stub.shutdown()
+    verdict = "within" if worst <= GOOGLE_HTTP_DEADLINE_SECONDS + 0.1 else "OVER"
+    print(f"Worst case {worst:.2f}s, {verdict} the {GOOGLE_HTTP_DEADLINE_SECONDS}s deadline")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/bench_json_compression.py
+# Microbenchmark: serialization CPU time (stdlib json vs orjson, via the Flask JSON providers) and
+# bytes on the wire (raw / gzip / brotli) for synthetic /api/route responses of increasing size.
+#
+# Usage (from backend/):  python -m benchmarks.bench_json_compression
+
+import random
+import timeit
+import polyline
+from flask import Flask
+from utils.compression import compress_body, brotli
+from utils.json_provider import MongoJSONProvider, OrjsonProvider, orjson
+
+STEP_COUNTS = [20, 100, 400] # Short walk, cross-town trip, long trip with alternatives-sized detail
+ROUTE_COUNT = 3 # Routes per response, as with alternatives=true
+REPEATS = 50
+
+def build_step(lat, lng):
+    points = [(lat + random.uniform(-0.001, 0.001), lng + random.uniform(-0.001, 0.001)) for _ in range(12)]
+    meters = random.randint(20, 400)
+    return {
+        "distance": {"text": f"{meters} m", "value": meters},
+        "duration": {"text": f"{meters // 80 + 1} mins", "value": meters * 3 // 4},
+        "start_location": {"lat": points[0][0], "lng": points[0][1]},
+        "end_location": {"lat": points[-1][0], "lng": points[-1][1]},
+        "html_instructions": "Turn <b>left</b> onto <b>Adeola Odeku Street</b><div style=\"font-size:0.9em\">Pass by the bank (on the right)</div>",
+        "maneuver": random.choice(["turn-left", "turn-right", "straight"]),
+        "polyline": {"points": polyline.encode(points)},
+        "travel_mode": "WALKING",
+    }
+
+def build_response(num_steps):
+    """Directions-shaped payload with our overlay annotations, as /api/route returns it."""
+    routes = []
+    for index in range(ROUTE_COUNT):
+        lat, lng = 6.5244, 3.3792
+        steps = []
+        for _ in range(num_steps):
+            lat += random.uniform(-0.002, 0.002)
+            lng += random.uniform(-0.002, 0.002)
+            steps.append(build_step(lat, lng))
+        warnings = [{
+            "id": f"{random.getrandbits(96):024x}", "type": random.choice(["hazard", "missing_curb_cut", "ramp"]),
+            "description": "Broken pavement near the junction", "severity": "medium",
+            "location": {"lat": lat, "lng": lng}, "distance_meters": round(random.uniform(1, 25), 2),
+        } for _ in range(num_steps // 10)]
+        routes.append({
+            "summary": f"Route {index}",
+            "bounds": {"northeast": {"lat": lat + 0.01, "lng": lng + 0.01}, "southwest": {"lat": lat - 0.01, "lng": lng - 0.01}},
+            "overview_polyline": {"points": polyline.encode([(step["end_location"]["lat"], step["end_location"]["lng"]) for step in steps])},
+            "legs": [{"steps": steps, "start_address": "Victoria Island, Lagos", "end_address": "Ikoyi, Lagos"}],
+            "warnings": [], "waypoint_order": [],
+            "custom_accessibility_warnings": warnings, "accessibility_score": len(warnings) * 5,
+        })
+    return {"status": "OK", "routes": routes, "custom_accessibility_warnings": routes[0]["custom_accessibility_warnings"]}
+
+def best_ms(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEATS)) * 1000
+
+def main():
+    random.seed(42)
+    app = Flask(__name__)
+    stdlib_provider = MongoJSONProvider(app)
+    orjson_provider = OrjsonProvider(app) if orjson is not None else None
+    if orjson_provider is None:
+        print("orjson is not installed; only the stdlib provider is measured.")
+
+    print(f"{'steps':>6} {'raw KB':>8} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8} "
+          f"{'gzip KB':>8} {'gzip ms':>8} {'br KB':>7} {'br ms':>7}")
+    for num_steps in STEP_COUNTS:
+        payload = build_response(num_steps)
+        body = stdlib_provider.dumps(payload).encode()
+
+        stdlib_ms = best_ms(lambda: stdlib_provider.dumps(payload))
+        orjson_ms = best_ms(lambda: orjson_provider.dumps(payload)) if orjson_provider else float('nan')
+        gzip_bytes = compress_body(body, 'gzip')
+        gzip_ms = best_ms(lambda: compress_body(body, 'gzip'))
+        br_bytes = compress_body(body, 'br') if brotli is not None else b''
+        br_ms = best_ms(lambda: compress_body(body, 'br')) if brotli is not None else float('nan')
+        print(f"{num_steps:>6} {len(body) / 1024:>8.1f} {stdlib_ms:>10.2f} {orjson_ms:>10.2f} {stdlib_ms / orjson_ms:>7.1f}x "
+              f"{len(gzip_bytes) / 1024:>8.1f} {gzip_ms:>8.2f} {len(br_bytes) / 1024:>7.1f} {br_ms:>7.2f}")
+
+if __name__ == '__main__':
+    main()
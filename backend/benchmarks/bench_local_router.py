@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_local_router.py
+# Queries per second of the local A* router on a city-sized walking graph.
+#
+# Usage (from backend/):  python -m benchmarks.bench_local_router [--graph graphs/city_walk.npz]
+# Without --graph a synthetic city is generated: a jittered street grid with ~90k intersections,
+# ~360k directed edges (about 24 km x 24 km), some stairs, and a few thousand hazards/ramps.
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from services.local_router import LocalRouter, FLAG_STAIRS
+from utils.helpers import haversine_meters_array
+
+ORIGIN = (6.5244, 3.3792) # Lagos, matches the frontend default map center
+GRID_SIZE = 300
+BLOCK_METERS = 80
+METERS_PER_DEGREE_LAT = 111320
+ACCESSIBILITY_POINTS = 3000
+ADDED_POINTS = 100
+QUERIES = 200
+TRIP_LENGTHS_KM = [1, 3, 8]
+
+def build_synthetic_graph(path):
+    rng = np.random.default_rng(42)
+    block_lat = BLOCK_METERS / METERS_PER_DEGREE_LAT
+    block_lng = block_lat / np.cos(np.radians(ORIGIN[0]))
+    rows, cols = np.divmod(np.arange(GRID_SIZE * GRID_SIZE), GRID_SIZE)
+    lats = ORIGIN[0] + rows * block_lat + rng.uniform(-0.2, 0.2, rows.size) * block_lat
+    lngs = ORIGIN[1] + cols * block_lng + rng.uniform(-0.2, 0.2, cols.size) * block_lng
+
+    node = np.arange(GRID_SIZE * GRID_SIZE).reshape(GRID_SIZE, GRID_SIZE)
+    pairs = np.concatenate([
+        np.column_stack((node[:, :-1].ravel(), node[:, 1:].ravel())),  # east-west streets
+        np.column_stack((node[:-1, :].ravel(), node[1:, :].ravel())),  # north-south streets
+    ])
+    pairs = pairs[rng.random(len(pairs)) > 0.05] # Some missing links, so routes aren't pure grid walks
+    sources = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    targets = np.concatenate((pairs[:, 1], pairs[:, 0]))
+    stairs = np.tile(rng.random(len(pairs)) < 0.02, 2)
+    names = np.concatenate([np.where(pairs[:, 0] // GRID_SIZE == pairs[:, 1] // GRID_SIZE,
+                                     pairs[:, 0] // GRID_SIZE, GRID_SIZE + pairs[:, 0] % GRID_SIZE)] * 2)
+
+    order = np.argsort(sources, kind='stable')
+    sources, targets = sources[order], targets[order].astype(np.int32)
+    offsets = np.zeros(lats.size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=lats.size), out=offsets[1:])
+    street_names = [f"Street {i}" for i in range(GRID_SIZE)] + [f"Avenue {i}" for i in range(GRID_SIZE)]
+    np.savez_compressed(
+        path, lat=lats, lng=lngs, offsets=offsets, targets=targets,
+        lengths=haversine_meters_array(lats[sources], lngs[sources], lats[targets], lngs[targets]).astype(np.float32),
+        flags=np.where(stairs[order], FLAG_STAIRS, 0).astype(np.uint8), names=names[order].astype(np.int32),
+        street_names=np.array(street_names, dtype=str),
+    )
+
+def random_points(router, count):
+    lats, lngs = router._graph.lats, router._graph.lngs
+    types = ['hazard', 'missing_curb_cut', 'ramp', 'elevator']
+    picks = random.sample(range(len(lats)), count)
+    return [(float(lats[i]), float(lngs[i]), random.choice(types), random.choice(['low', 'medium', 'high'])) for i in picks]
+
+def random_trip(router, length_km):
+    """Origin/destination 'lat,lng' strings about length_km apart (straight line) inside the graph."""
+    lats, lngs = router._graph.lats, router._graph.lngs
+    while True:
+        i = random.randrange(len(lats))
+        bearing = random.uniform(0, 2 * np.pi)
+        d_lat = length_km * 1000 * np.cos(bearing) / METERS_PER_DEGREE_LAT
+        d_lng = length_km * 1000 * np.sin(bearing) / (METERS_PER_DEGREE_LAT * np.cos(np.radians(lats[i])))
+        lat, lng = lats[i] + d_lat, lngs[i] + d_lng
+        if lats.min() <= lat <= lats.max() and lngs.min() <= lng <= lngs.max():
+            return {'origin': f"{lats[i]:.6f},{lngs[i]:.6f}", 'destination': f"{lat:.6f},{lng:.6f}",
+                    'mode': 'walking', 'avoid': 'stairs'}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--graph", help="Graph .npz built by scripts.build_walk_graph (default: synthetic city)")
+    args = parser.parse_args()
+    random.seed(42)
+
+    router = LocalRouter()
+    started = time.perf_counter()
+    if args.graph:
+        router.load_graph(args.graph)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synthetic_walk.npz")
+            build_synthetic_graph(path)
+            router.load_graph(path)
+    print(f"Graph load: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    started = time.perf_counter()
+    router.set_accessibility_points(random_points(router, ACCESSIBILITY_POINTS))
+    print(f"Applying {ACCESSIBILITY_POINTS} accessibility points: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # What POST /api/accessibility-points pays on the request thread
+    new_points = random_points(router, ADDED_POINTS)
+    started = time.perf_counter()
+    for lat, lng, point_type, severity in new_points:
+        router.add_point({"location": {"coordinates": [lng, lat]}, "type": point_type, "severity": severity})
+    print(f"Adding one point: {(time.perf_counter() - started) * 1000 / ADDED_POINTS:.2f} ms")
+
+    print(f"{'trip km':>8} {'queries':>8} {'QPS':>8} {'mean ms':>8} {'p95 ms':>8} {'routed':>7}")
+    for length_km in TRIP_LENGTHS_KM:
+        trips = [random_trip(router, length_km) for _ in range(QUERIES)]
+        timings, routed = [], 0
+        for params in trips:
+            started = time.perf_counter()
+            response = router.route(params)
+            timings.append(time.perf_counter() - started)
+            routed += response is not None
+        timings = np.array(timings) * 1000
+        print(f"{length_km:>8} {QUERIES:>8} {QUERIES / (timings.sum() / 1000):>8.1f} {timings.mean():>8.1f} "
+              f"{np.percentile(timings, 95):>8.1f} {routed:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_metrics.py
+# Hot-path cost of the Prometheus instrumentation (utils/metrics.py): one histogram observation,
+# one labelled counter increment, an LRUCache hit, and the per-request hooks (run directly in a
+# request context, as the test client's own overhead would drown them out), each in
+# single-process mode and in the multiprocess (mmap) mode used under gunicorn. Also times a
+# /metrics render.
+#
+# Usage (from backend/):  python -m benchmarks.bench_metrics
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, timeit
+from flask import Flask
+from utils.cache import LRUCache
+from utils.metrics import init_metrics, render_metrics, GOOGLE_API_RESPONSES, REQUEST_LATENCY
+
+def per_call_us(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+cache = LRUCache(max_bytes=1024 * 1024, name="bench_cache")
+cache.set("key", {"value": 1})
+
+def request_cycle(metrics):
+    app = Flask(__name__)
+    if metrics:
+        init_metrics(app)
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    def cycle():
+        with app.test_request_context('/ping'):
+            app.preprocess_request()
+            app.process_response(app.response_class('pong'))
+            app.do_teardown_request()
+    return cycle
+
+plain, instrumented = request_cycle(False), request_cycle(True)
+results = {
+    "histogram": per_call_us(lambda: REQUEST_LATENCY.labels("GET", "/bench", "200").observe(0.01), 100000),
+    "counter": per_call_us(lambda: GOOGLE_API_RESPONSES.labels("bench", "OK").inc(), 100000),
+    "cacheHit": per_call_us(lambda: cache.get("key"), 100000),
+    "requestPlain": per_call_us(plain, 5000, repeat=7),
+    "requestInstrumented": per_call_us(instrumented, 5000, repeat=7),
+}
+results["render"] = per_call_us(render_metrics, 200)
+print(json.dumps(results))
+"""
+
+def measure(multiproc_dir):
+    env = {key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"}
+    env["MONGO_URI"] = ""
+    if multiproc_dir:
+        env["PROMETHEUS_MULTIPROC_DIR"] = multiproc_dir
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="prometheus-bench-") as multiproc_dir:
+        modes = [("single process", measure(None)), ("multiprocess", measure(multiproc_dir))]
+    print(f"{'':<34}" + "".join(f"{label:>16}" for label, _ in modes))
+    rows = [
+        ("histogram observe (us)", "histogram"),
+        ("labelled counter inc (us)", "counter"),
+        ("LRUCache hit, with counters (us)", "cacheHit"),
+        ("request hooks, no metrics (us)", "requestPlain"),
+        ("request hooks, with metrics (us)", "requestInstrumented"),
+        ("/metrics render (us)", "render"),
+    ]
+    for label, key in rows:
+        print(f"{label:<34}" + "".join(f"{results[key]:>16.2f}" for _, results in modes))
+    for label, results in modes:
+        print(f"Per-request metrics overhead, {label}: {results['requestInstrumented'] - results['requestPlain']:.1f} us")
+
+if __name__ == '__main__':
+    main()
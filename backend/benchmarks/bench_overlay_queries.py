@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_overlay_queries.py
+# Compares the legacy per-point $nearSphere overlay with the single-query corridor overlay.
+#
+# Usage (from backend/):  MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_overlay_queries
+# Seeds a scratch database ('accessible_nav_bench') and drops it afterwards.
+
+import os
+import random
+import time
+from pymongo import MongoClient, monitoring
+from services import database_service
+from services.database_service import find_nearby_accessibility_issues, sample_route_points, OVERLAY_PER_POINT_MAX_QUERIES
+
+ORIGIN = (6.5244, 3.3792) # Lagos, matches the frontend default map center
+VERTEX_SPACING_METERS = 15
+METERS_PER_DEGREE_LAT = 111320
+ROUTE_LENGTHS_KM = [1, 10, 50]
+POINTS_PER_KM = 200
+REPEATS = 5
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (find + getMore == round trips for the overlay)."""
+    def __init__(self):
+        self.count = 0
+    def started(self, event):
+        if event.command_name in ('find', 'getMore'):
+            self.count += 1
+    def succeeded(self, event): pass
+    def failed(self, event): pass
+
+def build_route(length_km):
+    """Builds a gently zig-zagging eastbound route with a vertex every VERTEX_SPACING_METERS."""
+    lat, lng = ORIGIN
+    num_vertices = int(length_km * 1000 / VERTEX_SPACING_METERS)
+    step_deg = VERTEX_SPACING_METERS / METERS_PER_DEGREE_LAT
+    return [(lat + 0.002 * ((i // 200) % 2), lng + i * step_deg) for i in range(num_vertices)]
+
+def seed_points(collection, route, count):
+    """Scatters accessibility points within ~60 m of the route so some fall inside the corridor."""
+    jitter = 60 / METERS_PER_DEGREE_LAT
+    docs = []
+    for _ in range(count):
+        lat, lng = random.choice(route)
+        docs.append({
+            "location": {"type": "Point", "coordinates": [lng + random.uniform(-jitter, jitter), lat + random.uniform(-jitter, jitter)]},
+            "type": random.choice(['ramp', 'hazard', 'missing_curb_cut']),
+            "description": "benchmark point",
+        })
+    collection.insert_many(docs)
+
+def run(mode, route, counter):
+    counter.count = 0
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        issues = find_nearby_accessibility_issues(route, mode=mode)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / REPEATS
+    return issues, counter.count // REPEATS, elapsed_ms
+
+def main():
+    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    counter = RoundTripCounter()
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000, event_listeners=[counter])
+    db = client.accessible_nav_bench
+    database_service.db = db
+    random.seed(42)
+
+    try:
+        print(f"{'route':>8} {'mode':>10} {'round trips':>12} {'wall ms':>10} {'issues':>8}")
+        for length_km in ROUTE_LENGTHS_KM:
+            db.accessibility_points.drop()
+            db.accessibility_points.create_index([("location", "2dsphere")], name="location_2dsphere")
+            route = build_route(length_km)
+            seed_points(db.accessibility_points, route, length_km * POINTS_PER_KM)
+
+            results = {}
+            for mode in ('per_point', 'corridor'):
+                issues, round_trips, elapsed_ms = run(mode, route, counter)
+                results[mode] = [issue['_id'] for issue in issues]
+                print(f"{length_km:>6}km {mode:>10} {round_trips:>12} {elapsed_ms:>10.1f} {len(issues):>8}")
+            if len(sample_route_points(route)) <= OVERLAY_PER_POINT_MAX_QUERIES:
+                if results['per_point'] != results['corridor']:
+                    print(f"  WARNING: corridor results differ from per-point results on the {length_km} km route")
+            elif not set(results['per_point']) <= set(results['corridor']):
+                # Past its query budget the per-point loop samples more sparsely, so it finds a subset
+                print(f"  WARNING: per-point found issues the corridor missed on the {length_km} km route")
+    finally:
+        client.drop_database('accessible_nav_bench')
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# backend/benchmarks/bench_polyline_decode.py
+# Microbenchmark: polyline.decode vs the NumPy decoder in utils.helpers, plus distance resampling.
+#
+# Usage (from backend/):  python -m benchmarks.bench_polyline_decode
+
+import random
+import timeit
+import numpy as np
+import polyline
+from utils.helpers import decode_google_polyline, decode_polyline_array, resample_route
+
+VERTEX_COUNTS = [10_000, 50_000, 200_000]
+REPEATS = 20
+OVERLAY_RADIUS_METERS = 25
+
+def build_encoded_route(num_vertices):
+    """Random walk with city-like vertex spacing (a few meters to ~100 m between vertices)."""
+    lat, lng = 6.5244, 3.3792
+    points = []
+    for _ in range(num_vertices):
+        lat += random.uniform(-0.0008, 0.0008)
+        lng += random.uniform(-0.0008, 0.0008)
+        points.append((lat, lng))
+    return polyline.encode(points)
+
+def best_ms(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEATS)) * 1000
+
+def main():
+    random.seed(42)
+    print(f"{'vertices':>9} {'polyline ms':>12} {'helpers list ms':>16} {'numpy ms':>9} {'speedup':>8} {'resample ms':>12} {'samples':>8}")
+    for num_vertices in VERTEX_COUNTS:
+        encoded = build_encoded_route(num_vertices)
+        assert np.array_equal(decode_polyline_array(encoded), np.array(polyline.decode(encoded)))
+
+        polyline_ms = best_ms(lambda: polyline.decode(encoded))
+        helpers_ms = best_ms(lambda: decode_google_polyline(encoded))
+        numpy_ms = best_ms(lambda: decode_polyline_array(encoded))
+        decoded = decode_polyline_array(encoded)
+        resample_ms = best_ms(lambda: resample_route(decoded, OVERLAY_RADIUS_METERS))
+        samples = len(resample_route(decoded, OVERLAY_RADIUS_METERS))
+        print(f"{num_vertices:>9} {polyline_ms:>12.2f} {helpers_ms:>16.2f} {numpy_ms:>9.2f} {polyline_ms / numpy_ms:>7.1f}x {resample_ms:>12.2f} {samples:>8}")
+
+if __name__ == '__main__':
+    main()
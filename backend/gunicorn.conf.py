@@ -0,0 +1,25 @@
+# backend/gunicorn.conf.py
+# Read automatically by 'gunicorn app:app' (Procfile) from the working directory.
+#
+# Prometheus multiprocess mode: every worker writes its metrics to files in
+# PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them (utils/metrics.py). The directory must
+# be set before any worker imports prometheus_client, and must start out empty.
+
+import glob
+import os
+import tempfile
+
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-multiproc-")
+
+
+def on_starting(server):
+    """Drops metric files left by a previous run in a reused directory."""
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    """Stops counting a dead worker's live gauges (its counters and histograms are kept)."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
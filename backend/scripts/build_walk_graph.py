@@ -0,0 +1,114 @@
+# backend/scripts/build_walk_graph.py
+# Converts an OpenStreetMap XML extract (.osm, optionally .gz/.bz2) into the compact walking
+# graph loaded by services/local_router.py.
+#
+# Usage (from backend/):  python -m scripts.build_walk_graph city.osm.bz2 graphs/city_walk.npz
+#
+# Output arrays (CSR adjacency, both directions of every walkable way segment):
+#   lat, lng        float64 [nodes]
+#   offsets         int64   [nodes + 1]  edges of node i are offsets[i]:offsets[i + 1]
+#   targets         int32   [edges]
+#   lengths         float32 [edges]      meters
+#   flags           uint8   [edges]      bit 0: stairs
+#   names           int32   [edges]      index into street_names, -1 if unnamed
+#   street_names    str     [names]
+
+import argparse
+import bz2
+import gzip
+import xml.etree.ElementTree as ET
+import numpy as np
+from services.local_router import FLAG_STAIRS
+from utils.helpers import haversine_meters_array
+
+WALKABLE_HIGHWAYS = {
+    'footway', 'pedestrian', 'path', 'living_street', 'residential', 'service', 'unclassified',
+    'tertiary', 'tertiary_link', 'secondary', 'secondary_link', 'primary', 'primary_link',
+    'steps', 'corridor', 'track', 'crossing', 'cycleway',
+}
+NO_ACCESS = {'no', 'private'}
+
+def open_extract(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def is_walkable(tags):
+    if tags.get('highway') not in WALKABLE_HIGHWAYS:
+        return False
+    if tags.get('foot') in NO_ACCESS or (tags.get('access') in NO_ACCESS and tags.get('foot') not in ('yes', 'designated')):
+        return False
+    return tags.get('sidewalk') != 'no' or tags.get('highway') in ('residential', 'living_street', 'service')
+
+def read_extract(path):
+    """Returns ({osm node id: (lat, lng)}, [(node ids, name, is_stairs), ...]) for walkable ways."""
+    coordinates, ways = {}, []
+    with open_extract(path) as source:
+        for _, element in ET.iterparse(source, events=('end',)):
+            if element.tag == 'node':
+                coordinates[int(element.get('id'))] = (float(element.get('lat')), float(element.get('lon')))
+                element.clear()
+            elif element.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                if is_walkable(tags):
+                    node_ids = [int(nd.get('ref')) for nd in element.iter('nd')]
+                    ways.append((node_ids, tags.get('name'), tags.get('highway') == 'steps'))
+                element.clear()
+    return coordinates, ways
+
+def build_graph(coordinates, ways):
+    node_index, lats, lngs = {}, [], []
+    street_names, name_index = [], {}
+    sources, targets, flags, names = [], [], [], []
+
+    def index_of(osm_id):
+        if osm_id not in node_index:
+            node_index[osm_id] = len(lats)
+            lat, lng = coordinates[osm_id]
+            lats.append(lat)
+            lngs.append(lng)
+        return node_index[osm_id]
+
+    for node_ids, name, is_stairs in ways:
+        node_ids = [osm_id for osm_id in node_ids if osm_id in coordinates] # Clipped extracts drop some nodes
+        if name is not None and name not in name_index:
+            name_index[name] = len(street_names)
+            street_names.append(name)
+        for a, b in zip(node_ids, node_ids[1:]):
+            u, v = index_of(a), index_of(b)
+            if u == v:
+                continue
+            for source, target in ((u, v), (v, u)):
+                sources.append(source)
+                targets.append(target)
+                flags.append(FLAG_STAIRS if is_stairs else 0)
+                names.append(name_index[name] if name is not None else -1)
+
+    lats, lngs = np.array(lats), np.array(lngs)
+    sources, targets = np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int32)
+    order = np.argsort(sources, kind='stable')
+    sources, targets = sources[order], targets[order]
+    offsets = np.zeros(len(lats) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(lats)), out=offsets[1:])
+    lengths = haversine_meters_array(lats[sources], lngs[sources], lats[targets], lngs[targets]).astype(np.float32)
+    return {
+        "lat": lats, "lng": lngs, "offsets": offsets, "targets": targets, "lengths": lengths,
+        "flags": np.array(flags, dtype=np.uint8)[order], "names": np.array(names, dtype=np.int32)[order],
+        "street_names": np.array(street_names, dtype=str),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local router's walking graph from an OSM XML extract.")
+    parser.add_argument("extract", help="Path to .osm, .osm.gz or .osm.bz2")
+    parser.add_argument("output", help="Path of the .npz graph to write")
+    args = parser.parse_args()
+
+    coordinates, ways = read_extract(args.extract)
+    graph = build_graph(coordinates, ways)
+    np.savez_compressed(args.output, **graph)
+    print(f"Wrote {len(graph['lat'])} nodes, {len(graph['targets'])} edges, {len(graph['street_names'])} street names to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# backend/scripts/migrate_route_storage.py
+# Rewrites saved routes that still hold a raw 'googleRouteData' into the compact storage format
+# (services/route_storage.py) and reports the storage and read-latency change.
+#
+# The raw 'googleRouteData' is kept next to the compact fields until a run with --drop-original,
+# which removes it only from documents whose stored compact copy decodes back to exactly the
+# original. So: migrate, check the app, then run again with --drop-original to reclaim the space.
+# Routes already compact in format 2 (one compressed blob) are rewritten into the current format.
+#
+# Usage (from backend/):  python -m scripts.migrate_route_storage [--dry-run] [--drop-original] [--batch-size 500] [--sample 200]
+# Reads MONGO_URI from the environment / .env like app.py. Safe to re-run: migrated documents are skipped.
+
+import argparse
+import os
+import random
+import statistics
+import time
+import bson
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from services.route_storage import pack_route_data, unpack_route_data, STORAGE_FIELDS, STORAGE_FORMAT
+
+LEGACY_QUERY = {"googleRouteData": {"$exists": True}, "storageFormat": {"$exists": False}}
+# Migrated, with the original still kept alongside
+MIGRATED_WITH_ORIGINAL_QUERY = {"googleRouteData": {"$exists": True}, "storageFormat": {"$exists": True}}
+FORMAT_2_QUERY = {"storageFormat": 2}
+
+def round_trips(compact_fields, original):
+    """True if the compact fields decode back to exactly the original payload."""
+    return unpack_route_data(dict(compact_fields), full=True).get("googleRouteData") == original
+
+def drop_originals(routes, batch_size, dry_run):
+    """Unsets the raw payload on migrated documents whose stored compact copy round-trips. Returns (dropped, kept)."""
+    dropped = kept = 0
+    batch = []
+    for doc in routes.find(MIGRATED_WITH_ORIGINAL_QUERY):
+        compact_fields = {key: doc[key] for key in STORAGE_FIELDS if key in doc}
+        if not round_trips(compact_fields, doc["googleRouteData"]):
+            print(f"Keeping the original on route {doc['_id']}: its compact copy doesn't decode back to it.")
+            kept += 1
+            continue
+        # Only if the compact copy checked above is still the stored one
+        batch.append(UpdateOne({"_id": doc["_id"], **compact_fields}, {"$unset": {"googleRouteData": ""}}))
+        if len(batch) >= batch_size:
+            dropped += len(batch) if dry_run else routes.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        dropped += len(batch) if dry_run else routes.bulk_write(batch, ordered=False).modified_count
+    return dropped, kept
+
+def upgrade_format_2(routes, batch_size, dry_run):
+    """Rewrites format 2 documents (both parts in one blob) into the current format. Returns (upgraded, skipped)."""
+    upgraded = skipped = 0
+    batch = []
+    for doc in routes.find(FORMAT_2_QUERY, {key: 1 for key in STORAGE_FIELDS}):
+        original = unpack_route_data(dict(doc), full=True)["googleRouteData"]
+        packed = pack_route_data(original)
+        if not round_trips(packed, original):
+            print(f"Leaving route {doc['_id']} in format 2: its payload doesn't survive the current format unchanged.")
+            skipped += 1
+            continue
+        # Only if the blob read above is still the stored one
+        batch.append(UpdateOne({"_id": doc["_id"], **FORMAT_2_QUERY, "googleRouteDataCompressed": doc["googleRouteDataCompressed"]},
+                               {"$set": packed, "$unset": {"googleRouteDataCompressed": ""}}))
+        if len(batch) >= batch_size:
+            upgraded += len(batch) if dry_run else routes.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        upgraded += len(batch) if dry_run else routes.bulk_write(batch, ordered=False).modified_count
+    return upgraded, skipped
+
+def report_dropped(dropped, kept, dry_run):
+    verb = "Would drop" if dry_run else "Dropped"
+    print(f"{verb} the raw googleRouteData on {dropped} migrated routes; kept it on {kept} that didn't round-trip.")
+
+def read_latency_ms(collection, ids):
+    """Per-document time to fetch and decode a full route, as GET /api/routes/<id> does."""
+    timings = []
+    for route_id in ids:
+        started = time.perf_counter()
+        unpack_route_data(collection.find_one({"_id": route_id}))
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def collection_sizes(db, name):
+    stats = db.command("collStats", name)
+    return stats.get("size", 0), stats.get("storageSize", 0)
+
+def describe_latency(label, timings):
+    if not timings:
+        return f"{label}: no samples"
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    return f"{label}: median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms over {len(timings)} reads"
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate saved routes to the compact googleRouteData format.")
+    parser.add_argument("--dry-run", action="store_true", help="Measure the size change without writing")
+    parser.add_argument("--drop-original", action="store_true",
+                        help="Remove the raw googleRouteData from migrated routes whose compact copy round-trips")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=200, help="Documents to time reads on, before and after")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoClient(os.getenv("MONGO_URI"), serverSelectionTimeoutMS=5000)
+    db = client.accessible_nav_db
+    routes = db.routes
+
+    upgraded, not_upgraded = upgrade_format_2(routes, args.batch_size, args.dry_run)
+    if upgraded or not_upgraded:
+        print(f"{'Would rewrite' if args.dry_run else 'Rewrote'} {upgraded} format 2 routes into format {STORAGE_FORMAT}"
+              f"{f'; left {not_upgraded} unchanged' if not_upgraded else ''}.")
+
+    legacy_ids = [doc["_id"] for doc in routes.find(LEGACY_QUERY, {"_id": 1})]
+    print(f"{len(legacy_ids)} saved routes to migrate.")
+    if not legacy_ids:
+        if args.drop_original:
+            report_dropped(*drop_originals(routes, args.batch_size, args.dry_run), args.dry_run)
+        return
+    sample_ids = random.sample(legacy_ids, min(args.sample, len(legacy_ids)))
+    size_before, storage_before = collection_sizes(db, "routes")
+    latency_before = read_latency_ms(routes, sample_ids)
+
+    bytes_before = bytes_after = migrated = skipped = 0
+    batch = []
+    for doc in routes.find(LEGACY_QUERY):
+        packed = pack_route_data(doc["googleRouteData"])
+        if not round_trips(packed, doc["googleRouteData"]):
+            print(f"Skipping route {doc['_id']}: its payload doesn't survive the compact format unchanged.")
+            skipped += 1
+            continue
+        bytes_before += len(bson.encode(doc))
+        compact_doc = {**{k: v for k, v in doc.items() if k != "googleRouteData"}, **packed}
+        bytes_after += len(bson.encode(compact_doc))
+        # Filter on the legacy shape again so a concurrent re-save isn't overwritten
+        batch.append(UpdateOne({"_id": doc["_id"], **LEGACY_QUERY}, {"$set": packed}))
+        if len(batch) >= args.batch_size:
+            if not args.dry_run:
+                migrated += routes.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch and not args.dry_run:
+        migrated += routes.bulk_write(batch, ordered=False).modified_count
+
+    measured = max(1, len(legacy_ids) - skipped)
+    print(f"Document bytes (BSON), once originals are dropped: {bytes_before:,} -> {bytes_after:,} "
+          f"({100 * (1 - bytes_after / max(bytes_before, 1)):.1f}% smaller, "
+          f"{bytes_before / measured:,.0f} -> {bytes_after / measured:,.0f} per route)")
+    if skipped:
+        print(f"Skipped {skipped} routes; they keep their raw googleRouteData.")
+    print(describe_latency("Read latency before", latency_before))
+    if args.dry_run:
+        if args.drop_original:
+            report_dropped(*drop_originals(routes, args.batch_size, args.dry_run), args.dry_run)
+        print("Dry run: no documents written.")
+        return
+
+    print(f"Migrated {migrated} routes.")
+    if args.drop_original:
+        report_dropped(*drop_originals(routes, args.batch_size, args.dry_run), args.dry_run)
+    else:
+        print("Raw googleRouteData kept on migrated routes; re-run with --drop-original once verified.")
+    size_after, storage_after = collection_sizes(db, "routes")
+    print(f"Collection data size: {size_before:,} -> {size_after:,} bytes")
+    print(f"Collection storage size: {storage_before:,} -> {storage_after:,} bytes "
+          "(WiredTiger reuses freed space; run 'compact' to return it to the OS)")
+    print(describe_latency("Read latency after", read_latency_ms(routes, sample_ids)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# backend/services/async_route_service.py
+# asyncio building blocks for the non-blocking /api/route pipeline served from asgi.py:
+# a pooled async HTTP client for Google Directions and an async MongoDB client whose
+# corridor queries run concurrently. Request parsing, caching and response shaping are
+# shared with the sync path in app.py.
+
+import asyncio
+import os
+import time
+import httpx
+from pymongo import AsyncMongoClient
+from services import google_maps_service
+from services.database_service import (
+    build_corridor_query, chunk_corridor_points, rank_corridor_issues, OVERLAY_PROJECTION, CORRIDOR_BATCH_SIZE,
+    MONGO_DB_NAME, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
+from services.google_maps_service import (
+    GoogleMapsAPIError, GOOGLE_HTTP_POOL_SIZE, GOOGLE_HTTP_MAX_RETRIES, GOOGLE_HTTP_CONNECT_TIMEOUT,
+    GOOGLE_HTTP_READ_TIMEOUT, GOOGLE_HTTP_DEADLINE_SECONDS, GOOGLE_HTTP_MIN_ATTEMPT_SECONDS,
+    RETRY_STATUS_CODES, retry_backoff,
+)
+from services.overlay_service import overlay_request, overlay_cache, overlay_versions, OVERLAY_RADIUS_METERS
+from services.spatial_index import accessibility_index
+from utils.cache import AsyncSingleFlight
+from utils.metrics import mongo_call_site, mongo_event_listeners, observe_google_call, OVERLAY_ISSUES
+from utils.timing import span
+
+MONGO_URI = os.getenv("MONGO_URI")
+# Sampled corridor points are split into at least this many $or queries, issued concurrently
+OVERLAY_ASYNC_QUERY_CHUNKS = int(os.getenv("OVERLAY_ASYNC_QUERY_CHUNKS", "4"))
+
+_http_client = None
+_mongo_client = None
+overlay_flights_async = AsyncSingleFlight()
+
+def get_async_http_client():
+    """Shared keep-alive client for the running event loop."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=GOOGLE_HTTP_POOL_SIZE * 10, max_keepalive_connections=GOOGLE_HTTP_POOL_SIZE),
+            timeout=httpx.Timeout(GOOGLE_HTTP_READ_TIMEOUT, connect=GOOGLE_HTTP_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+def get_async_db():
+    """Async MongoDB handle (same database as app.py), or None if MONGO_URI is not set."""
+    global _mongo_client
+    if not MONGO_URI:
+        return None
+    if _mongo_client is None:
+        _mongo_client = AsyncMongoClient(
+            MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS, event_listeners=mongo_event_listeners(),
+        )
+    return _mongo_client[MONGO_DB_NAME]
+
+async def close_clients():
+    global _http_client, _mongo_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _mongo_client is not None:
+        await _mongo_client.close()
+        _mongo_client = None
+
+async def fetch_google_directions_async(params):
+    """
+    Async equivalent of google_maps_service.fetch_google_directions (same retry policy and deadline).
+    Raises GoogleMapsAPIError on non-OK status, httpx.TimeoutException / httpx.HTTPError on failure.
+    """
+    if not google_maps_service.GOOGLE_MAPS_API_KEY:
+        raise ValueError("Missing Google Maps API Key environment variable.")
+    params = {**params, 'key': google_maps_service.GOOGLE_MAPS_API_KEY}
+
+    started = time.perf_counter()
+    status = 'error' # Outcome label for the metrics, as in the sync client
+    try:
+        attempt = 0
+        while True:
+            # Same policy as google_maps_service.get_with_retries: failed connects and 5xx are
+            # retried, read timeouts are not, and every attempt fits in the overall deadline
+            remaining = GOOGLE_HTTP_DEADLINE_SECONDS - (time.perf_counter() - started)
+            timeout = httpx.Timeout(min(GOOGLE_HTTP_READ_TIMEOUT, remaining), connect=min(GOOGLE_HTTP_CONNECT_TIMEOUT, remaining))
+            error = None
+            try:
+                response = await get_async_http_client().get(google_maps_service.DIRECTIONS_API_URL, params=params, timeout=timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                error = e
+            except httpx.TimeoutException:
+                status = 'timeout'
+                raise
+            except httpx.TransportError:
+                status = 'connection_error'
+                raise
+            backoff = retry_backoff(attempt)
+            if attempt == GOOGLE_HTTP_MAX_RETRIES or GOOGLE_HTTP_DEADLINE_SECONDS - (time.perf_counter() - started) - backoff < GOOGLE_HTTP_MIN_ATTEMPT_SECONDS:
+                if error is not None:
+                    status = 'timeout' if isinstance(error, httpx.TimeoutException) else 'connection_error'
+                    raise error
+                break
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+        if response.is_error:
+            status = f"http_{response.status_code}"
+        response.raise_for_status()
+        data = response.json()
+        status = data['status']
+        if data['status'] != 'OK':
+            print(f"Google Directions API Error: {data['status']} - {data.get('error_message', '')}")
+            raise GoogleMapsAPIError(data['status'], data.get('error_message'))
+        return data
+    finally:
+        observe_google_call('directions', status, time.perf_counter() - started)
+
+async def find_issues_near_points_async(points_to_check, radius_meters=OVERLAY_RADIUS_METERS):
+    """Corridor overlay with the sampled points split into concurrent $or queries."""
+    if not points_to_check:
+        return []
+    if accessibility_index.is_ready():
+        found_issues = accessibility_index.find_near_route(points_to_check, radius_meters)
+        OVERLAY_ISSUES.labels("spatial_index").observe(len(found_issues))
+        return found_issues
+    db = get_async_db()
+    if db is None:
+        return []
+
+    chunks = chunk_corridor_points(points_to_check, min_chunks=OVERLAY_ASYNC_QUERY_CHUNKS)
+    with mongo_call_site("overlay.corridor_async"): # gather's tasks copy the label with the context
+        results = await asyncio.gather(*(
+            db.accessibility_points.find(build_corridor_query(chunk, radius_meters), OVERLAY_PROJECTION)
+                .batch_size(CORRIDOR_BATCH_SIZE).to_list()
+            for chunk in chunks
+        ), return_exceptions=True)
+    issues = []
+    for chunk_number, (chunk, chunk_issues) in enumerate(zip(chunks, results), 1):
+        if isinstance(chunk_issues, Exception): # Keep the other chunks' hazards
+            print(f"Error querying accessibility points along route corridor (async) "
+                  f"(chunk {chunk_number} of {len(chunks)}, sampled points {chunk[0]} to {chunk[-1]}): {chunk_issues}")
+            continue
+        issues.extend(chunk_issues)
+    # Neighbouring chunks overlap at their edges; rank_corridor_issues drops the duplicates
+    found_issues = rank_corridor_issues(issues, points_to_check, radius_meters)
+    OVERLAY_ISSUES.labels("mongo").observe(len(found_issues))
+    return found_issues
+
+async def get_route_overlay_async(route_data, radius_meters=OVERLAY_RADIUS_METERS, route_index=0):
+    """Async counterpart of overlay_service.get_route_overlay, sharing its cache and version keys."""
+    await asyncio.to_thread(overlay_versions.sync) # May query Mongo; keep it off the event loop
+    overlay_key, points_to_check = overlay_request(route_data, radius_meters, route_index)
+    if overlay_key is None:
+        return []
+    cached_warnings = overlay_cache.get(overlay_key)
+    if cached_warnings is not None:
+        return cached_warnings
+
+    async def compute():
+        with span("overlay_query"):
+            warnings = await find_issues_near_points_async(points_to_check, radius_meters)
+        overlay_cache.set(overlay_key, warnings)
+        return warnings
+
+    return await overlay_flights_async.do(overlay_key, compute)
@@ -0,0 +1,95 @@
+# backend/services/cache_store.py
+# Second-tier (shared) cache backends used behind the per-worker LRU cache.
+# Stores hold opaque compressed payloads; serialization/compression lives in utils.cache.TieredCache.
+#
+# Every store implements:
+#   get(key) -> bytes | None          (None if missing or expired)
+#   set_many([(key, payload, expires_at_epoch_seconds), ...])
+#   delete(key)
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from bson import Binary
+from utils.metrics import mongo_call_site
+
+class MongoCacheStore:
+    """Shared across workers and hosts. Expiry is enforced by a TTL index on 'expiresAt'."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        # Mongo's TTL monitor runs about once a minute, so get() also filters on expiresAt
+        return self.collection.create_index([("expiresAt", 1)], name="expiresAt_ttl", expireAfterSeconds=0)
+
+    def get(self, key):
+        with mongo_call_site(f"cache_store.{self.collection.name}"):
+            doc = self.collection.find_one(
+                {"_id": key, "expiresAt": {"$gt": datetime.now(timezone.utc)}}, {"payload": 1}
+            )
+        return bytes(doc["payload"]) if doc else None
+
+    def set_many(self, items):
+        from pymongo import ReplaceOne
+        requests = [
+            ReplaceOne(
+                {"_id": key},
+                {"_id": key, "payload": Binary(payload), "expiresAt": datetime.fromtimestamp(expires_at, timezone.utc)},
+                upsert=True,
+            )
+            for key, payload, expires_at in items
+        ]
+        if requests:
+            with mongo_call_site(f"cache_store.{self.collection.name}"):
+                self.collection.bulk_write(requests, ordered=False)
+
+    def delete(self, key):
+        with mongo_call_site(f"cache_store.{self.collection.name}"):
+            self.collection.delete_one({"_id": key})
+
+
+class SQLiteCacheStore:
+    """Local on-disk store shared by the gunicorn workers of one host; survives restarts/deploys."""
+
+    PURGE_INTERVAL_SECONDS = 300
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local() # sqlite3 connections must not be shared across threads
+        self._last_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL") # Concurrent readers while another worker writes
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT payload FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, items):
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO cache (key, payload, expires_at) VALUES (?, ?, ?)", items)
+            if now - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                self._last_purge = now
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
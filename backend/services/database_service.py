@@ -1,20 +1,147 @@
-# Note: This requires access to the 'db' object, often initialized in app.py.
-# How 'db' is passed here depends on your application structure (e.g., global, app context, dependency injection).
-# For simplicity, this example assumes 'db' can be imported or accessed globally.
+# MongoDB access for the app and the service layer. get_db() connects lazily, once per process:
+# MongoClient(connect=False) doesn't touch the network until the first operation and reconnects
+# on its own, so worker boot never waits on the cluster and a brief outage only fails the
+# requests made during it. Index creation is a separate one-off step (ensure_indexes, run via
+# 'flask --app app create-indexes').
 
-# from ..app import db # Example import (adjust path)
+import os
+import threading
+import numpy as np
 from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from services.cache_store import MongoCacheStore
+from utils.helpers import haversine_meters_array, resample_route, EARTH_RADIUS_METERS
+from services.spatial_index import accessibility_index
+from utils.metrics import mongo_call_site, mongo_event_listeners, OVERLAY_ISSUES
 
-db = None # Placeholder - needs to be initialized/passed correctly
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "accessible_nav_db")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
 
-def find_nearby_accessibility_issues(route_points_decoded, radius_meters=25):
+db = None # This process's database handle, created by get_db() (or assigned directly, e.g. a test database)
+_db_pid = None
+_db_lock = threading.Lock()
+
+# 'corridor' fetches every hazard along the route in one query, 'per_point' is the legacy $nearSphere loop.
+# When the in-process spatial index is loaded it is used instead, unless a mode is passed explicitly.
+OVERLAY_QUERY_MODE = os.getenv("OVERLAY_QUERY_MODE", "corridor")
+# Route points are sampled by distance: one every radius * factor meters (1.0 keeps the circles overlapping)
+OVERLAY_SAMPLE_SPACING_FACTOR = float(os.getenv("OVERLAY_SAMPLE_SPACING_FACTOR", "1.0"))
+# Circles per corridor $or; longer routes are split into several queries rather than sampled
+# more sparsely, which would leave gaps between the circles
+CORRIDOR_MAX_CLAUSES = int(os.getenv("CORRIDOR_MAX_CLAUSES", "500"))
+# The per-point loop costs one round trip per sample, so it keeps the old budget of ~100 queries:
+# past that, long routes are checked at wider spacing (leaving gaps) instead of with more queries
+OVERLAY_PER_POINT_MAX_QUERIES = int(os.getenv("OVERLAY_PER_POINT_MAX_QUERIES", "100"))
+OVERLAY_PROJECTION = {"_id": 1, "type": 1, "description": 1, "severity": 1, "location": 1}
+CORRIDOR_BATCH_SIZE = 1000 # Large first batch so typical corridors come back in a single round trip
+RANK_MATRIX_MAX_CELLS = 1 << 20 # Issue x sample distances computed at once when ranking (~8 MB of float64)
+# Materialized map tile clusters (services/tile_service.py), read by cell level and x/y ranges
+TILE_CLUSTERS_INDEX = [("z", 1), ("x", 1), ("y", 1)]
+TILE_CLUSTERS_INDEX_NAME = "tile_clusters_z_1_x_1_y_1"
+
+def get_db():
+    """The shared database handle, or None if MONGO_URI is not set. Never blocks on the network."""
+    global db, _db_pid
+    # A handle assigned directly (_db_pid None) is used as-is; ours is recreated after a fork
+    if db is not None and _db_pid in (None, os.getpid()):
+        return db
+    if not MONGO_URI:
+        return None
+    with _db_lock:
+        if db is None or _db_pid not in (None, os.getpid()):
+            client = MongoClient(
+                MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS, connect=False,
+                event_listeners=mongo_event_listeners(), # Per-command latency by call site (utils/metrics.py)
+            )
+            db, _db_pid = client[MONGO_DB_NAME], os.getpid()
+    return db
+
+def ensure_indexes(database):
+    """Creates the app's indexes (idempotent). Returns the index names."""
+    return [
+        # Geospatial index for accessibility points
+        database.accessibility_points.create_index([("location", "2dsphere")], name="location_2dsphere"),
+        # Compound index for the keyset-paginated saved routes listing (also serves plain userId lookups)
+        database.routes.create_index([("userId", 1), ("createdAt", -1), ("_id", -1)], name="routes_userId_1_createdAt_-1__id_-1"),
+        # Index user ID for faster preference lookups (using placeholder name)
+        database.users.create_index([("userId", 1)], name="users_userId_1"),
+        database.tile_clusters.create_index(TILE_CLUSTERS_INDEX, name=TILE_CLUSTERS_INDEX_NAME),
+        # Shared cache tiers: expiry by TTL index
+        MongoCacheStore(database.route_cache).ensure_indexes(),
+        MongoCacheStore(database.geocode_cache).ensure_indexes(),
+    ]
+
+# Indexes older versions created that ensure_indexes() now covers with a compound index:
+# routes {userId: 1} is a prefix of the saved routes listing index
+SUPERSEDED_INDEXES = [("routes", "routes_userId_1"), ("routes", "userId_1")]
+INDEX_NOT_FOUND = 27
+
+def drop_superseded_indexes(database):
+    """Drops SUPERSEDED_INDEXES so writes stop maintaining them. Returns the names actually dropped."""
+    dropped = []
+    for collection_name, index_name in SUPERSEDED_INDEXES:
+        try:
+            database[collection_name].drop_index(index_name)
+            dropped.append(index_name)
+        except OperationFailure as e:
+            if e.code != INDEX_NOT_FOUND and "index not found" not in str(e):
+                raise
+    return dropped
+
+def sample_route_points(route_points_decoded, radius_meters=25):
+    """
+    Resamples the route to evenly spaced [lat, lng] points so the check circles cover it without gaps.
+    The spacing never widens with route length, so long routes just get more points.
+    """
+    spacing_meters = radius_meters * OVERLAY_SAMPLE_SPACING_FACTOR
+    return resample_route(route_points_decoded, spacing_meters).tolist()
+
+def thin_route_points(points_to_check, max_points):
+    """At most max_points of the sampled points, evenly spread along the route, both ends included."""
+    if len(points_to_check) <= max_points:
+        return points_to_check
+    indexes = np.linspace(0, len(points_to_check) - 1, max(2, max_points)).round().astype(int)
+    return [points_to_check[i] for i in indexes]
+
+def _format_issue(issue):
+    """Converts a raw accessibility point document into the overlay response shape."""
+    issue['_id'] = str(issue['_id']) # Convert ObjectId for JSON
+    # Add lat/lng for easier frontend use
+    issue['lat'] = issue['location']['coordinates'][1]
+    issue['lng'] = issue['location']['coordinates'][0]
+    # del issue['location'] # Optional cleanup
+    return issue
+
+def find_nearby_accessibility_issues(route_points_decoded, radius_meters=25, mode=None):
     """ Finds accessibility points near a list of route coordinates from MongoDB """
-    if not db or not route_points_decoded: return []
+    if route_points_decoded is None or len(route_points_decoded) == 0: return []
+    return find_issues_near_points(sample_route_points(route_points_decoded, radius_meters), radius_meters, mode)
+
+def find_issues_near_points(points_to_check, radius_meters=25, mode=None):
+    """ Finds accessibility points within radius of already-sampled [lat, lng] route points """
+    if not points_to_check: return []
+    if mode is None and accessibility_index.is_ready():
+        found_issues = accessibility_index.find_near_route(points_to_check, radius_meters)
+        OVERLAY_ISSUES.labels("spatial_index").observe(len(found_issues))
+        print(f"Spatial index found {len(found_issues)} unique accessibility issues near route.")
+        return found_issues
 
-    # Reduce density of points to check for performance if route is long
-    step = max(1, len(route_points_decoded) // 100) # Check approx 100 points
-    points_to_check = route_points_decoded[::step]
+    if get_db() is None: return []
+    if (mode or OVERLAY_QUERY_MODE) == 'per_point':
+        found_issues = _find_issues_per_point(thin_route_points(points_to_check, OVERLAY_PER_POINT_MAX_QUERIES), radius_meters)
+    else:
+        found_issues = _find_issues_in_corridor(points_to_check, radius_meters)
 
+    OVERLAY_ISSUES.labels("mongo").observe(len(found_issues))
+    print(f"Service found {len(found_issues)} unique accessibility issues near route.")
+    return found_issues
+
+@mongo_call_site("overlay.per_point")
+def _find_issues_per_point(points_to_check, radius_meters):
+    """Legacy overlay: one $nearSphere query per sampled route point, deduplicated in Python."""
+    db = get_db()
     found_issues = []
     unique_issue_ids = set()
 
@@ -30,27 +157,91 @@ def find_nearby_accessibility_issues(route_points_decoded, radius_meters=25):
             # "status": "verified" # Optional filter
         }
         try:
-            projection = {"_id": 1, "type": 1, "description": 1, "location": 1}
-            issues = list(db.accessibility_points.find(query, projection))
+            issues = list(db.accessibility_points.find(query, OVERLAY_PROJECTION))
             for issue in issues:
                  issue_id_str = str(issue['_id'])
                  if issue_id_str not in unique_issue_ids:
-                     issue['_id'] = issue_id_str
-                     issue['lat'] = issue['location']['coordinates'][1]
-                     issue['lng'] = issue['location']['coordinates'][0]
-                     # del issue['location'] # Optional cleanup
-                     found_issues.append(issue)
+                     found_issues.append(_format_issue(issue))
                      unique_issue_ids.add(issue_id_str)
         except Exception as e:
             print(f"Error querying accessibility points near {query_point} in service: {e}")
 
-    print(f"Service found {len(found_issues)} unique accessibility issues near route.")
     return found_issues
 
+def build_corridor_query(points_to_check, radius_meters):
+    """$or of $geoWithin/$centerSphere circles around the sampled [lat, lng] route points."""
+    # $centerSphere takes its radius in radians; this matches $nearSphere's $maxDistance in meters
+    radius_radians = radius_meters / EARTH_RADIUS_METERS
+    clauses = [
+        {"location": {"$geoWithin": {"$centerSphere": [[lng, lat], radius_radians]}}}
+        for lat, lng in points_to_check
+    ]
+    # "status": "verified" # Optional filter
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def chunk_corridor_points(points_to_check, max_clauses=CORRIDOR_MAX_CLAUSES, min_chunks=1):
+    """Splits sampled points into consecutive runs of at most max_clauses, one corridor query each."""
+    num_chunks = max(min_chunks, -(-len(points_to_check) // max(1, max_clauses))) # Ceiling division
+    chunk_size = max(1, -(-len(points_to_check) // num_chunks))
+    return [points_to_check[i:i + chunk_size] for i in range(0, len(points_to_check), chunk_size)]
+
+def rank_corridor_issues(issues, points_to_check, radius_meters):
+    """
+    Orders raw corridor results the way the per-point loop returned them (first sampled point
+    within range, nearest first), drops duplicates and formats them for the response.
+    """
+    unique_issues = []
+    unique_issue_ids = set()
+    for issue in issues:
+        if issue['_id'] in unique_issue_ids:
+            continue
+        unique_issue_ids.add(issue['_id'])
+        unique_issues.append(issue)
+    if not unique_issues:
+        return []
+
+    samples = np.asarray(points_to_check, dtype=np.float64).reshape(-1, 2)
+    coordinates = np.array([issue['location']['coordinates'][:2] for issue in unique_issues], dtype=np.float64)
+    # Fallback rank for float edge cases on the circle boundary: after every in-range issue
+    first_index = np.full(len(unique_issues), len(samples))
+    first_distance = np.zeros(len(unique_issues))
+    # One row of sample distances per issue, a block of rows at a time to bound memory on long routes
+    block_rows = max(1, RANK_MATRIX_MAX_CELLS // max(1, len(samples)))
+    for start in range(0, len(unique_issues), block_rows):
+        block = coordinates[start:start + block_rows]
+        distances = haversine_meters_array(samples[:, 0], samples[:, 1], block[:, 1, None], block[:, 0, None])
+        in_range = distances <= radius_meters
+        first = in_range.argmax(axis=1) # First True per row (0 when there is none)
+        rows = np.flatnonzero(in_range[np.arange(len(block)), first])
+        first_index[start + rows] = first[rows]
+        first_distance[start + rows] = distances[rows, first[rows]]
+    order = np.lexsort((first_distance, first_index)) # Stable, so ties keep the query's order
+
+    return [_format_issue(unique_issues[i]) for i in order]
+
+@mongo_call_site("overlay.corridor")
+def _find_issues_in_corridor(points_to_check, radius_meters):
+    """
+    Corridor overlay: a $or query around the sampled route points, so every hazard along the
+    route comes back in one round trip (a few, on routes longer than CORRIDOR_MAX_CLAUSES circles).
+    A failed chunk is logged and skipped; the other chunks' hazards are still returned.
+    """
+    issues = []
+    chunks = chunk_corridor_points(points_to_check)
+    for chunk_number, chunk in enumerate(chunks, 1):
+        try:
+            query = build_corridor_query(chunk, radius_meters)
+            issues.extend(get_db().accessibility_points.find(query, OVERLAY_PROJECTION).batch_size(CORRIDOR_BATCH_SIZE))
+        except Exception as e:
+            print(f"Error querying accessibility points along route corridor in service "
+                  f"(chunk {chunk_number} of {len(chunks)}, sampled points {chunk[0]} to {chunk[-1]}): {e}")
+    return rank_corridor_issues(issues, points_to_check, radius_meters)
+
 # --- Placeholder Examples for other DB operations ---
 
 def get_user_by_id(user_id):
-    if not db: return None
+    db = get_db()
+    if db is None: return None
     try:
         # Assuming your user documents have a 'userId' field matching the auth ID
         return db.users.find_one({"userId": user_id})
@@ -59,7 +250,8 @@ def get_user_by_id(user_id):
         return None
 
 def save_user_preferences(user_id, preferences):
-    if not db: return False
+    db = get_db()
+    if db is None: return False
     try:
         result = db.users.update_one(
             {"userId": user_id},
@@ -69,4 +261,4 @@ def save_user_preferences(user_id, preferences):
         return result.acknowledged
     except Exception as e:
         print(f"Error saving preferences for user {user_id}: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -1,72 +1,244 @@
 import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError, ReadTimeoutError
+from urllib3.util import Timeout
+from utils.cache import LRUCache, TieredCache, SingleFlight
+from utils.cache_keys import normalize_address
+from utils.metrics import observe_google_call
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 DIRECTIONS_API_URL = "https://maps.googleapis.com/maps/api/directions/json"
 GEOCODING_API_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
+# --- Shared HTTP Client ---
+# One keep-alive session per worker process, so route requests reuse TLS connections to
+# maps.googleapis.com instead of paying a fresh handshake each time.
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "10")) # Should cover worker threads
+GOOGLE_HTTP_MAX_RETRIES = int(os.getenv("GOOGLE_HTTP_MAX_RETRIES", "2"))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_HTTP_CONNECT_TIMEOUT", "3.05"))
+GOOGLE_HTTP_READ_TIMEOUT = float(os.getenv("GOOGLE_HTTP_READ_TIMEOUT", "10"))
+# Whole call, retries and backoff included; keep it under gunicorn's 30s worker timeout and
+# ROUTE_COALESCE_TIMEOUT_SECONDS, or a slow upstream costs workers and coalesced callers.
+GOOGLE_HTTP_DEADLINE_SECONDS = float(os.getenv("GOOGLE_HTTP_DEADLINE_SECONDS", "9.5"))
+GOOGLE_HTTP_MIN_ATTEMPT_SECONDS = 1.0 # Don't start a retry with less time than this left
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# --- Geocoding Cache ---
+# Addresses barely move, so results are kept for a long time; failed lookups (ZERO_RESULTS) are
+# remembered briefly so a mistyped address doesn't cost a Geocoding call on every request.
+GEOCODE_CACHE_MAX_BYTES = int(os.getenv("GEOCODE_CACHE_MAX_BYTES", str(2 * 1024 * 1024)))
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 86400)))
+GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", "600"))
+NEGATIVE_GEOCODE_STATUSES = ('ZERO_RESULTS',) # Quota/auth errors are not the address's fault; never cache them
+
+geocode_cache = TieredCache(LRUCache(max_bytes=GEOCODE_CACHE_MAX_BYTES, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS, name="geocode_cache"))
+geocode_flights = SingleFlight()
+geocode_upstream_calls = 0
+geocode_negative_hits = 0
+
+class GoogleMapsAPIError(ValueError):
+    """Raised when Google answers but with a non-OK status (e.g. ZERO_RESULTS, OVER_QUERY_LIMIT)."""
+    def __init__(self, status, error_message=None):
+        super().__init__(error_message or f"Google API status: {status}")
+        self.status = status
+        self.error_message = error_message
+
+def get_http_session():
+    """Returns this process's pooled session (recreated after fork, e.g. gunicorn preload)."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                # No urllib3 retries: get_with_retries() retries within the call's deadline
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=GOOGLE_HTTP_POOL_SIZE, max_retries=0)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+def retry_backoff(attempt):
+    """Seconds to wait before retry `attempt + 1`: 0.2s, 0.4s, ... plus jitter so workers don't retry in lockstep."""
+    return 0.2 * (2 ** attempt) + random.uniform(0, 0.2)
+
+def _is_connect_failure(error):
+    """True if the request never reached Google (refused, DNS, connect timeout), so a retry can't duplicate work."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+def get_with_retries(url, params, read_timeout=GOOGLE_HTTP_READ_TIMEOUT, deadline_seconds=GOOGLE_HTTP_DEADLINE_SECONDS):
+    """
+    GET on the shared session, retrying failed connects and 5xx answers up to GOOGLE_HTTP_MAX_RETRIES
+    times. A read timeout is not retried: Google may still be working on the request, and waiting
+    another full read timeout is what pushed calls past the worker timeout. Every attempt is capped
+    at what is left of `deadline_seconds`, so the call as a whole never takes longer than that.
+    Returns the last response (possibly a 5xx); raises requests exceptions as requests does.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        remaining = deadline_seconds - (time.monotonic() - started)
+        timeout = Timeout(total=remaining, connect=min(GOOGLE_HTTP_CONNECT_TIMEOUT, remaining), read=min(read_timeout, remaining))
+        try:
+            response = get_http_session().get(url, params=params, timeout=timeout)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            error = None
+        except requests.exceptions.ConnectionError as e:
+            if not _is_connect_failure(e):
+                raise
+            error = e
+        backoff = retry_backoff(attempt)
+        if attempt == GOOGLE_HTTP_MAX_RETRIES or deadline_seconds - (time.monotonic() - started) - backoff < GOOGLE_HTTP_MIN_ATTEMPT_SECONDS:
+            if error is not None:
+                raise error
+            return response
+        time.sleep(backoff)
+        attempt += 1
+
+def _is_timeout(error):
+    """Timeouts can also surface as ConnectionError(MaxRetryError(ReadTimeoutError / ConnectTimeoutError))."""
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    # NewConnectionError (refused, DNS) subclasses ConnectTimeoutError in urllib3 2.x
+    return isinstance(reason, (ReadTimeoutError, ConnectTimeoutError)) and not isinstance(reason, NewConnectionError)
+
+def _failure_status(error):
+    """Metrics label for a request that got no Google status: 'timeout', 'http_<code>' or 'connection_error'."""
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return 'timeout' if _is_timeout(error) else 'connection_error'
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return f"http_{response.status_code}"
+    return 'error'
+
 def fetch_google_directions(params):
     """
     Fetches directions from the Google Directions API.
     Args:
         params (dict): Dictionary of parameters for the API call
-                       (origin, destination, key, mode, avoid, transit_mode etc.).
+                       (origin, destination, mode, avoid, transit_mode etc.). The key is added here.
     Returns:
         dict: The JSON response from Google.
     Raises:
-        requests.exceptions.RequestException: If the request fails.
-        ValueError: If the API returns a non-OK status.
+        requests.exceptions.RequestException: If the request fails (after retries, within GOOGLE_HTTP_DEADLINE_SECONDS).
+        GoogleMapsAPIError: If the API returns a non-OK status (subclass of ValueError).
     """
     if not GOOGLE_MAPS_API_KEY:
         raise ValueError("Missing Google Maps API Key environment variable.")
 
-    # Ensure the key is in the params sent to Google
-    params['key'] = GOOGLE_MAPS_API_KEY
+    # Ensure the key is in the params sent to Google (without mutating the caller's dict)
+    params = {**params, 'key': GOOGLE_MAPS_API_KEY}
 
+    started = time.perf_counter()
+    status = 'error' # Outcome label for the metrics, set below
     try:
-        response = requests.get(DIRECTIONS_API_URL, params=params, timeout=10)
+        response = get_with_retries(DIRECTIONS_API_URL, params)
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
         data = response.json()
+        status = data['status']
 
         if data['status'] != 'OK':
-            error_msg = data.get('error_message', f"Google Directions API status: {data['status']}")
-            # Consider logging the full error details here
-            print(f"Google Directions API Error: {error_msg}")
-            raise ValueError(error_msg) # Raise a value error for non-OK status
+            print(f"Google Directions API Error: {data['status']} - {data.get('error_message', '')}")
+            raise GoogleMapsAPIError(data['status'], data.get('error_message'))
 
         return data
 
-    except requests.exceptions.Timeout:
+    except GoogleMapsAPIError:
+        raise
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        status = _failure_status(e)
+        if not _is_timeout(e):
+            print(f"Error calling Google Maps API: {e}")
+            raise requests.exceptions.RequestException(f"Could not connect to routing service: {e}")
         print("Error: Google Maps API request timed out.")
         raise requests.exceptions.Timeout("Routing service request timed out")
     except requests.exceptions.RequestException as e:
+        status = _failure_status(e)
         print(f"Error calling Google Maps API: {e}")
         raise requests.exceptions.RequestException(f"Could not connect to routing service: {e}")
     except Exception as e:
          # Catch any other unexpected errors
         print(f"Unexpected error in fetch_google_directions: {e}")
         raise Exception(f"Unexpected error processing Google Directions request: {e}")
+    finally:
+        observe_google_call('directions', status, time.perf_counter() - started)
 
 
-# Example: Placeholder for Geocoding Service function
+def enable_geocode_store(store):
+    """Puts a shared second-tier store (e.g. MongoCacheStore) behind the in-process geocode LRU."""
+    global geocode_cache
+    geocode_cache = TieredCache(geocode_cache.l1, store=store, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS)
+
 def geocode_address(address):
     """
-    (Placeholder) Converts an address string to lat/lng coordinates using Google Geocoding API.
+    Converts an address string to lat/lng coordinates using Google Geocoding API.
+    Results are cached under the normalized address (see utils.cache_keys.normalize_address).
+    Returns {'lat': ..., 'lng': ...} or None if the address can't be geocoded.
     """
     if not GOOGLE_MAPS_API_KEY:
         raise ValueError("Missing Google Maps API Key environment variable.")
 
+    cache_key = f"geocode:{normalize_address(address)}"
+    cached = geocode_cache.get(cache_key)
+    if cached is None:
+        # Concurrent lookups of the same new address share one upstream call
+        cached = geocode_flights.do(cache_key, lambda: _geocode_uncached(cache_key, address))
+    elif cached['location'] is None:
+        global geocode_negative_hits
+        geocode_negative_hits += 1
+    return cached['location']
+
+def _geocode_uncached(cache_key, address):
+    global geocode_upstream_calls
+    # Another caller may have just filled it; peek, as the caller's get already counted this lookup
+    cached = geocode_cache.peek(cache_key)
+    if cached is not None:
+        return cached
+
     params = {'address': address, 'key': GOOGLE_MAPS_API_KEY}
+    started = time.perf_counter()
+    status = 'error'
     try:
-        response = requests.get(GEOCODING_API_URL, params=params, timeout=5)
+        geocode_upstream_calls += 1
+        response = get_with_retries(GEOCODING_API_URL, params, read_timeout=5)
         response.raise_for_status()
         data = response.json()
+        status = data['status']
         if data['status'] == 'OK' and data.get('results'):
             location = data['results'][0]['geometry']['location'] # lat, lng
-            return location
+            result = {"location": location}
+            geocode_cache.set(cache_key, result)
+            return result
         else:
             print(f"Geocoding failed for '{address}'. Status: {data['status']}")
-            return None
+            result = {"location": None}
+            if data['status'] in NEGATIVE_GEOCODE_STATUSES:
+                geocode_cache.set(cache_key, result, ttl_seconds=GEOCODE_NEGATIVE_TTL_SECONDS)
+            return result
     except Exception as e:
+        if isinstance(e, requests.exceptions.RequestException):
+            status = _failure_status(e)
         print(f"Error during geocoding for '{address}': {e}")
-        return None
\ No newline at end of file
+        return {"location": None}
+    finally:
+        observe_google_call('geocoding', status, time.perf_counter() - started)
+
+def geocode_cache_stats():
+    """Cache counters plus how many Geocoding API calls the cache has saved."""
+    stats = geocode_cache.stats()
+    stats["upstreamCalls"] = geocode_upstream_calls
+    stats["savedUpstreamCalls"] = stats["hits"] + stats.get("secondTier", {}).get("hits", 0) + geocode_flights.coalesced
+    stats["negativeHits"] = geocode_negative_hits
+    return stats
@@ -0,0 +1,427 @@
+# backend/services/local_router.py
+# Optional local pedestrian routing engine, used instead of Google Directions for walking routes
+# between coordinates when ROUTING_ENGINE=local (Google remains the fallback for everything else).
+#
+# The walkable graph is loaded from a compact .npz file (see scripts/build_walk_graph.py) holding
+# CSR adjacency arrays: per-node coordinates, per-node edge offsets, and per-edge target, length,
+# flags and street name. Edge costs are the walking length, inflated for stairs, plus a penalty
+# for edges leading into hazards from accessibility_points; edges leading to ramps, elevators
+# and step-free entrances are discounted. Routes are found with A* and returned in the shape of
+# a Google Directions response, so /api/route, the overlay and the frontend work unchanged.
+
+import heapq
+import math
+import os
+import re
+import threading
+import numpy as np
+import polyline
+from services.route_ranking import TYPE_WEIGHTS, DEFAULT_TYPE_WEIGHT, SEVERITY_MULTIPLIERS
+from utils.helpers import haversine_meters, haversine_meters_array
+from utils.metrics import mongo_call_site
+
+ROUTING_ENGINE = os.getenv("ROUTING_ENGINE", "google").lower() # 'google' or 'local'
+LOCAL_ROUTER_GRAPH_PATH = os.getenv("LOCAL_ROUTER_GRAPH_PATH", "")
+LOCAL_ROUTER_REFRESH_SECONDS = int(os.getenv("LOCAL_ROUTER_REFRESH_SECONDS", "300")) # Accessibility point reload
+LOCAL_ROUTER_MAX_SNAP_METERS = float(os.getenv("LOCAL_ROUTER_MAX_SNAP_METERS", "200")) # Origin/destination to graph
+LOCAL_ROUTER_WALK_SPEED_MPS = float(os.getenv("LOCAL_ROUTER_WALK_SPEED_MPS", "1.1"))
+LOCAL_ROUTER_POINT_RADIUS_METERS = float(os.getenv("LOCAL_ROUTER_POINT_RADIUS_METERS", "25")) # Same as the overlay
+# Detour (in meters) the router accepts to avoid one unit of route_ranking score, e.g. 500 m for a medium hazard
+LOCAL_ROUTER_METERS_PER_SCORE_POINT = float(os.getenv("LOCAL_ROUTER_METERS_PER_SCORE_POINT", "50"))
+LOCAL_ROUTER_FEATURE_DISCOUNT = 0.9 # Cost factor for edges leading to ramps/elevators; must stay > 0 for A*
+LOCAL_ROUTER_STAIRS_FACTOR = 3.0 # Stairs cost when the user hasn't asked to avoid them
+
+FLAG_STAIRS = 1
+METERS_PER_DEGREE_LAT = 111320
+_CELL_DEGREES = 0.001 # ~110 m node grid for snapping and point lookups
+_LOAD_PROJECTION = {"_id": 0, "type": 1, "severity": 1, "location.coordinates": 1}
+_COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+class _Graph:
+    """Immutable graph arrays, plus the Python lists the search loop indexes (much faster than NumPy scalars)."""
+
+    def __init__(self, lats, lngs, offsets, targets, lengths, flags, names, street_names):
+        self.lats, self.lngs = lats, lngs
+        self.offsets, self.targets, self.lengths, self.flags, self.names = offsets, targets, lengths, flags, names
+        self.street_names = [str(name) for name in street_names]
+        self.node_count = len(lats)
+        self.sources = np.repeat(np.arange(self.node_count, dtype=np.int32), np.diff(offsets))
+
+        # Local equirectangular projection for the A* heuristic
+        self.ref_lat = float(lats.mean()) if self.node_count else 0.0
+        meters_per_degree_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(self.ref_lat))
+        self.xs = (lngs * meters_per_degree_lng).tolist()
+        self.ys = (lats * METERS_PER_DEGREE_LAT).tolist()
+        self.offset_list = offsets.tolist()
+        self.target_list = targets.tolist()
+
+        # Incoming edges per node (CSR by target), to re-weight only the edges into a few nodes
+        self.incoming_edges = np.argsort(targets, kind='stable')
+        self.incoming_offsets = np.concatenate(([0], np.cumsum(np.bincount(targets, minlength=self.node_count))))
+
+        # Node grid: nodes sorted by cell key, searched with searchsorted
+        rows = np.floor(lats / _CELL_DEGREES).astype(np.int64)
+        cols = np.floor(lngs / _CELL_DEGREES).astype(np.int64)
+        keys = rows * 1_000_000 + cols
+        self.cell_order = np.argsort(keys, kind='stable')
+        self.cell_keys = keys[self.cell_order]
+
+    def bounds(self):
+        return float(self.lats.min()), float(self.lngs.min()), float(self.lats.max()), float(self.lngs.max())
+
+    def nodes_near(self, lat, lng, radius_meters):
+        """(node indexes, distances in meters) of every node within the radius."""
+        lat_span = radius_meters / METERS_PER_DEGREE_LAT
+        lng_span = radius_meters / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        candidates = []
+        for row in range(math.floor((lat - lat_span) / _CELL_DEGREES), math.floor((lat + lat_span) / _CELL_DEGREES) + 1):
+            key_min = row * 1_000_000 + math.floor((lng - lng_span) / _CELL_DEGREES)
+            key_max = row * 1_000_000 + math.floor((lng + lng_span) / _CELL_DEGREES)
+            start = np.searchsorted(self.cell_keys, key_min, side='left')
+            end = np.searchsorted(self.cell_keys, key_max, side='right')
+            if end > start:
+                candidates.append(self.cell_order[start:end])
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        nodes = np.concatenate(candidates)
+        distances = haversine_meters_array(lat, lng, self.lats[nodes], self.lngs[nodes])
+        within = distances <= radius_meters
+        return nodes[within], distances[within]
+
+    def edges_into(self, nodes):
+        """Indexes of every edge leading into one of the nodes."""
+        if len(nodes) == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = self.incoming_offsets
+        return np.concatenate([self.incoming_edges[offsets[node]:offsets[node + 1]] for node in nodes])
+
+
+class _Costs:
+    """Per-edge cost lists for one set of accessibility points (swapped atomically on refresh)."""
+
+    def __init__(self, graph, penalties, rewarded):
+        self.penalties = penalties
+        self.rewarded = rewarded
+        allow_stairs, avoid_stairs = self._edge_costs(graph, slice(None))
+        self.allow_stairs, self.avoid_stairs = allow_stairs.tolist(), avoid_stairs.tolist()
+
+    def _edge_costs(self, graph, edges):
+        """(allow_stairs, avoid_stairs) cost arrays of the given edges (a slice or an index array)."""
+        targets = graph.targets[edges]
+        base = graph.lengths[edges].astype(np.float64) * np.where(self.rewarded[targets], LOCAL_ROUTER_FEATURE_DISCOUNT, 1.0)
+        stairs = (graph.flags[edges] & FLAG_STAIRS) != 0
+        entering_penalty = self.penalties[targets]
+        return np.where(stairs, base * LOCAL_ROUTER_STAIRS_FACTOR, base) + entering_penalty, np.where(stairs, np.inf, base + entering_penalty)
+
+    def update_nodes(self, graph, nodes):
+        """
+        Recomputes, in place, the cost of every edge into the nodes after their penalty or reward
+        changed. A search running meanwhile sees each of those edges at its old or its new cost.
+        """
+        edges = graph.edges_into(nodes)
+        allow_stairs, avoid_stairs = self._edge_costs(graph, edges)
+        for edge, allow_cost, avoid_cost in zip(edges.tolist(), allow_stairs.tolist(), avoid_stairs.tolist()):
+            self.allow_stairs[edge] = allow_cost
+            self.avoid_stairs[edge] = avoid_cost
+
+
+class LocalRouter:
+    """A* over an array-backed walking graph with accessibility-weighted edge costs."""
+
+    def __init__(self):
+        self._graph = None
+        self._costs = None
+        self._points = [] # (lat, lng, type, severity) of every accessibility point applied to the costs
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    def is_ready(self):
+        return self._graph is not None and self._costs is not None
+
+    # --- Loading ---
+
+    def load_graph(self, path):
+        with np.load(path) as data:
+            graph = _Graph(
+                data['lat'], data['lng'], data['offsets'], data['targets'], data['lengths'],
+                data['flags'], data['names'], data['street_names'],
+            )
+        with self._lock:
+            self._graph = graph
+            self._costs = self._build_costs(graph, self._points)
+        print(f"Local router loaded graph with {graph.node_count} nodes and {len(graph.target_list)} edges from {path}.")
+
+    def _build_costs(self, graph, points):
+        penalties = np.zeros(graph.node_count)
+        rewarded = np.zeros(graph.node_count, dtype=bool)
+        for point in points:
+            _apply_point(graph, penalties, rewarded, point)
+        return _Costs(graph, penalties, rewarded)
+
+    @mongo_call_site("local_router.load")
+    def load_accessibility_points(self, collection):
+        """Rebuilds edge costs from every accessibility point inside the graph's bounding box."""
+        graph = self._graph
+        if graph is None:
+            return
+        min_lat, min_lng, max_lat, max_lng = graph.bounds()
+        box = [[[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]]]
+        query = {"location": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": box}}}}
+        points = []
+        for doc in collection.find(query, _LOAD_PROJECTION):
+            lng, lat = doc['location']['coordinates'][:2]
+            points.append((float(lat), float(lng), doc.get('type'), doc.get('severity')))
+        self.set_accessibility_points(points)
+        print(f"Local router applied {len(points)} accessibility points to edge costs.")
+
+    def set_accessibility_points(self, points):
+        """Replaces the points behind the edge costs with (lat, lng, type, severity) tuples."""
+        graph = self._graph
+        costs = self._build_costs(graph, points)
+        with self._lock:
+            if self._graph is graph:
+                self._points, self._costs = list(points), costs
+
+    def add_point(self, point_doc):
+        """
+        Applies a newly inserted accessibility point right away (a later reload includes it anyway).
+        Runs on the request thread, so only the edges into nodes within the point's radius are
+        re-weighted rather than rebuilding every edge cost.
+        """
+        if not self.is_ready():
+            return
+        lng, lat = point_doc['location']['coordinates'][:2]
+        point = (float(lat), float(lng), point_doc.get('type'), point_doc.get('severity'))
+        with self._lock:
+            graph, costs = self._graph, self._costs
+            costs.update_nodes(graph, _apply_point(graph, costs.penalties, costs.rewarded, point))
+            self._points.append(point)
+
+    def start(self, graph_path, collection=None, refresh_seconds=LOCAL_ROUTER_REFRESH_SECONDS):
+        """
+        Loads the graph and accessibility points, then keeps the points fresh, all on a daemon
+        thread so worker startup doesn't wait; requests go to Google until the router is ready.
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def refresh_loop():
+            try:
+                self.load_graph(graph_path)
+                if collection is not None:
+                    self.load_accessibility_points(collection)
+            except Exception as e:
+                print(f"Error loading local routing graph, using Google Directions only: {e}")
+                return
+            while collection is not None and refresh_seconds > 0 and not self._stop_event.wait(refresh_seconds):
+                try:
+                    self.load_accessibility_points(collection)
+                except Exception as e:
+                    print(f"Error refreshing local router accessibility points (keeping previous costs): {e}")
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="local-router-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    # --- Routing ---
+
+    def snap(self, lat, lng, graph=None):
+        """Nearest graph node within LOCAL_ROUTER_MAX_SNAP_METERS, or None."""
+        graph = graph or self._graph
+        radius = min(50.0, LOCAL_ROUTER_MAX_SNAP_METERS)
+        while True:
+            nodes, distances = graph.nodes_near(lat, lng, radius)
+            if len(nodes):
+                return int(nodes[np.argmin(distances)])
+            if radius >= LOCAL_ROUTER_MAX_SNAP_METERS:
+                return None
+            radius = min(radius * 2, LOCAL_ROUTER_MAX_SNAP_METERS)
+
+    def shortest_path(self, source, target, avoid_stairs=True, graph=None, costs=None):
+        """A* from source to target node. Returns the list of edge indexes, or None if unreachable."""
+        graph, costs = graph or self._graph, costs or self._costs
+        edge_costs = costs.avoid_stairs if avoid_stairs else costs.allow_stairs
+        offsets, targets, xs, ys = graph.offset_list, graph.target_list, graph.xs, graph.ys
+        target_x, target_y = xs[target], ys[target]
+        # Discounted edges can cost less than their length, so scale the heuristic to stay admissible
+        h_factor = LOCAL_ROUTER_FEATURE_DISCOUNT * 0.99
+        hypot, heappush, heappop, inf = math.hypot, heapq.heappush, heapq.heappop, math.inf
+
+        best = {source: 0.0}
+        via_edge = {}
+        heap = [(hypot(xs[source] - target_x, ys[source] - target_y) * h_factor, 0.0, source)]
+        while heap:
+            _, cost, node = heappop(heap)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue # Stale heap entry
+            for edge in range(offsets[node], offsets[node + 1]):
+                new_cost = cost + edge_costs[edge]
+                neighbor = targets[edge]
+                if new_cost < best.get(neighbor, inf):
+                    best[neighbor] = new_cost
+                    via_edge[neighbor] = edge
+                    heappush(heap, (new_cost + hypot(xs[neighbor] - target_x, ys[neighbor] - target_y) * h_factor, new_cost, neighbor))
+        else:
+            return None
+
+        edges = []
+        node = target
+        while node != source:
+            edge = via_edge[node]
+            edges.append(edge)
+            node = int(graph.sources[edge])
+        edges.reverse()
+        return edges
+
+    def route(self, params, geocode=None):
+        """
+        Directions-shaped response for a walking request, or None when the local engine can't serve
+        it (other modes, outside the graph, unreachable). Addresses need a `geocode(address)` callable
+        returning {'lat', 'lng'} or None; without one only 'lat,lng' coordinates are served.
+        """
+        if not self.is_ready() or params.get('mode', 'walking') != 'walking':
+            return None
+        origin = _resolve_location(params.get('origin'), geocode)
+        destination = _resolve_location(params.get('destination'), geocode)
+        if origin is None or destination is None:
+            return None
+
+        graph, costs = self._graph, self._costs # One consistent snapshot for the whole request
+        source, target = self.snap(*origin, graph=graph), self.snap(*destination, graph=graph)
+        if source is None or target is None:
+            return None
+        edges = [] if source == target else self.shortest_path(
+            source, target, avoid_stairs=params.get('avoid') == 'stairs', graph=graph, costs=costs
+        )
+        if edges is None:
+            return None
+        return _directions_response(graph, source, edges, origin, destination, params)
+
+
+def _apply_point(graph, penalties, rewarded, point):
+    """Adds one (lat, lng, type, severity) point to the per-node arrays. Returns the nodes it changed."""
+    lat, lng, point_type, severity = point
+    weight = TYPE_WEIGHTS.get(point_type, DEFAULT_TYPE_WEIGHT)
+    if weight == 0:
+        return np.empty(0, dtype=np.int64)
+    nodes, _ = graph.nodes_near(lat, lng, LOCAL_ROUTER_POINT_RADIUS_METERS)
+    if weight > 0:
+        penalties[nodes] += weight * SEVERITY_MULTIPLIERS.get(severity, 1.0) * LOCAL_ROUTER_METERS_PER_SCORE_POINT
+    else:
+        rewarded[nodes] = True
+    return nodes
+
+def _parse_coordinates(value):
+    match = _COORDINATES.match(str(value or ''))
+    return (float(match.group(1)), float(match.group(2))) if match else None
+
+def _resolve_location(value, geocode):
+    coordinates = _parse_coordinates(value)
+    if coordinates is not None or geocode is None or not value:
+        return coordinates
+    try:
+        location = geocode(value)
+    except Exception as e:
+        print(f"Local router could not geocode '{value}': {e}")
+        return None
+    return (float(location['lat']), float(location['lng'])) if location else None
+
+def _distance_text(meters):
+    return f"{meters / 1000:.1f} km" if meters >= 1000 else f"{max(1, round(meters))} m"
+
+def _duration_text(seconds):
+    minutes = max(1, round(seconds / 60))
+    if minutes < 60:
+        return f"{minutes} min" if minutes == 1 else f"{minutes} mins"
+    return f"{minutes // 60} hour{'s' if minutes >= 120 else ''} {minutes % 60} mins"
+
+def _location(lat, lng):
+    return {"lat": lat, "lng": lng}
+
+def _step(graph, coordinates, meters, name_index, stairs):
+    name = graph.street_names[name_index] if name_index >= 0 else None
+    if stairs:
+        instructions = "Take the stairs"
+    elif name:
+        instructions = f"Walk along <b>{name}</b>"
+    else:
+        instructions = "Continue walking"
+    seconds = meters / LOCAL_ROUTER_WALK_SPEED_MPS
+    return {
+        "distance": {"text": _distance_text(meters), "value": round(meters)},
+        "duration": {"text": _duration_text(seconds), "value": round(seconds)},
+        "start_location": _location(*coordinates[0]),
+        "end_location": _location(*coordinates[-1]),
+        "html_instructions": instructions,
+        "polyline": {"points": polyline.encode(coordinates)},
+        "travel_mode": "WALKING",
+    }
+
+def _directions_response(graph, source, edges, origin, destination, params):
+    """Builds a Google Directions-style response; consecutive edges on the same street form one step."""
+    lats, lngs = graph.lats, graph.lngs
+    coordinates = [origin, (float(lats[source]), float(lngs[source]))]
+    steps = []
+    step_coordinates, step_meters, step_key = [coordinates[-1]], 0.0, None
+    street_meters = {}
+    for edge in edges:
+        node = graph.target_list[edge]
+        key = (int(graph.names[edge]), bool(graph.flags[edge] & FLAG_STAIRS))
+        if step_key is not None and key != step_key:
+            steps.append(_step(graph, step_coordinates, step_meters, *step_key))
+            step_coordinates, step_meters = [step_coordinates[-1]], 0.0
+        step_key = key
+        point = (float(lats[node]), float(lngs[node]))
+        step_coordinates.append(point)
+        coordinates.append(point)
+        step_meters += float(graph.lengths[edge])
+        if key[0] >= 0:
+            street_meters[key[0]] = street_meters.get(key[0], 0.0) + float(graph.lengths[edge])
+    if step_key is not None:
+        steps.append(_step(graph, step_coordinates, step_meters, *step_key))
+    coordinates.append(destination)
+
+    # Include the walk from the given coordinates onto the graph and off it again
+    access_meters = haversine_meters(*coordinates[0], *coordinates[1]) + haversine_meters(*coordinates[-2], *coordinates[-1])
+    total_meters = sum(step["distance"]["value"] for step in steps) + access_meters
+    total_seconds = total_meters / LOCAL_ROUTER_WALK_SPEED_MPS
+    route_lats = [lat for lat, _ in coordinates]
+    route_lngs = [lng for _, lng in coordinates]
+    summary = graph.street_names[max(street_meters, key=street_meters.get)] if street_meters else ""
+
+    return {
+        "geocoded_waypoints": [],
+        "routes": [{
+            "bounds": {
+                "northeast": _location(max(route_lats), max(route_lngs)),
+                "southwest": _location(min(route_lats), min(route_lngs)),
+            },
+            "copyrights": "Map data © OpenStreetMap contributors",
+            "legs": [{
+                "distance": {"text": _distance_text(total_meters), "value": round(total_meters)},
+                "duration": {"text": _duration_text(total_seconds), "value": round(total_seconds)},
+                "start_address": params.get('origin'),
+                "end_address": params.get('destination'),
+                "start_location": _location(*origin),
+                "end_location": _location(*destination),
+                "steps": steps,
+                "traffic_speed_entry": [],
+                "via_waypoint": [],
+            }],
+            "overview_polyline": {"points": polyline.encode(coordinates)},
+            "summary": summary,
+            "warnings": ["Walking directions from the local accessibility router. Verify conditions on site."],
+            "waypoint_order": [],
+        }],
+        "status": "OK",
+        "routing_engine": "local",
+    }
+
+
+local_router = LocalRouter()
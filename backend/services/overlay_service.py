@@ -0,0 +1,176 @@
+# backend/services/overlay_service.py
+# Hazard overlay for /api/route, cached separately from the Google Directions response.
+#
+# Overlay cache keys include a version counter for every coarse grid cell the route corridor
+# touches. Adding an accessibility point bumps its cell's version (shared through MongoDB),
+# so only overlays whose corridor intersects the changed cell are recomputed, while the
+# expensive Directions result can stay cached for a long time.
+
+import hashlib
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument
+from services import database_service
+from services.database_service import find_issues_near_points, sample_route_points
+from utils.cache import LRUCache, SingleFlight
+from utils.helpers import decode_polyline_array
+from utils.metrics import mongo_call_site, POLYLINE_POINTS
+from utils.timing import span
+
+OVERLAY_RADIUS_METERS = 25
+OVERLAY_CACHE_MAX_BYTES = int(os.getenv("OVERLAY_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+OVERLAY_CACHE_TTL_SECONDS = int(os.getenv("OVERLAY_CACHE_TTL_SECONDS", "3600")) # Backstop; versions do the real invalidation
+OVERLAY_VERSION_CELL_DEGREES = float(os.getenv("OVERLAY_VERSION_CELL_DEGREES", "0.01")) # ~1.1 km cells
+OVERLAY_VERSION_SYNC_SECONDS = float(os.getenv("OVERLAY_VERSION_SYNC_SECONDS", "5")) # Cross-worker staleness bound
+OVERLAY_POOL_SIZE = int(os.getenv("OVERLAY_POOL_SIZE", "4")) # Threads scoring alternative routes, per worker
+
+METERS_PER_DEGREE_LAT = 111320
+
+
+class SpatialVersionTracker:
+    """
+    Per-cell version counters. Bumps are written through to the 'overlay_cell_versions'
+    collection; other workers pick them up by polling for recently updated cells.
+    """
+
+    def __init__(self, cell_degrees=OVERLAY_VERSION_CELL_DEGREES, sync_seconds=OVERLAY_VERSION_SYNC_SECONDS):
+        self.cell_degrees = cell_degrees
+        self.sync_seconds = sync_seconds
+        self._versions = {} # cell id -> version
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._synced_until = None # Largest server-side updatedAt seen so far
+
+    def cell_of(self, lat, lng):
+        return f"{math.floor(lat / self.cell_degrees)}:{math.floor(lng / self.cell_degrees)}"
+
+    def cells_near(self, points, radius_meters):
+        """Every cell within radius_meters of any of the (lat, lng) points."""
+        lat_span = radius_meters / METERS_PER_DEGREE_LAT
+        cells = set()
+        for lat, lng in points:
+            lng_span = radius_meters / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+            # Cells are much larger than the radius, so the bounding box corners cover every touched cell
+            for corner_lat in (lat - lat_span, lat + lat_span):
+                for corner_lng in (lng - lng_span, lng + lng_span):
+                    cells.add(self.cell_of(corner_lat, corner_lng))
+        return cells
+
+    def _collection(self):
+        db = database_service.get_db()
+        return db.overlay_cell_versions if db is not None else None
+
+    @mongo_call_site("overlay.versions_bump")
+    def bump(self, lat, lng):
+        """Marks the cell containing a changed accessibility point as modified."""
+        cell = self.cell_of(lat, lng)
+        collection = self._collection()
+        version = None
+        if collection is not None:
+            try:
+                doc = collection.find_one_and_update(
+                    {"_id": cell},
+                    {"$inc": {"v": 1}, "$currentDate": {"updatedAt": True}},
+                    upsert=True, return_document=ReturnDocument.AFTER,
+                )
+                version = doc["v"]
+            except Exception as e:
+                print(f"Error bumping overlay version for cell {cell}: {e}")
+        with self._lock:
+            self._versions[cell] = max(version or 0, self._versions.get(cell, 0) + 1)
+
+    @mongo_call_site("overlay.versions_sync")
+    def sync(self, force=False):
+        """Pulls cells bumped by other workers since the last sync (at most every sync_seconds)."""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_seconds:
+            return
+        self._last_sync = now
+        collection = self._collection()
+        if collection is None:
+            return
+        query = {"updatedAt": {"$gte": self._synced_until}} if self._synced_until else {}
+        try:
+            docs = list(collection.find(query, {"v": 1, "updatedAt": 1}))
+        except Exception as e:
+            print(f"Error syncing overlay cell versions: {e}")
+            return
+        with self._lock:
+            for doc in docs:
+                self._versions[doc["_id"]] = max(doc["v"], self._versions.get(doc["_id"], 0))
+                if self._synced_until is None or doc["updatedAt"] > self._synced_until:
+                    self._synced_until = doc["updatedAt"]
+
+    def fingerprint(self, cells):
+        """Short hash of the current versions of the given cells (unchanged cells don't contribute)."""
+        self.sync()
+        with self._lock:
+            changed = sorted((cell, self._versions[cell]) for cell in cells if cell in self._versions)
+        return hashlib.sha1(repr(changed).encode()).hexdigest()[:16]
+
+
+overlay_versions = SpatialVersionTracker()
+overlay_cache = LRUCache(max_bytes=OVERLAY_CACHE_MAX_BYTES, ttl_seconds=OVERLAY_CACHE_TTL_SECONDS, name="overlay_cache")
+overlay_flights = SingleFlight()
+# Bounded so a burst of alternatives requests can't fan out into unbounded Mongo queries
+overlay_pool = ThreadPoolExecutor(max_workers=OVERLAY_POOL_SIZE, thread_name_prefix="overlay")
+
+def overlay_request(route_data, radius_meters=OVERLAY_RADIUS_METERS, route_index=0):
+    """
+    Returns (overlay cache key, sampled route points) for routes[route_index], or (None, []) if
+    the route has no polyline. The key changes whenever a cell along the corridor is bumped.
+    """
+    routes = route_data.get('routes') or []
+    if route_index >= len(routes):
+        return None, []
+    overview_polyline = routes[route_index].get('overview_polyline', {}).get('points')
+    if not overview_polyline:
+        return None, []
+    with span("decode"):
+        decoded_points = decode_polyline_array(overview_polyline)
+    POLYLINE_POINTS.observe(len(decoded_points))
+    if not len(decoded_points):
+        return None, []
+
+    points_to_check = sample_route_points(decoded_points, radius_meters)
+    cells = overlay_versions.cells_near(points_to_check, radius_meters)
+    polyline_hash = hashlib.sha1(overview_polyline.encode()).hexdigest()
+    return f"overlay:{polyline_hash}:{radius_meters}:{overlay_versions.fingerprint(cells)}", points_to_check
+
+def get_route_overlay(route_data, radius_meters=OVERLAY_RADIUS_METERS, route_index=0):
+    """Returns the custom accessibility warnings for one route (the primary by default), from cache when still valid."""
+    overlay_key, points_to_check = overlay_request(route_data, radius_meters, route_index)
+    if overlay_key is None:
+        return []
+
+    def compute():
+        cached_warnings = overlay_cache.get(overlay_key)
+        if cached_warnings is not None:
+            return cached_warnings
+        with span("overlay_query"):
+            warnings = find_issues_near_points(points_to_check, radius_meters)
+        overlay_cache.set(overlay_key, warnings)
+        return warnings
+
+    cached_warnings = overlay_cache.get(overlay_key)
+    if cached_warnings is not None:
+        return cached_warnings
+    return overlay_flights.do(overlay_key, compute)
+
+def get_route_overlays(route_data, radius_meters=OVERLAY_RADIUS_METERS):
+    """
+    Warnings for every route in the response, in route order. Alternatives are overlaid
+    concurrently on overlay_pool, so the wall time is roughly that of the slowest route.
+    """
+    route_count = len(route_data.get('routes') or [])
+    if route_count <= 1:
+        return [get_route_overlay(route_data, radius_meters)] if route_count else []
+    futures = [overlay_pool.submit(get_route_overlay, route_data, radius_meters, i) for i in range(route_count)]
+    return [future.result() for future in futures]
+
+def invalidate_overlays_near(lat, lng):
+    """Call after adding/changing an accessibility point so overlays around it are recomputed."""
+    overlay_versions.bump(lat, lng)
@@ -0,0 +1,62 @@
+# backend/services/preferences_service.py
+# User preferences storage with a per-worker read-through cache.
+#
+# Reads go through preferences_cache (short TTL, so another worker's update shows up within
+# PREFERENCES_CACHE_TTL_SECONDS); updates are a single find_one_and_update that returns the
+# post-image, which is written straight back into the cache. Route computation only peeks at the
+# cache (peek_preferences) so it never adds a DB round trip.
+
+import os
+import threading
+from pymongo import ReturnDocument
+from utils.cache import LRUCache
+
+DEFAULT_PREFERENCES = {"defaultMobility": "standard", "voiceURI": None}
+PREFERENCES_CACHE_MAX_BYTES = int(os.getenv("PREFERENCES_CACHE_MAX_BYTES", str(1024 * 1024)))
+PREFERENCES_CACHE_TTL_SECONDS = int(os.getenv("PREFERENCES_CACHE_TTL_SECONDS", "60"))
+_PROJECTION = {"preferences": 1, "_id": 0}
+
+preferences_cache = LRUCache(
+    max_bytes=PREFERENCES_CACHE_MAX_BYTES, ttl_seconds=PREFERENCES_CACHE_TTL_SECONDS, name="preferences_cache"
+)
+_write_count = 0 # Bumped by every update; a read that overlapped one doesn't fill the cache
+_write_lock = threading.Lock()
+
+def _with_defaults(user_doc):
+    return {**DEFAULT_PREFERENCES, **((user_doc or {}).get('preferences') or {})}
+
+def get_preferences(db, user_id):
+    """A user's preferences (defaults for unset fields), from this worker's cache when fresh."""
+    preferences = preferences_cache.get(user_id)
+    if preferences is not None:
+        return preferences
+    writes_before = _write_count
+    preferences = _with_defaults(db.users.find_one({"userId": user_id}, _PROJECTION))
+    with _write_lock:
+        # Otherwise an update that landed while we read could be overwritten with the old value
+        if writes_before == _write_count:
+            preferences_cache.set(user_id, preferences)
+    return preferences
+
+def peek_preferences(user_id):
+    """Cached preferences, or None on a miss. Never touches the database."""
+    return preferences_cache.get(user_id)
+
+def update_preferences(db, user_id, fields):
+    """
+    Sets `fields` (names inside 'preferences') in one atomic upsert and returns the updated
+    preferences, as stored, with defaults for unset fields.
+    """
+    global _write_count
+    user_doc = db.users.find_one_and_update(
+        {"userId": user_id},
+        {"$set": {f"preferences.{name}": value for name, value in fields.items()}},
+        projection=_PROJECTION,
+        upsert=True, # Creates the user doc and preferences field if missing
+        return_document=ReturnDocument.AFTER,
+    )
+    preferences = _with_defaults(user_doc)
+    with _write_lock:
+        _write_count += 1
+        preferences_cache.set(user_id, preferences) # Write-through: this worker's next read is a hit
+    return preferences
@@ -0,0 +1,64 @@
+# backend/services/route_ranking.py
+# Scores Google route alternatives by the accessibility points along their corridor and
+# orders them best-first. Lower scores are better; helpful features (ramps, elevators)
+# slightly offset hazards, and travel time only breaks ties.
+
+# Penalty per warning, by accessibility point type. Unknown types count as a minor hazard.
+TYPE_WEIGHTS = {
+    'hazard': 10.0,
+    'missing_curb_cut': 8.0,
+    'ramp': -2.0,
+    'elevator': -2.0,
+    'step_free_entrance': -1.0,
+    'accessible_restroom': 0.0,
+}
+DEFAULT_TYPE_WEIGHT = 5.0
+HAZARD_TYPES = {'hazard', 'missing_curb_cut'}
+
+# Multiplier on hazard penalties. Points submitted before severity existed count as 'medium'.
+SEVERITY_MULTIPLIERS = {'low': 0.5, 'medium': 1.0, 'high': 2.0}
+ALLOWED_SEVERITIES = list(SEVERITY_MULTIPLIERS)
+
+def score_warnings(warnings):
+    """Accessibility score for one route's warnings. Helpful features can't push it below 0."""
+    score = 0.0
+    for warning in warnings:
+        weight = TYPE_WEIGHTS.get(warning.get('type'), DEFAULT_TYPE_WEIGHT)
+        if weight > 0:
+            weight *= SEVERITY_MULTIPLIERS.get(warning.get('severity'), 1.0)
+        score += weight
+    return max(score, 0.0)
+
+def route_duration_seconds(route):
+    return sum(leg.get('duration', {}).get('value', 0) for leg in route.get('legs', []))
+
+def rank_routes(route_data, warnings_per_route):
+    """
+    Returns a copy of a Directions response with its routes ordered best-first. Each route gets
+    its own 'custom_accessibility_warnings' and 'accessibility_score'; the top-level warnings
+    are those of the best route, and 'route_rankings' records the original Google index of each.
+    """
+    ranked = []
+    for index, (route, warnings) in enumerate(zip(route_data.get('routes', []), warnings_per_route)):
+        duration = route_duration_seconds(route)
+        score = score_warnings(warnings)
+        ranked.append({
+            "route": {**route, 'custom_accessibility_warnings': warnings, 'accessibility_score': round(score, 2)},
+            "warnings": warnings,
+            "summary": {
+                "originalIndex": index,
+                "score": round(score, 2),
+                "hazardCount": sum(1 for w in warnings if w.get('type') in HAZARD_TYPES),
+                "durationSeconds": duration,
+            },
+            # Score first; travel time only separates equally accessible routes
+            "sort_key": (round(score, 2), duration, index),
+        })
+    ranked.sort(key=lambda item: item["sort_key"])
+
+    return {
+        **route_data,
+        'routes': [item["route"] for item in ranked],
+        'custom_accessibility_warnings': ranked[0]["warnings"] if ranked else [],
+        'route_rankings': [item["summary"] for item in ranked],
+    }
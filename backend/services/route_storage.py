@@ -0,0 +1,108 @@
+# backend/services/route_storage.py
+# Compact storage format for the Directions payload saved with a route ('googleRouteData').
+#
+# The payload is split in two: the fields the frontend renders (summary, bounds, polylines, legs
+# and step instructions, our accessibility annotations) are stored as a plain subdocument, so
+# GET /api/routes/<id> serves them without decompressing anything and they can be queried and
+# projected; the remainder (geocoded_waypoints, via_waypoint, waypoint_order, anything Google adds
+# later) is stored zlib-compressed in a binary field, only read by ?full=1, which merges it back
+# into the payload as it was saved. Nothing is dropped. The saved routes listing reads neither.
+# Older documents are still read: plain 'googleRouteData' as-is, format 1 (the frontend fields
+# only, compressed) and format 2 (both parts together in one compressed blob).
+
+import json
+import zlib
+from bson import Binary
+
+STORAGE_FORMAT = 3 # Bump if the split or the encoding changes
+PRUNED_FIELD = 'googleRouteDataPruned'
+REST_FIELD = 'googleRouteDataRestCompressed' # Absent when the payload has nothing beyond the frontend fields
+# Every field a stored payload may occupy, in any format
+STORAGE_FIELDS = (PRUNED_FIELD, REST_FIELD, 'googleRouteDataCompressed', 'storageFormat')
+COMPRESS_LEVEL = 9 # Written once, read rarely: favour size over write speed
+
+# Fields the frontend uses at each level of the Directions response
+_RESPONSE_FIELDS = {'status', 'routes', 'custom_accessibility_warnings', 'route_rankings', 'routing_engine'}
+_ROUTE_FIELDS = {
+    'summary', 'bounds', 'copyrights', 'warnings', 'overview_polyline', 'legs', 'fare',
+    'custom_accessibility_warnings', 'accessibility_score',
+}
+_LEG_FIELDS = {
+    'distance', 'duration', 'start_address', 'end_address', 'start_location', 'end_location',
+    'steps', 'arrival_time', 'departure_time',
+}
+_STEP_FIELDS = {
+    'distance', 'duration', 'start_location', 'end_location', 'html_instructions', 'maneuver',
+    'travel_mode', 'polyline', 'transit_details',
+}
+# (fields, key of the list of the next level down) from the response to the steps
+_LEVELS = [(_RESPONSE_FIELDS, 'routes'), (_ROUTE_FIELDS, 'legs'), (_LEG_FIELDS, 'steps'), (_STEP_FIELDS, None)]
+
+def _split(source, depth=0):
+    """
+    (frontend fields, remainder) of one level of the response, recursing into its child list.
+    The remainder keeps the child list's key with one (possibly empty) remainder per child, and
+    leaves it out when no child has one.
+    """
+    fields, child_key = _LEVELS[depth]
+    kept, rest = {}, {}
+    for key, value in source.items():
+        (kept if key in fields else rest)[key] = value
+    children = kept.get(child_key) if child_key else None
+    if isinstance(children, list):
+        splits = [_split(child, depth + 1) if isinstance(child, dict) else (child, {}) for child in children]
+        kept[child_key] = [child for child, _ in splits]
+        if any(child_rest for _, child_rest in splits):
+            rest[child_key] = [child_rest for _, child_rest in splits]
+    return kept, rest
+
+def _merge(kept, rest, depth=0):
+    """Inverse of _split."""
+    _, child_key = _LEVELS[depth]
+    merged = {**kept, **{key: value for key, value in rest.items() if key != child_key}}
+    if child_key and child_key in rest:
+        merged[child_key] = [
+            _merge(child, child_rest, depth + 1) if isinstance(child, dict) else child
+            for child, child_rest in zip(kept[child_key], rest[child_key])
+        ]
+    return merged
+
+def prune_route_data(route_data):
+    """Copy of a Directions response reduced to the fields the frontend uses."""
+    return _split(route_data)[0]
+
+def pack_route_data(route_data):
+    """Fields to store on a route document in place of a raw 'googleRouteData'."""
+    kept, rest = _split(route_data)
+    fields = {PRUNED_FIELD: kept, "storageFormat": STORAGE_FORMAT}
+    if rest:
+        encoded = json.dumps(rest, separators=(',', ':')).encode()
+        fields[REST_FIELD] = Binary(zlib.compress(encoded, COMPRESS_LEVEL))
+    return fields
+
+def unpack_route_data(route_doc, full=False):
+    """
+    Restores 'googleRouteData' on a route document read from Mongo (in place), whatever its format:
+    the frontend fields only, or with full=True the payload exactly as it was saved (format 1
+    documents only ever had the frontend fields). Without full=True the document may be read
+    without REST_FIELD (see route_projection).
+    """
+    kept = route_doc.pop(PRUNED_FIELD, None)
+    rest = route_doc.pop(REST_FIELD, None)
+    compressed = route_doc.pop('googleRouteDataCompressed', None)
+    storage_format = route_doc.pop('storageFormat', None)
+    if kept is not None:
+        if full and rest is not None:
+            kept = _merge(kept, json.loads(zlib.decompress(rest)))
+        route_doc['googleRouteData'] = kept
+    elif compressed is not None:
+        payload = json.loads(zlib.decompress(compressed))
+        if storage_format == 1:
+            route_doc['googleRouteData'] = payload
+        else:
+            route_doc['googleRouteData'] = _merge(payload['data'], payload['rest']) if full else payload['data']
+    return route_doc
+
+def route_projection(full=False):
+    """Projection for reading a saved route: the compressed remainder is only fetched for full=True."""
+    return None if full else {REST_FIELD: 0}
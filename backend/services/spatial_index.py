@@ -0,0 +1,242 @@
+# backend/services/spatial_index.py
+# Optional in-process spatial index of accessibility points, used for the route hazard overlay
+# instead of querying MongoDB on every /api/route call.
+#
+# Points are bucketed into a fixed lat/lng grid. The grid is stored packed (sorted cell keys plus
+# offsets into flat coordinate arrays) rather than as a dict of lists, which keeps the footprint
+# to roughly 40-50 bytes per point plus description strings, i.e. well under 100 MB at one million points.
+
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from utils.helpers import haversine_meters
+from utils.metrics import mongo_call_site
+
+SPATIAL_INDEX_ENABLED = os.getenv("SPATIAL_INDEX_ENABLED", "False").lower() == "true"
+SPATIAL_INDEX_REFRESH_SECONDS = int(os.getenv("SPATIAL_INDEX_REFRESH_SECONDS", "300")) # Full reload from Mongo
+SPATIAL_INDEX_CELL_DEGREES = float(os.getenv("SPATIAL_INDEX_CELL_DEGREES", "0.0005")) # ~55 m, about 2x the overlay radius
+
+METERS_PER_DEGREE_LAT = 111320
+_CELL_OFFSET = 1 << 20 # Keeps row/col non-negative so they pack into one int64 key
+_LOAD_PROJECTION = {"_id": 1, "type": 1, "description": 1, "severity": 1, "location.coordinates": 1}
+_SEVERITIES = (None, 'low', 'medium', 'high') # Stored as a 1-byte code; unknown values become None
+
+
+def _severity_code(severity):
+    return _SEVERITIES.index(severity) if severity in _SEVERITIES else 0
+
+
+class _Snapshot:
+    """Immutable, packed view of every point loaded from Mongo, sorted by grid cell."""
+    __slots__ = ('lats', 'lngs', 'ids', 'type_codes', 'severity_codes', 'descriptions', 'cell_keys', 'cell_starts')
+
+    def __init__(self, lats, lngs, ids, type_codes, severity_codes, descriptions, cell_keys, cell_starts):
+        self.lats = lats                  # array('d')
+        self.lngs = lngs                  # array('d')
+        self.ids = ids                    # bytes, 12 bytes (one ObjectId) per point
+        self.type_codes = type_codes      # array('H'), index into AccessibilityPointIndex._type_names
+        self.severity_codes = severity_codes # array('B'), index into _SEVERITIES
+        self.descriptions = descriptions  # list, None where the document had no description
+        self.cell_keys = cell_keys        # array('q'), sorted unique cell keys
+        self.cell_starts = cell_starts    # array('I'), len(cell_keys) + 1 offsets into the point arrays
+
+    def __len__(self):
+        return len(self.lats)
+
+    def cell_range(self, key):
+        """Returns the (start, end) slice of points stored in a cell."""
+        i = bisect_left(self.cell_keys, key)
+        if i < len(self.cell_keys) and self.cell_keys[i] == key:
+            return self.cell_starts[i], self.cell_starts[i + 1]
+        return 0, 0
+
+
+class AccessibilityPointIndex:
+    """
+    Grid index over accessibility points with incremental inserts and periodic full refresh.
+    The packed snapshot is rebuilt off-lock and swapped in together with the pending set.
+    """
+
+    def __init__(self, cell_degrees=SPATIAL_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._snapshot = None
+        self._type_names = []
+        self._type_codes = {}
+        self._pending = {} # cell key -> list of point tuples inserted since the last full load
+        self._pending_seq = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    # --- Loading ---
+
+    def is_ready(self):
+        return self._snapshot is not None
+
+    def _cell_key(self, lat, lng):
+        row = math.floor(lat / self.cell_degrees) + _CELL_OFFSET
+        col = math.floor(lng / self.cell_degrees) + _CELL_OFFSET
+        return (row << 21) | col
+
+    def _type_code(self, point_type):
+        code = self._type_codes.get(point_type)
+        if code is None:
+            code = len(self._type_names)
+            self._type_names.append(point_type)
+            self._type_codes[point_type] = code
+        return code
+
+    @mongo_call_site("spatial_index.load")
+    def load(self, collection):
+        """Streams every point from the collection and swaps in a freshly packed snapshot."""
+        with self._lock:
+            # Inserts made after this point may be missed by the cursor, so they stay pending.
+            # Overlap with the new snapshot is harmless since query results dedupe by _id.
+            load_seq = self._pending_seq
+
+        keys, lats, lngs = array('q'), array('d'), array('d')
+        ids, type_codes, severity_codes, descriptions = bytearray(), array('H'), array('B'), []
+        for doc in collection.find({}, _LOAD_PROJECTION, batch_size=10000):
+            try:
+                lng, lat = doc['location']['coordinates'][:2]
+                id_bytes = doc['_id'].binary
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            keys.append(self._cell_key(lat, lng))
+            lats.append(lat)
+            lngs.append(lng)
+            ids += id_bytes
+            type_codes.append(self._type_code(doc.get('type')))
+            severity_codes.append(_severity_code(doc.get('severity')))
+            descriptions.append(doc.get('description'))
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        packed_ids = bytearray(len(ids))
+        for new_pos, old_pos in enumerate(order):
+            packed_ids[new_pos * 12:new_pos * 12 + 12] = ids[old_pos * 12:old_pos * 12 + 12]
+
+        cell_keys, cell_starts = array('q'), array('I')
+        previous_key = None
+        for new_pos, old_pos in enumerate(order):
+            if keys[old_pos] != previous_key:
+                previous_key = keys[old_pos]
+                cell_keys.append(previous_key)
+                cell_starts.append(new_pos)
+        cell_starts.append(len(order))
+
+        snapshot = _Snapshot(
+            array('d', (lats[i] for i in order)),
+            array('d', (lngs[i] for i in order)),
+            bytes(packed_ids),
+            array('H', (type_codes[i] for i in order)),
+            array('B', (severity_codes[i] for i in order)),
+            [descriptions[i] for i in order],
+            cell_keys,
+            cell_starts,
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._pending = {
+                key: kept for key, entries in self._pending.items()
+                if (kept := [entry for entry in entries if entry[-1] > load_seq])
+            }
+        print(f"Spatial index loaded {len(order)} accessibility points in {len(cell_keys)} cells.")
+
+    def add_point(self, point_doc):
+        """Adds a freshly inserted point document so it shows up before the next full refresh."""
+        if not self.is_ready():
+            return
+        lng, lat = point_doc['location']['coordinates'][:2]
+        with self._lock:
+            self._pending_seq += 1
+            entry = (lat, lng, str(point_doc['_id']), point_doc.get('type'), point_doc.get('description'),
+                     _SEVERITIES[_severity_code(point_doc.get('severity'))], self._pending_seq)
+            self._pending.setdefault(self._cell_key(lat, lng), []).append(entry)
+
+    def start(self, collection, refresh_seconds=SPATIAL_INDEX_REFRESH_SECONDS):
+        """
+        Loads the index and keeps refreshing it from Mongo, all on a daemon thread so worker
+        startup doesn't wait on the database; queries fall back to MongoDB until it is ready.
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def refresh_loop():
+            try:
+                self.load(collection)
+            except Exception as e:
+                print(f"Error loading spatial index, falling back to MongoDB queries: {e}")
+            while refresh_seconds > 0 and not self._stop_event.wait(refresh_seconds):
+                try:
+                    self.load(collection)
+                except Exception as e:
+                    print(f"Error refreshing spatial index (keeping previous snapshot): {e}")
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="spatial-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    # --- Querying ---
+
+    def _cells_around(self, lat, lng, radius_meters):
+        lat_span = radius_meters / METERS_PER_DEGREE_LAT
+        lng_span = radius_meters / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        row_min = math.floor((lat - lat_span) / self.cell_degrees) + _CELL_OFFSET
+        row_max = math.floor((lat + lat_span) / self.cell_degrees) + _CELL_OFFSET
+        col_min = math.floor((lng - lng_span) / self.cell_degrees) + _CELL_OFFSET
+        col_max = math.floor((lng + lng_span) / self.cell_degrees) + _CELL_OFFSET
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                yield (row << 21) | col
+
+    def _candidates_near(self, snapshot, pending, lat, lng, radius_meters):
+        """Yields (distance, id, lat, lng, type, description, severity) for every point within the radius."""
+        lat_span = radius_meters / METERS_PER_DEGREE_LAT
+        lats, lngs = snapshot.lats, snapshot.lngs
+        for key in self._cells_around(lat, lng, radius_meters):
+            start, end = snapshot.cell_range(key)
+            for i in range(start, end):
+                if abs(lats[i] - lat) > lat_span: continue # Cheap reject before the trig
+                distance = haversine_meters(lat, lng, lats[i], lngs[i])
+                if distance <= radius_meters:
+                    yield (distance, snapshot.ids[i * 12:i * 12 + 12].hex(), lats[i], lngs[i],
+                           self._type_names[snapshot.type_codes[i]], snapshot.descriptions[i],
+                           _SEVERITIES[snapshot.severity_codes[i]])
+            for p_lat, p_lng, p_id, p_type, p_description, p_severity, _ in pending.get(key, ()):
+                distance = haversine_meters(lat, lng, p_lat, p_lng)
+                if distance <= radius_meters:
+                    yield (distance, p_id, p_lat, p_lng, p_type, p_description, p_severity)
+
+    def find_near_route(self, points_to_check, radius_meters):
+        """
+        Same results and ordering as the Mongo overlay: points are emitted by the first sampled
+        route point that has them in range, nearest first, each point once.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            pending = {key: list(entries) for key, entries in self._pending.items()}
+
+        found_issues = []
+        unique_issue_ids = set()
+        for lat, lng in points_to_check:
+            for distance, issue_id, p_lat, p_lng, p_type, p_description, p_severity in sorted(
+                    self._candidates_near(snapshot, pending, lat, lng, radius_meters), key=lambda c: c[0]):
+                if issue_id in unique_issue_ids:
+                    continue
+                unique_issue_ids.add(issue_id)
+                issue = {"_id": issue_id, "location": {"type": "Point", "coordinates": [p_lng, p_lat]}}
+                if p_type is not None: issue['type'] = p_type
+                if p_description is not None: issue['description'] = p_description
+                if p_severity is not None: issue['severity'] = p_severity
+                issue['lat'] = p_lat
+                issue['lng'] = p_lng
+                found_issues.append(issue)
+        return found_issues
+
+
+# Per-worker instance; gunicorn workers each load their own copy at startup.
+accessibility_index = AccessibilityPointIndex()
@@ -0,0 +1,237 @@
+# backend/services/tile_service.py
+# Web-map tiles of accessibility points for the map view. Tiles use the standard z/x/y
+# (Web Mercator, "slippy map") scheme. From TILE_POINTS_MIN_ZOOM up a tile lists its points;
+# below that (or when a tile holds too many points) it shows a fixed grid of clusters with
+# per-type counts. Tiles are cached per worker and served with ETags, so panning only costs a
+# few small, mostly-cached responses.
+#
+# Clusters are materialized in the 'tile_clusters' collection rather than aggregated per request:
+# one document per (cell, point type) holding the count and coordinate sums, for every cell level
+# a tile can be clustered at. A tile's cells are the tiles CLUSTER_ZOOM_OFFSET zooms below it.
+# Points added through the API update it as they are inserted (record_points); for anything
+# written another way, 'flask --app app rebuild-tile-clusters' recomputes it from scratch.
+
+import hashlib
+import json
+import math
+import os
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from services import database_service
+from utils.cache import LRUCache
+from utils.metrics import mongo_call_site
+
+TILE_POINTS_MIN_ZOOM = int(os.getenv("TILE_POINTS_MIN_ZOOM", "16")) # Individual points from this zoom up
+TILE_MAX_POINTS = int(os.getenv("TILE_MAX_POINTS", "500")) # Denser tiles are clustered even at high zoom
+TILE_CLUSTER_GRID = int(os.getenv("TILE_CLUSTER_GRID", "8")) # Clusters per tile side (8 x 8 = 32 px cells), a power of two
+CLUSTER_ZOOM_OFFSET = max(0, round(math.log2(max(1, TILE_CLUSTER_GRID))))
+# Deepest materialized cell level: full 8 x 8 grids up to zoom TILE_POINTS_MIN_ZOOM, coarser grids
+# on the rare dense tile above it (each level costs one more document write per added point)
+TILE_CLUSTER_MAX_ZOOM = int(os.getenv("TILE_CLUSTER_MAX_ZOOM", str(TILE_POINTS_MIN_ZOOM + CLUSTER_ZOOM_OFFSET)))
+TILE_CLUSTER_WRITE_BATCH = 10000 # Points per bulk write when rebuilding
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+TILE_CACHE_TTL_SECONDS = int(os.getenv("TILE_CACHE_TTL_SECONDS", "60")) # Also the browser max-age
+TILE_VIEWPORT_MAX_TILES = int(os.getenv("TILE_VIEWPORT_MAX_TILES", "16"))
+MAX_TILE_ZOOM = 22
+_EDGE_VERTICES = 32 # Vertices per tile edge, so geodesic polygon edges follow the tile's parallels
+
+tile_cache = LRUCache(max_bytes=TILE_CACHE_MAX_BYTES, ttl_seconds=TILE_CACHE_TTL_SECONDS, name="tile_cache")
+
+def tile_bounds(z, x, y):
+    """(min_lat, min_lng, max_lat, max_lng) of a Web Mercator tile."""
+    n = 2 ** z
+    def lat_of(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+def _tile_column(lng, z):
+    n = 2 ** z
+    return min(n - 1, max(0, int((lng + 180.0) / 360.0 * n)))
+
+def _tile_row(lat, z):
+    n = 2 ** z
+    lat = max(-85.0511, min(85.0511, lat))
+    return min(n - 1, max(0, int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)))
+
+def tiles_covering(min_lat, min_lng, max_lat, max_lng, z):
+    """
+    (x, y) of every tile at zoom z intersecting the bounding box. A box crossing the antimeridian
+    (min_lng > max_lng) wraps around, as map viewports do; the frontend's tilesForBounds matches this.
+    """
+    # Tile edges are half-open, so a bbox ending exactly on an edge doesn't pull in the next tile
+    rows = range(_tile_row(max_lat, z), _tile_row(min_lat + 1e-9, z) + 1)
+    first_column, last_column = _tile_column(min_lng, z), _tile_column(max_lng - 1e-9, z)
+    if min_lng <= max_lng:
+        columns = range(first_column, last_column + 1)
+    elif last_column >= first_column: # Wrapped all the way round
+        columns = range(2 ** z)
+    else:
+        columns = [*range(first_column, 2 ** z), *range(0, last_column + 1)]
+    return [(x, y) for y in rows for x in columns]
+
+def _tile_match(min_lat, min_lng, max_lat, max_lng, point_type):
+    # Densified polygon so the 2dsphere index can be used (strict counter-clockwise winding allows
+    # tiles larger than a hemisphere at low zoom); the coordinate ranges then make tile edges exact
+    lngs = [min_lng + (max_lng - min_lng) * i / _EDGE_VERTICES for i in range(_EDGE_VERTICES + 1)]
+    ring = [[lng, min_lat] for lng in lngs] + [[lng, max_lat] for lng in reversed(lngs)]
+    ring.append(ring[0])
+    match = {
+        "location": {"$geoWithin": {"$geometry": {
+            "type": "Polygon", "coordinates": [ring],
+            "crs": {"type": "name", "properties": {"name": "urn:x-mongodb:crs:strictwinding:EPSG:4326"}},
+        }}},
+        "location.coordinates.0": {"$gte": min_lng, "$lt": max_lng},
+        "location.coordinates.1": {"$gte": min_lat, "$lt": max_lat},
+    }
+    if point_type:
+        match["type"] = point_type
+    return match
+
+def _format_point(doc):
+    lng, lat = doc['location']['coordinates'][:2]
+    return {"id": str(doc['_id']), "type": doc.get("type"), "description": doc.get("description"), "lat": lat, "lng": lng}
+
+def _format_cluster(cell):
+    return {
+        # Count-weighted centroid, so a marker sits where the points actually are
+        "lat": cell['latSum'] / cell['count'],
+        "lng": cell['lngSum'] / cell['count'],
+        "count": cell['count'],
+        "types": cell['types'],
+    }
+
+def _clusters(db, z, x, y, point_type):
+    """The tile's clusters, one per non-empty cell, read from the materialized cells."""
+    cell_zoom = min(z + CLUSTER_ZOOM_OFFSET, TILE_CLUSTER_MAX_ZOOM)
+    scale = 2 ** (cell_zoom - z) # Cells per tile side
+    query = {
+        "z": cell_zoom,
+        "x": {"$gte": x * scale, "$lt": (x + 1) * scale},
+        "y": {"$gte": y * scale, "$lt": (y + 1) * scale},
+    }
+    if point_type:
+        query["type"] = point_type
+    cells = {}
+    for doc in db.tile_clusters.find(query, {"_id": 0, "x": 1, "y": 1, "type": 1, "count": 1, "latSum": 1, "lngSum": 1}):
+        if doc['count'] <= 0:
+            continue
+        cell = cells.setdefault((doc['y'], doc['x']), {"count": 0, "latSum": 0.0, "lngSum": 0.0, "types": {}})
+        cell['count'] += doc['count']
+        cell['latSum'] += doc['latSum']
+        cell['lngSum'] += doc['lngSum']
+        if doc.get('type') is not None:
+            cell['types'][doc['type']] = doc['count']
+    # Stable order, so identical data gives an identical ETag
+    return [_format_cluster(cells[key]) for key in sorted(cells)]
+
+@mongo_call_site("tiles.build")
+def build_tile(z, x, y, point_type=None):
+    """Computes a tile body: points at high zoom, grid clusters otherwise."""
+    db = database_service.get_db()
+    min_lat, min_lng, max_lat, max_lng = tile_bounds(z, x, y)
+    tile = {
+        "z": z, "x": x, "y": y,
+        "bounds": {"south": min_lat, "west": min_lng, "north": max_lat, "east": max_lng},
+    }
+    if z >= TILE_POINTS_MIN_ZOOM:
+        match = _tile_match(min_lat, min_lng, max_lat, max_lng, point_type)
+        projection = {"_id": 1, "type": 1, "description": 1, "location.coordinates": 1}
+        points = list(db.accessibility_points.find(match, projection).sort("_id", 1).limit(TILE_MAX_POINTS + 1))
+        if len(points) <= TILE_MAX_POINTS or z > TILE_CLUSTER_MAX_ZOOM:
+            # Past the deepest cell level a cluster would cover more than the tile; list what fits instead
+            return {**tile, "clustered": False, "points": [_format_point(doc) for doc in points[:TILE_MAX_POINTS]], "clusters": []}
+    return {**tile, "clustered": True, "points": [], "clusters": _clusters(db, z, x, y, point_type)}
+
+# --- Materialized clusters ---
+
+def _cluster_increments(point_docs):
+    """{(cell zoom, x, y, type): [count, lat sum, lng sum]} of the points over every cell level."""
+    levels = range(CLUSTER_ZOOM_OFFSET, TILE_CLUSTER_MAX_ZOOM + 1)
+    increments = {}
+    for doc in point_docs:
+        lng, lat = doc['location']['coordinates'][:2]
+        # Tiles nest, so each coarser cell is the deepest one's x, y shifted right
+        x, y = _tile_column(lng, TILE_CLUSTER_MAX_ZOOM), _tile_row(lat, TILE_CLUSTER_MAX_ZOOM)
+        for cell_zoom in levels:
+            shift = TILE_CLUSTER_MAX_ZOOM - cell_zoom
+            entry = increments.setdefault((cell_zoom, x >> shift, y >> shift, doc.get('type')), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += lat
+            entry[2] += lng
+    return increments
+
+def _cluster_updates(increments):
+    return [
+        UpdateOne(
+            {"_id": f"{cell_zoom}/{x}/{y}/{point_type or ''}"},
+            {"$inc": {"count": count, "latSum": lat_sum, "lngSum": lng_sum},
+             "$setOnInsert": {"z": cell_zoom, "x": x, "y": y, "type": point_type}},
+            upsert=True,
+        )
+        for (cell_zoom, x, y, point_type), (count, lat_sum, lng_sum) in increments.items()
+    ]
+
+@mongo_call_site("tiles.record_points")
+def record_points(point_docs, collection=None):
+    """
+    Adds newly inserted points to the materialized clusters (one unordered bulk write). Errors are
+    logged, not raised: the points are already stored, and a rebuild makes the clusters whole again.
+    """
+    if collection is None:
+        db = database_service.get_db()
+        if db is None:
+            return
+        collection = db.tile_clusters
+    updates = _cluster_updates(_cluster_increments(point_docs))
+    if not updates:
+        return
+    try:
+        collection.bulk_write(updates, ordered=False)
+    except Exception as e:
+        print(f"Error updating tile clusters for {len(point_docs)} points (run rebuild-tile-clusters): {e}")
+
+@mongo_call_site("tiles.rebuild_clusters")
+def rebuild_clusters(db):
+    """
+    Recomputes 'tile_clusters' from every accessibility point into a scratch collection and swaps
+    it in with one rename, so tiles never see a half-built grid. Points inserted while it runs
+    went to the old collection and are re-applied after the swap (ids only resolve to the second,
+    so one inserted within a second of the swap may be off until the next rebuild). Returns the
+    number of cluster documents.
+    """
+    projection = {"_id": 0, "type": 1, "location.coordinates": 1}
+    cutoff = ObjectId.from_datetime(datetime.now(timezone.utc))
+    scratch = db[f"tile_clusters_rebuild_{os.getpid()}"]
+    scratch.drop()
+    scratch.create_index(database_service.TILE_CLUSTERS_INDEX, name=database_service.TILE_CLUSTERS_INDEX_NAME)
+
+    batch = []
+    for doc in db.accessibility_points.find({"_id": {"$lt": cutoff}}, projection).batch_size(TILE_CLUSTER_WRITE_BATCH):
+        batch.append(doc)
+        if len(batch) >= TILE_CLUSTER_WRITE_BATCH:
+            scratch.bulk_write(_cluster_updates(_cluster_increments(batch)), ordered=False)
+            batch = []
+    if batch:
+        scratch.bulk_write(_cluster_updates(_cluster_increments(batch)), ordered=False)
+
+    scratch.rename("tile_clusters", dropTarget=True)
+    swapped = ObjectId.from_datetime(datetime.now(timezone.utc))
+    late = list(db.accessibility_points.find({"_id": {"$gte": cutoff, "$lt": swapped}}, projection))
+    if late:
+        record_points(late, db.tile_clusters)
+    return db.tile_clusters.estimated_document_count()
+
+def get_tile(z, x, y, point_type=None):
+    """Returns (tile body, ETag), from the per-worker tile cache when fresh."""
+    cache_key = f"tile:{z}/{x}/{y}:{point_type or ''}"
+    cached = tile_cache.get(cache_key)
+    if cached is None:
+        body = build_tile(z, x, y, point_type)
+        etag = hashlib.sha1(json.dumps(body, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+        cached = {"body": body, "etag": etag}
+        tile_cache.set(cache_key, cached)
+    return cached["body"], cached["etag"]
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
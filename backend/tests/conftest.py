@@ -0,0 +1,17 @@
+# backend/tests/conftest.py
+# Run from backend/:  python -m pytest
+#
+# Settles the environment before any test imports the app: no database (backend/.env may point at
+# a real cluster, and load_dotenv never overrides a variable that is already set), a dummy Google
+# key (tests stub the Directions call), and no shared route cache or multiprocess metrics.
+
+import os
+import sys
+
+os.environ["MONGO_URI"] = ""
+os.environ["GOOGLE_MAPS_API_KEY"] = "test"
+os.environ["ROUTE_CACHE_L2"] = ""
+os.environ["ROUTING_ENGINE"] = "google"
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
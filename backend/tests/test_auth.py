@@ -0,0 +1,129 @@
+# backend/tests/test_auth.py
+# Bearer token verification (utils/auth.py): expiry, unknown signing keys and the rate-limited
+# JWKS refresh they trigger, and memoized claims for valid tokens.
+
+import json
+import time
+import jwt
+import pytest
+from jwt.algorithms import RSAAlgorithm
+from utils import auth
+from utils.auth import AuthenticationError, JWKSCache, TokenVerifier, user_id_from_authorization
+
+rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+
+ISSUER = "https://issuer.example"
+AUDIENCE = "accessible-nav"
+
+
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwk(private_key, key_id):
+    return {**json.loads(RSAAlgorithm.to_jwk(private_key.public_key())), "kid": key_id, "use": "sig", "alg": "RS256"}
+
+
+def issue(private_key, key_id, expires_in=3600, **claims):
+    now = int(time.time())
+    claims = {"sub": "user-1", "iss": ISSUER, "aud": AUDIENCE, "iat": now, "exp": now + expires_in, **claims}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": key_id})
+
+
+class JWKSEndpoint:
+    """Stands in for requests.get against the issuer's JWKS URL; counts the fetches."""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.calls = 0
+
+    def __call__(self, url, timeout=None):
+        self.calls += 1
+        body = {"keys": list(self.keys)}
+        return type("Response", (), {"raise_for_status": lambda self: None, "json": lambda self: body})()
+
+
+@pytest.fixture(scope="module")
+def key_1():
+    return signing_key()
+
+
+@pytest.fixture
+def endpoint(monkeypatch, key_1):
+    endpoint = JWKSEndpoint([jwk(key_1, "key-1")])
+    monkeypatch.setattr(auth.requests, "get", endpoint)
+    return endpoint
+
+
+@pytest.fixture
+def verifier(endpoint):
+    jwks = JWKSCache("https://issuer.example/.well-known/jwks.json", refresh_seconds=3600, min_refresh_seconds=30)
+    return TokenVerifier(jwks, issuer=ISSUER, audience=AUDIENCE, algorithms=["RS256"], leeway=30)
+
+
+def test_valid_token_is_verified_once_then_served_from_the_cache(verifier, endpoint, key_1, monkeypatch):
+    token = issue(key_1, "key-1")
+
+    assert verifier.verify(token)["sub"] == "user-1"
+
+    def decode(*args, **kwargs):
+        raise AssertionError("signature checked again")
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert verifier.token_cache.stats()["hits"] == 1
+    assert endpoint.calls == 1
+
+
+def test_token_expired_beyond_the_leeway_is_rejected(verifier, key_1):
+    with pytest.raises(AuthenticationError, match="expired"):
+        verifier.verify(issue(key_1, "key-1", expires_in=-31))
+    assert verifier.token_cache.stats()["entries"] == 0
+
+
+def test_token_expired_within_the_leeway_is_accepted_but_not_cached(verifier, key_1):
+    assert verifier.verify(issue(key_1, "key-1", expires_in=-5))["sub"] == "user-1"
+    assert verifier.token_cache.stats()["entries"] == 0
+
+
+def test_token_without_exp_is_rejected(verifier, key_1):
+    token = jwt.encode({"sub": "user-1", "iss": ISSUER, "aud": AUDIENCE}, key_1, algorithm="RS256", headers={"kid": "key-1"})
+    with pytest.raises(AuthenticationError):
+        verifier.verify(token)
+
+
+def test_unknown_key_id_refreshes_the_key_set_at_most_once_per_interval(verifier, endpoint):
+    stranger = signing_key()
+    token = issue(stranger, "key-unknown")
+
+    for _ in range(5):
+        with pytest.raises(AuthenticationError, match="Unknown signing key"):
+            verifier.verify(token)
+    # The initial load finds no such key, and the retry is rate limited
+    assert endpoint.calls == 1
+
+    verifier.jwks._attempted_at -= 30 # min_refresh_seconds later
+    with pytest.raises(AuthenticationError, match="Unknown signing key"):
+        verifier.verify(token)
+    assert endpoint.calls == 2
+
+
+def test_rotated_key_is_picked_up_by_the_unknown_key_refresh(verifier, endpoint, key_1):
+    assert verifier.verify(issue(key_1, "key-1"))["sub"] == "user-1"
+    key_2 = signing_key()
+    endpoint.keys.append(jwk(key_2, "key-2"))
+    verifier.jwks._attempted_at -= 30
+
+    assert verifier.verify(issue(key_2, "key-2", sub="user-2"))["sub"] == "user-2"
+    assert endpoint.calls == 2
+
+
+def test_token_signed_by_another_key_under_a_known_id_is_rejected(verifier):
+    with pytest.raises(AuthenticationError):
+        verifier.verify(issue(signing_key(), "key-1"))
+
+
+def test_authorization_header_with_a_bad_token_has_no_user(verifier, key_1):
+    assert user_id_from_authorization(f"Bearer {issue(key_1, 'key-1')}", verifier) == "user-1"
+    assert user_id_from_authorization(f"Bearer {issue(key_1, 'key-1', expires_in=-60)}", verifier) is None
+    assert user_id_from_authorization("Bearer not-a-jwt", verifier) is None
+    assert user_id_from_authorization(None, verifier) is None
@@ -0,0 +1,152 @@
+# backend/tests/test_bulk_import.py
+# POST /api/accessibility-points/bulk (api/routes_accessibility.py): rows are validated one by one,
+# written in unordered batches of BULK_IMPORT_BATCH_SIZE, and failures are reported by row number.
+
+import json
+import pytest
+from pymongo.errors import BulkWriteError
+from app import create_app
+from api import routes_accessibility
+
+NDJSON = "application/x-ndjson"
+
+
+class PointsCollection:
+    """Records insert_many batches; rows whose description is 'duplicate' fail like a duplicate key."""
+
+    def __init__(self):
+        self.batches = []
+        self.fail_batches = False
+        self.recorded, self.invalidated = [], []
+
+    def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        self.batches.append(list(docs))
+        if self.fail_batches:
+            raise ConnectionError("connection reset")
+        write_errors = [
+            {"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"}
+            for index, doc in enumerate(docs) if doc["description"] == "duplicate"
+        ]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(docs) - len(write_errors)})
+        return type("InsertManyResult", (), {"inserted_ids": list(range(len(docs)))})()
+
+
+@pytest.fixture
+def points(monkeypatch):
+    collection = PointsCollection()
+    db = type("Db", (), {"accessibility_points": collection})()
+    monkeypatch.setattr(routes_accessibility, "get_db", lambda: db)
+    # Tile clusters, overlay invalidation and index refreshes are recorded or skipped, not exercised
+    monkeypatch.setattr(routes_accessibility, "record_points", lambda docs: collection.recorded.extend(docs))
+    monkeypatch.setattr(routes_accessibility, "invalidate_overlays_near", lambda lat, lng: collection.invalidated.append((lat, lng)))
+    monkeypatch.setattr(routes_accessibility, "refresh_point_indexes", lambda: None)
+    return collection
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def point(index, **fields):
+    return {"lat": 6.5 + index * 1e-5, "lng": 3.3, "type": "ramp", "description": f"point {index}", **fields}
+
+
+def ndjson(rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+
+def post(client, body, content_type=NDJSON):
+    return client.post("/api/accessibility-points/bulk", data=body, content_type=content_type)
+
+
+def test_rows_are_written_in_unordered_batches(client, points):
+    response = post(client, ndjson(point(i) for i in range(2500)))
+
+    assert response.status_code == 200
+    assert response.get_json() == {"inserted": 2500, "failed": 0, "errors": [], "errorsTruncated": False}
+    assert [len(batch) for batch in points.batches] == [1000, 1000, 500]
+    assert points.batches[0][0]["source"] == "bulk_import"
+    assert len(points.recorded) == 2500
+
+
+def test_invalid_rows_are_reported_and_skipped(client, points):
+    rows = [
+        point(0),
+        "{not json",
+        "[1, 2]",
+        point(3, type="staircase"),
+        {"lat": 6.5, "type": "ramp"},
+        point(5, lat="north"),
+        "",
+        point(7, severity="extreme"),
+        point(8),
+    ]
+
+    body = post(client, ndjson(rows)).get_json()
+
+    assert body["inserted"] == 2
+    assert body["failed"] == 6
+    assert [error["row"] for error in body["errors"]] == [2, 3, 4, 5, 6, 8]
+    assert body["errors"][0]["error"] == "Invalid JSON"
+    assert body["errors"][1]["error"] == "Each line must be a JSON object"
+    assert body["errors"][2]["error"].startswith("Invalid type")
+    assert body["errors"][3]["error"] == "Missing required fields: lat, lng, type"
+    assert body["errors"][4]["error"].startswith("Invalid coordinates")
+    assert body["errors"][5]["error"].startswith("Invalid severity")
+    assert [doc["description"] for doc in points.batches[0]] == ["point 0", "point 8"]
+
+
+def test_csv_rows_are_numbered_from_the_header(client, points):
+    body = "lat,lng,type,description\n6.5,3.3,ramp,first\n6.6,3.3,,missing type\n6.7,3.3,hazard,\n"
+
+    result = post(client, body, content_type="text/csv").get_json()
+
+    assert result["inserted"] == 2
+    assert result["errors"] == [{"row": 3, "error": "Missing required fields: lat, lng, type"}]
+    assert [doc["description"] for doc in points.batches[0]] == ["first", ""]
+
+
+def test_rows_rejected_by_the_database_are_reported_by_row(client, points, monkeypatch):
+    monkeypatch.setattr(routes_accessibility, "BULK_IMPORT_BATCH_SIZE", 3)
+    rows = [point(0), point(1, description="duplicate"), point(2), point(3), point(4, description="duplicate")]
+
+    body = post(client, ndjson(rows)).get_json()
+
+    assert body["inserted"] == 3
+    assert body["failed"] == 2
+    assert [(error["row"], error["error"]) for error in body["errors"]] == [
+        (2, "E11000 duplicate key error"), (5, "E11000 duplicate key error"),
+    ]
+    assert [len(batch) for batch in points.batches] == [3, 2]
+    # Only stored rows reach the tile clusters and the overlay invalidation
+    assert [doc["description"] for doc in points.recorded] == ["point 0", "point 2", "point 3"]
+
+
+def test_failed_batch_reports_each_of_its_rows(client, points, monkeypatch):
+    monkeypatch.setattr(routes_accessibility, "BULK_IMPORT_BATCH_SIZE", 2)
+    points.fail_batches = True
+
+    body = post(client, ndjson(point(i) for i in range(3))).get_json()
+
+    assert body["inserted"] == 0
+    assert [(error["row"], error["error"]) for error in body["errors"]] == [
+        (1, "Failed to insert row"), (2, "Failed to insert row"), (3, "Failed to insert row"),
+    ]
+    assert points.recorded == [] and points.invalidated == []
+
+
+def test_error_list_is_truncated(client, points, monkeypatch):
+    monkeypatch.setattr(routes_accessibility, "BULK_IMPORT_MAX_ERRORS", 2)
+
+    body = post(client, ndjson(["{bad"] * 5)).get_json()
+
+    assert body["failed"] == 5
+    assert len(body["errors"]) == 2
+    assert body["errorsTruncated"] is True
+
+
+def test_unsupported_content_type_is_rejected(client, points):
+    assert post(client, "[]", content_type="application/json").status_code == 415
@@ -0,0 +1,62 @@
+# backend/tests/test_geocode_cache.py
+# Geocode cache counters (services/google_maps_service.py): each lookup is counted once, so
+# hitRatio and savedUpstreamCalls reflect what the cache actually saved.
+
+import pytest
+from services import google_maps_service
+from utils.cache import LRUCache, SingleFlight, TieredCache
+
+LOCATION = {"lat": 6.5244, "lng": 3.3792}
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def geocoding(monkeypatch):
+    """Fresh cache and counters; the Geocoding API is stubbed. Yields the list of upstream calls."""
+    cache = TieredCache(LRUCache(max_bytes=1024 * 1024, ttl_seconds=60, name="geocode_cache"))
+    monkeypatch.setattr(google_maps_service, "geocode_cache", cache)
+    monkeypatch.setattr(google_maps_service, "geocode_flights", SingleFlight())
+    monkeypatch.setattr(google_maps_service, "geocode_upstream_calls", 0)
+    monkeypatch.setattr(google_maps_service, "geocode_negative_hits", 0)
+    calls = []
+
+    def get_with_retries(url, params, **kwargs):
+        calls.append(params['address'])
+        return StubResponse({"status": "OK", "results": [{"geometry": {"location": LOCATION}}]})
+
+    monkeypatch.setattr(google_maps_service, "get_with_retries", get_with_retries)
+    return calls
+
+
+def test_one_miss_then_one_hit(geocoding):
+    assert google_maps_service.geocode_address("Lagos, Nigeria") == LOCATION
+    assert google_maps_service.geocode_address("  lagos,   NIGERIA ") == LOCATION # Same normalized key
+
+    stats = google_maps_service.geocode_cache_stats()
+    assert geocoding == ["Lagos, Nigeria"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["hitRatio"] == 0.5
+    assert stats["upstreamCalls"] == 1
+    assert stats["savedUpstreamCalls"] == 1
+
+
+def test_misses_only(geocoding):
+    google_maps_service.geocode_address("Lagos, Nigeria")
+    google_maps_service.geocode_address("Abuja, Nigeria")
+
+    stats = google_maps_service.geocode_cache_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 0
+    assert stats["upstreamCalls"] == 2
+    assert stats["savedUpstreamCalls"] == 0
@@ -0,0 +1,67 @@
+# backend/tests/test_json_provider.py
+# The orjson provider writes the same response bytes as Flask's default provider (utils/json_provider.py),
+# and streamed batch results go through the app's provider too.
+
+import json
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from flask import Flask
+from utils.json_provider import MongoJSONProvider, OrjsonProvider
+
+pytest.importorskip("orjson")
+
+PAYLOAD = {
+    "routes": [{"summary": "Ikorodu Rd", "legs": [], "bounds": {"southwest": {"lng": 3.35, "lat": 6.52}}}],
+    "_id": ObjectId("64b0f1a2c3d4e5f601234567"),
+    "createdAt": datetime(2024, 5, 1, 12, 30),
+    "status": "OK",
+}
+
+
+def response_bytes(provider_class, debug=False, sort_keys=True):
+    app = Flask(__name__)
+    app.debug = debug
+    app.json = provider_class(app)
+    app.json.sort_keys = sort_keys
+    with app.app_context():
+        return app.json.response(PAYLOAD).get_data()
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_orjson_response_matches_the_default_provider(debug):
+    assert response_bytes(OrjsonProvider, debug) == response_bytes(MongoJSONProvider, debug)
+
+
+def test_orjson_follows_sort_keys():
+    assert response_bytes(OrjsonProvider, sort_keys=False) == response_bytes(MongoJSONProvider, sort_keys=False)
+    assert response_bytes(OrjsonProvider, sort_keys=False).startswith(b'{"routes":')
+    assert response_bytes(OrjsonProvider).startswith(b'{"_id":')
+
+
+def test_orjson_dumps_defaults_to_the_app_sort_keys():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    assert app.json.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    app.json.sort_keys = False
+    assert app.json.dumps({"b": 1, "a": 2}) == '{"b":1,"a":2}'
+    assert app.json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+
+def test_batch_stream_lines_use_the_app_provider(monkeypatch):
+    from app import create_app
+    from api import routes_navigation
+
+    routes_navigation.route_cache.l1.clear()
+    monkeypatch.setattr(routes_navigation, "fetch_google_directions", lambda params: {"status": "OK", "routes": PAYLOAD["routes"]})
+    app = create_app()
+    body = {"requests": [{"origin": {"lat": 6.5244, "lng": 3.3792}, "destination": {"lat": 6.6018, "lng": 3.3515}}]}
+
+    response = app.test_client().post("/api/route/batch", json=body, headers={"Accept": "application/x-ndjson"})
+    routes_navigation.route_cache.l1.clear()
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.status_code == 200
+    assert len(lines) == 2 # Summary, then the one item
+    with app.app_context():
+        assert all(line == app.json.dumps(json.loads(line)) for line in lines)
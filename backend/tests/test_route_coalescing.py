@@ -0,0 +1,86 @@
+# backend/tests/test_route_coalescing.py
+# Identical concurrent POST /api/route requests must share a single Directions call (route_flights
+# in api/routes_navigation.py), and every caller must get the leader's response.
+
+import threading
+import time
+import pytest
+from app import create_app
+from api import routes_navigation
+from services.google_maps_service import GoogleMapsAPIError
+
+NUM_CALLERS = 8
+ROUTE_BODY = {"origin": {"lat": 6.5244, "lng": 3.3792}, "destination": {"lat": 6.6018, "lng": 3.3515}}
+ROUTE = {"status": "OK", "routes": [{"summary": "Ikorodu Rd", "overview_polyline": {"points": "_p~iF~ps|U_ulLnnqC"}, "legs": []}]}
+
+
+@pytest.fixture
+def app():
+    routes_navigation.route_cache.l1.clear()
+    yield create_app()
+    routes_navigation.route_cache.l1.clear()
+
+
+def wait_for_waiters(baseline, expected, timeout=5):
+    """Blocks until `expected` callers are waiting on the in-flight computation."""
+    deadline = time.monotonic() + timeout
+    while routes_navigation.route_flights.coalesced - baseline < expected:
+        if time.monotonic() > deadline:
+            raise AssertionError("Callers did not all reach the in-flight computation")
+        time.sleep(0.01)
+
+
+def stub_directions(monkeypatch, result):
+    """Replaces the Directions call; it returns (or raises) `result` once every caller is waiting."""
+    calls = []
+    baseline = routes_navigation.route_flights.coalesced
+
+    def fetch(params):
+        calls.append(params)
+        wait_for_waiters(baseline, NUM_CALLERS - 1)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(routes_navigation, "fetch_google_directions", fetch)
+    return calls
+
+
+def post_concurrently(app, body):
+    """Sends NUM_CALLERS identical route requests at once; returns their (status, JSON body) pairs."""
+    responses = [None] * NUM_CALLERS
+    start = threading.Barrier(NUM_CALLERS)
+
+    def call(index):
+        client = app.test_client()
+        start.wait()
+        response = client.post("/api/route", json=body)
+        responses[index] = (response.status_code, response.get_json())
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(NUM_CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return responses
+
+
+def test_identical_requests_share_one_directions_call(app, monkeypatch):
+    calls = stub_directions(monkeypatch, ROUTE)
+
+    responses = post_concurrently(app, ROUTE_BODY)
+
+    assert len(calls) == 1
+    assert all(status == 200 for status, _ in responses)
+    assert all(body == responses[0][1] for _, body in responses)
+    assert responses[0][1]["routes"] == ROUTE["routes"]
+
+
+def test_waiters_get_the_leaders_error(app, monkeypatch):
+    calls = stub_directions(monkeypatch, GoogleMapsAPIError("ZERO_RESULTS"))
+
+    responses = post_concurrently(app, ROUTE_BODY)
+
+    assert len(calls) == 1
+    assert all(status == 404 for status, _ in responses)
+    assert all(body == responses[0][1] for _, body in responses)
@@ -0,0 +1,93 @@
+# backend/tests/test_route_sampling.py
+# The vectorized polyline decoder and the distance-based route sampling behind the hazard overlay
+# (utils/helpers.py, services/database_service.py).
+
+import random
+import numpy as np
+import polyline
+import pytest
+from services.database_service import (
+    sample_route_points, thin_route_points, chunk_corridor_points, OVERLAY_PER_POINT_MAX_QUERIES,
+)
+from utils.helpers import decode_polyline_array, haversine_meters_array, resample_route
+
+# Google's documented example polyline and its points
+EXAMPLE_POLYLINE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+EXAMPLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def eastbound_route(length_meters, vertex_spacing_meters=15):
+    """A straight route along the equator with a vertex every vertex_spacing_meters."""
+    step_degrees = vertex_spacing_meters / 111320
+    return [(0.0, i * step_degrees) for i in range(int(length_meters / vertex_spacing_meters) + 1)]
+
+
+def gaps_meters(points):
+    points = np.asarray(points)
+    return haversine_meters_array(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+
+
+def test_decoder_matches_the_documented_example():
+    decoded = decode_polyline_array(EXAMPLE_POLYLINE)
+    assert decoded.shape == (3, 2)
+    np.testing.assert_allclose(decoded, EXAMPLE_POINTS)
+
+
+def test_decoder_matches_the_polyline_library():
+    random.seed(7)
+    points = [(random.uniform(-85, 85), random.uniform(-180, 180)) for _ in range(500)]
+    encoded = polyline.encode(points)
+    np.testing.assert_allclose(decode_polyline_array(encoded), polyline.decode(encoded))
+
+
+def test_decoder_supports_precision_6():
+    encoded = polyline.encode(EXAMPLE_POINTS, precision=6)
+    np.testing.assert_allclose(decode_polyline_array(encoded, precision=6), EXAMPLE_POINTS)
+
+
+@pytest.mark.parametrize("encoded", [None, "", "_p~iF", "bad polyline\n"])
+def test_decoder_returns_an_empty_array_for_unusable_input(encoded):
+    decoded = decode_polyline_array(encoded)
+    assert decoded.shape == (0, 2)
+
+
+def test_resampling_spaces_points_evenly_and_keeps_the_ends():
+    route = eastbound_route(1000)
+    resampled = resample_route(route, 25)
+    assert len(resampled) == 41
+    np.testing.assert_allclose(resampled[0], route[0])
+    np.testing.assert_allclose(resampled[-1], route[-1])
+    assert gaps_meters(resampled).max() <= 25.0 + 1e-6
+
+
+def test_resampling_fills_in_long_segments():
+    resampled = resample_route([(0.0, 0.0), (0.0, 0.01)], 25) # One ~1.1 km segment
+    assert len(resampled) > 40
+    assert gaps_meters(resampled).max() <= 25.0 + 1e-6
+
+
+def test_resampling_a_zero_length_route_gives_one_point():
+    assert resample_route([(6.5, 3.3), (6.5, 3.3)], 25).tolist() == [[6.5, 3.3]]
+
+
+def test_long_routes_keep_the_radius_spacing():
+    samples = sample_route_points(eastbound_route(50000), radius_meters=25)
+    assert len(samples) > 2000
+    assert gaps_meters(samples).max() <= 25.0 + 1e-6
+
+
+def test_per_point_sampling_is_capped_and_keeps_the_ends():
+    samples = sample_route_points(eastbound_route(50000), radius_meters=25)
+    thinned = thin_route_points(samples, OVERLAY_PER_POINT_MAX_QUERIES)
+    assert len(thinned) == OVERLAY_PER_POINT_MAX_QUERIES
+    assert thinned[0] == samples[0] and thinned[-1] == samples[-1]
+    short = samples[:10]
+    assert thin_route_points(short, OVERLAY_PER_POINT_MAX_QUERIES) is short
+
+
+def test_corridor_chunks_cover_every_sample_in_order():
+    samples = sample_route_points(eastbound_route(50000), radius_meters=25)
+    chunks = chunk_corridor_points(samples, max_clauses=500)
+    assert len(chunks) == -(-len(samples) // 500)
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert [point for chunk in chunks for point in chunk] == samples
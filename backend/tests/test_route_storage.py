@@ -0,0 +1,100 @@
+# backend/tests/test_route_storage.py
+# Compact storage of a saved route's Directions payload (services/route_storage.py): the frontend
+# fields by default, the payload exactly as saved with full=True, and older formats still readable.
+
+import copy
+import json
+import zlib
+from bson import Binary
+from services.route_storage import (
+    pack_route_data, unpack_route_data, prune_route_data, route_projection,
+    PRUNED_FIELD, REST_FIELD, STORAGE_FORMAT,
+)
+
+PAYLOAD = {
+    "status": "OK",
+    "geocoded_waypoints": [{"geocoder_status": "OK", "place_id": "ChIJ1", "types": ["street_address"]}],
+    "routes": [{
+        "summary": "Ikorodu Rd",
+        "bounds": {"northeast": {"lat": 6.6, "lng": 3.4}, "southwest": {"lat": 6.5, "lng": 3.3}},
+        "overview_polyline": {"points": "_p~iF~ps|U_ulLnnqC"},
+        "waypoint_order": [],
+        "custom_accessibility_warnings": [{"_id": "a1", "type": "hazard"}],
+        "legs": [{
+            "distance": {"text": "9.1 km", "value": 9100},
+            "start_address": "Lagos",
+            "via_waypoint": [],
+            "traffic_speed_entry": [],
+            "steps": [
+                {"html_instructions": "Head <b>north</b>", "polyline": {"points": "abc"}, "travel_mode": "WALKING"},
+                {"html_instructions": "Turn left", "travel_mode": "WALKING", "lat_lngs": [[6.5, 3.3]]},
+            ],
+        }],
+    }, {
+        "summary": "Alternative",
+        "legs": [],
+    }],
+}
+
+
+def stored(route_data):
+    """A route document as it comes back from Mongo after saving route_data."""
+    return {"_id": "r1", "name": "Home", **copy.deepcopy(pack_route_data(route_data))}
+
+
+def test_frontend_fields_are_stored_uncompressed():
+    fields = pack_route_data(PAYLOAD)
+    assert fields["storageFormat"] == STORAGE_FORMAT
+    assert fields[PRUNED_FIELD] == prune_route_data(PAYLOAD)
+    assert isinstance(fields[REST_FIELD], Binary)
+    assert "geocoded_waypoints" not in fields[PRUNED_FIELD]
+    assert "via_waypoint" not in fields[PRUNED_FIELD]["routes"][0]["legs"][0]
+
+
+def test_default_read_returns_the_frontend_fields():
+    route = unpack_route_data(stored(PAYLOAD))
+    data = route["googleRouteData"]
+    assert data == prune_route_data(PAYLOAD)
+    assert data["routes"][0]["legs"][0]["steps"][1] == {"html_instructions": "Turn left", "travel_mode": "WALKING"}
+    assert route["name"] == "Home"
+    assert not set(route) & {PRUNED_FIELD, REST_FIELD, "storageFormat"}
+
+
+def test_default_read_works_without_the_compressed_remainder():
+    # GET /api/routes/<id> without ?full=1 projects the remainder away
+    document = stored(PAYLOAD)
+    for field in route_projection():
+        document.pop(field)
+    assert unpack_route_data(document)["googleRouteData"] == prune_route_data(PAYLOAD)
+    assert route_projection(full=True) is None
+
+
+def test_full_read_returns_the_payload_as_saved():
+    assert unpack_route_data(stored(PAYLOAD), full=True)["googleRouteData"] == PAYLOAD
+
+
+def test_payload_with_only_frontend_fields_has_no_remainder():
+    payload = prune_route_data(PAYLOAD)
+    fields = pack_route_data(payload)
+    assert REST_FIELD not in fields
+    assert unpack_route_data(stored(payload), full=True)["googleRouteData"] == payload
+
+
+def test_unexpected_shapes_round_trip():
+    payload = {"status": "ZERO_RESULTS", "routes": [None, {"legs": "not a list"}], "extra": {"x": 1}}
+    assert unpack_route_data(stored(payload), full=True)["googleRouteData"] == payload
+
+
+def test_older_formats_are_still_read():
+    legacy = {"_id": "r0", "googleRouteData": PAYLOAD}
+    assert unpack_route_data(copy.deepcopy(legacy), full=True)["googleRouteData"] == PAYLOAD
+
+    pruned = prune_route_data(PAYLOAD)
+    format_1 = {"googleRouteDataCompressed": Binary(zlib.compress(json.dumps(pruned).encode())), "storageFormat": 1}
+    assert unpack_route_data(dict(format_1), full=True)["googleRouteData"] == pruned
+
+    kept, rest = pruned, {key: value for key, value in PAYLOAD.items() if key not in pruned}
+    blob = json.dumps({"data": kept, "rest": rest}).encode()
+    format_2 = {"googleRouteDataCompressed": Binary(zlib.compress(blob)), "storageFormat": 2}
+    assert unpack_route_data(dict(format_2))["googleRouteData"] == kept
+    assert unpack_route_data(dict(format_2), full=True)["googleRouteData"]["geocoded_waypoints"] == PAYLOAD["geocoded_waypoints"]
@@ -0,0 +1,139 @@
+# backend/tests/test_saved_routes_pagination.py
+# Keyset pagination of GET /api/routes (api/routes_userdata.py): pages of {routes, nextCursor},
+# newest first in (createdAt, _id) order, with an opaque cursor for the next page.
+
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app import create_app
+from api import routes_userdata
+from api.routes_userdata import encode_routes_cursor, decode_routes_cursor
+from utils.auth import AUTH_DEV_USER_ID # Without AUTH_JWKS_URL every request is this user
+
+START = datetime(2025, 3, 1, 9, 0, 0)
+
+
+class RoutesCollection:
+    """Just enough of a Mongo collection for the listing query: equality, $lt, $or, sort, limit."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    @classmethod
+    def _matches(cls, doc, query):
+        for key, condition in query.items():
+            if key == "$or":
+                if not any(cls._matches(doc, clause) for clause in condition):
+                    return False
+            elif isinstance(condition, dict):
+                if not doc[key] < condition["$lt"]:
+                    return False
+            elif doc.get(key) != condition:
+                return False
+        return True
+
+    def find(self, query, projection):
+        found = [doc for doc in self.docs if self._matches(doc, query)]
+        return Cursor([{key: value for key, value in doc.items() if key == "_id" or key in projection} for doc in found])
+
+
+class Cursor(list):
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            super().sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        return Cursor(self[:count])
+
+
+def route(created_at, user_id=AUTH_DEV_USER_ID):
+    return {"_id": ObjectId(), "userId": user_id, "name": "Route", "createdAt": created_at, "googleRouteDataPruned": {}}
+
+
+@pytest.fixture
+def saved_routes(monkeypatch):
+    docs = []
+    db = type("Db", (), {"routes": RoutesCollection(docs)})()
+    monkeypatch.setattr(routes_userdata, "get_db", lambda: db)
+    return docs
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def newest_first(docs):
+    return [str(doc["_id"]) for doc in sorted(docs, key=lambda doc: (doc["createdAt"], doc["_id"]), reverse=True)]
+
+
+def fetch_all_pages(client, limit):
+    ids, pages, cursor = [], [], None
+    while True:
+        url = f"/api/routes?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append(len(body["routes"]))
+        ids += [saved["_id"] for saved in body["routes"]]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    saved = route(START + timedelta(milliseconds=123))
+    assert decode_routes_cursor(encode_routes_cursor(saved)) == (saved["createdAt"], saved["_id"])
+
+
+def test_pages_cover_every_route_once_newest_first(client, saved_routes):
+    saved_routes += [route(START + timedelta(minutes=i)) for i in range(7)]
+    saved_routes.append(route(START + timedelta(minutes=30), user_id="someone_else"))
+    mine = saved_routes[:7]
+
+    ids, pages = fetch_all_pages(client, limit=3)
+
+    assert pages == [3, 3, 1]
+    assert ids == newest_first(mine)
+
+
+def test_routes_saved_in_the_same_millisecond_are_not_skipped_or_repeated(client, saved_routes):
+    # Ties on createdAt fall back to _id, including across a page boundary
+    saved_routes += [route(START) for _ in range(5)] + [route(START + timedelta(seconds=1)) for _ in range(2)]
+
+    ids, pages = fetch_all_pages(client, limit=2)
+
+    assert pages == [2, 2, 2, 1]
+    assert ids == newest_first(saved_routes)
+
+
+def test_last_full_page_has_a_null_cursor(client, saved_routes):
+    saved_routes += [route(START + timedelta(minutes=i)) for i in range(3)]
+
+    body = client.get("/api/routes?limit=3").get_json()
+
+    assert len(body["routes"]) == 3
+    assert body["nextCursor"] is None
+
+
+def test_no_routes(client, saved_routes):
+    assert client.get("/api/routes").get_json() == {"routes": [], "nextCursor": None}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    "bm90IGpzb24", # 'not json'
+    "eyJ0IjoxfQ", # {"t":1}: no id
+    "eyJ0IjoxLCJpZCI6Inh5eiJ9", # {"t":1,"id":"xyz"}: not an ObjectId
+    "eyJ0IjoiYWJjIiwiaWQiOiI2NGIwZjFhMmMzZDRlNWY2MDEyMzQ1NjcifQ", # t is not a number
+])
+def test_invalid_cursor_is_rejected(client, saved_routes, cursor):
+    response = client.get(f"/api/routes?cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "abc"])
+def test_invalid_limit_is_rejected(client, saved_routes, limit):
+    assert client.get(f"/api/routes?limit={limit}").status_code == 400
@@ -0,0 +1,54 @@
+# backend/tests/test_tiered_cache.py
+# Second-tier reads of TieredCache (utils/cache.py) against a real SQLite store: a corrupt or
+# unreadable entry is a miss for the caller, never an exception.
+
+import time
+import zlib
+import pytest
+from services.cache_store import SQLiteCacheStore
+from utils.cache import LRUCache, TieredCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+
+
+def tiered(store):
+    return TieredCache(LRUCache(max_bytes=1024 * 1024, name="test_cache"), store, ttl_seconds=60)
+
+
+def test_second_tier_round_trip(store):
+    writer = tiered(store)
+    writer.set("route:a", {"routes": [1, 2, 3]})
+    writer.flush()
+
+    reader = tiered(store) # Another worker: empty L1
+    assert reader.get("route:a") == {"routes": [1, 2, 3]}
+    assert reader.l2_hits == 1
+    assert "route:a" in reader # Repopulated L1
+
+
+@pytest.mark.parametrize("payload", [
+    zlib.compress(b'{"routes": [1, 2, 3]}')[:-4], # Truncated
+    b"not zlib at all",
+    zlib.compress(b'{"routes": [1, 2'), # Valid zlib, invalid JSON
+])
+def test_corrupt_entry_is_a_miss_and_is_dropped(store, payload):
+    store.set_many([("route:a", payload, time.time() + 60)])
+    cache = tiered(store)
+
+    assert cache.get("route:a", "default") == "default"
+    assert cache.l2_errors == 1
+    assert cache.l2_hits == 0
+    assert store.get("route:a") is None # Dropped, so the recomputed value can replace it
+
+
+def test_failing_store_read_is_a_miss(store, monkeypatch):
+    cache = tiered(store)
+    def broken_get(key):
+        raise OSError("disk I/O error")
+    monkeypatch.setattr(store, "get", broken_get)
+
+    assert cache.get("route:a") is None
+    assert cache.l2_errors == 1
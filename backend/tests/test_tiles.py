@@ -0,0 +1,64 @@
+# backend/tests/test_tiles.py
+# Viewport tiling for the map (services/tile_service.py, /api/accessibility-points/viewport),
+# including viewports that cross the antimeridian.
+
+import pytest
+from app import create_app
+from api import routes_accessibility
+from services.tile_service import tiles_covering
+
+
+def test_tiles_covering_a_small_box():
+    # Lagos at zoom 12, as the frontend's tilesForBounds computes it
+    assert tiles_covering(6.5, 3.3, 6.6, 3.45, 12) == [
+        (2085, 1972), (2086, 1972), (2087, 1972), (2085, 1973), (2086, 1973), (2087, 1973),
+    ]
+
+
+def test_box_ending_on_a_tile_edge_does_not_pull_in_the_next_tile():
+    assert tiles_covering(0.0, 0.0, 45.0, 90.0, 2) == [(2, 1)]
+
+
+def test_box_crossing_the_antimeridian_wraps():
+    # Fiji: 170E to 170W
+    assert tiles_covering(-10.0, 170.0, 10.0, -170.0, 4) == [(15, 7), (0, 7), (15, 8), (0, 8)]
+
+
+def test_box_wrapping_all_the_way_round_covers_each_column_once():
+    assert tiles_covering(-10.0, -179.0, 10.0, 179.0, 1) == [(0, 0), (1, 0), (0, 1), (1, 1)]
+    assert tiles_covering(-10.0, 100.0, 10.0, 120.0, 0) == [(0, 0)]
+    assert tiles_covering(-10.0, 120.0, 10.0, 100.0, 1) == [(0, 0), (1, 0), (0, 1), (1, 1)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    built = []
+
+    def get_tile(z, x, y, point_type=None):
+        built.append((z, x, y))
+        return {"z": z, "x": x, "y": y, "clustered": True, "points": [], "clusters": []}, f"{z}/{x}/{y}"
+
+    monkeypatch.setattr(routes_accessibility, "get_db", lambda: object())
+    monkeypatch.setattr(routes_accessibility, "get_tile", get_tile)
+    client = create_app().test_client()
+    client.built = built
+    return client
+
+
+def test_viewport_across_the_antimeridian_returns_tiles_on_both_sides(client):
+    response = client.get("/api/accessibility-points/viewport?bbox=170,-10,-170,10&zoom=4")
+
+    assert response.status_code == 200
+    assert [(tile["x"], tile["y"]) for tile in response.get_json()["tiles"]] == [(15, 7), (0, 7), (15, 8), (0, 8)]
+    assert client.built == [(4, 15, 7), (4, 0, 7), (4, 15, 8), (4, 0, 8)]
+
+
+@pytest.mark.parametrize("query", [
+    "bbox=3.3,6.6,3.45,6.5&zoom=12", # south > north
+    "bbox=190,-10,200,10&zoom=4", # Longitude out of range
+    "bbox=3.3,6.5,3.45&zoom=12",
+    "bbox=3.3,6.5,3.45,6.6",
+    "bbox=3.3,6.5,3.45,6.6&zoom=23",
+])
+def test_invalid_viewports_are_rejected(client, query):
+    assert client.get(f"/api/accessibility-points/viewport?{query}").status_code == 400
@@ -1,53 +1,173 @@
-# from flask import request, g # Uncomment if using request context or 'g'
+import functools
+import os
+import threading
+import time
+import jwt
+import requests
+from flask import g, jsonify, request
+from utils.cache import LRUCache
 
-# --- Placeholder for Authentication Logic ---
+# --- Authentication ---
+# Bearer JWTs (e.g. from Clerk, Auth0, Firebase) are verified against the issuer's JWKS.
+# Per-request cost is kept low by:
+#   - JWKS keys held in memory and refreshed by a background thread (plus an on-demand, rate-limited
+#     refresh when a token names an unknown key id, i.e. after a key rotation);
+#   - verified tokens memoized in an LRU until their 'exp' (capped at AUTH_TOKEN_CACHE_TTL_SECONDS),
+#     so a client's repeated requests skip signature verification entirely;
+#   - the user id resolved at most once per request and kept on g.user_id.
+# Without AUTH_JWKS_URL, every request is the AUTH_DEV_USER_ID user (local development only).
 
-# In a real app, you would likely have middleware that runs before protected routes.
-# This middleware would:
-# 1. Extract a token (e.g., JWT) from the request headers (Authorization: Bearer <token>).
-# 2. Verify the token using a library like PyJWT and your secret key/public key.
-# 3. If valid, extract the user ID (or other relevant info) from the token payload.
-# 4. Store the user ID on Flask's 'g' object (g.user_id = ...) or pass it explicitly.
-# 5. If invalid, return a 401 Unauthorized error immediately.
+AUTH_JWKS_URL = os.getenv("AUTH_JWKS_URL")
+AUTH_ISSUER = os.getenv("AUTH_ISSUER") # Checked when set
+AUTH_AUDIENCE = os.getenv("AUTH_AUDIENCE") # Checked when set
+AUTH_ALGORITHMS = [name.strip() for name in os.getenv("AUTH_ALGORITHMS", "RS256").split(",") if name.strip()]
+AUTH_USER_ID_CLAIM = os.getenv("AUTH_USER_ID_CLAIM", "sub")
+AUTH_LEEWAY_SECONDS = int(os.getenv("AUTH_LEEWAY_SECONDS", "30")) # Clock skew tolerated on exp/nbf/iat
+AUTH_JWKS_REFRESH_SECONDS = int(os.getenv("AUTH_JWKS_REFRESH_SECONDS", "600"))
+AUTH_JWKS_MIN_REFRESH_SECONDS = int(os.getenv("AUTH_JWKS_MIN_REFRESH_SECONDS", "30")) # Unknown-kid refresh rate limit
+AUTH_JWKS_TIMEOUT_SECONDS = float(os.getenv("AUTH_JWKS_TIMEOUT_SECONDS", "5"))
+AUTH_TOKEN_CACHE_MAX_BYTES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+AUTH_TOKEN_CACHE_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+AUTH_DEV_USER_ID = os.getenv("AUTH_DEV_USER_ID", "temp_user_id_for_testing")
 
-# For services like Clerk, Firebase Auth, Auth0, you'd typically verify their token
-# using their provided SDKs or by checking against their public keys.
+class AuthenticationError(ValueError):
+    """Raised when a bearer token is missing, malformed, expired or fails verification."""
 
-def get_current_user_id():
+
+class JWKSCache:
     """
-    Placeholder function to simulate getting the authenticated user's ID.
-    **REPLACE THIS WITH ACTUAL AUTHENTICATION LOGIC.**
+    Signing keys from a JWKS endpoint, by key id. The first lookup in a process loads the set and
+    starts a daemon thread that reloads it every `refresh_seconds`; a failed reload keeps the
+    previous keys.
     """
-    # Example using Flask 'g' if set by middleware:
-    # user_id = getattr(g, 'user_id', None)
-    # if not user_id:
-    #     # This case should ideally be handled by middleware before reaching here
-    #     # but good practice to check anyway if called directly.
-    #     raise PermissionError("Authentication required") # Or return None/raise specific auth error
-    # return user_id
-
-    # --- Using Static ID for Testing ---
-    print("Warning: Using placeholder user ID for authentication.")
-    return "temp_user_id_for_testing" # <<< REPLACE THIS
-    # --- End Placeholder ---
+
+    def __init__(self, url, refresh_seconds=AUTH_JWKS_REFRESH_SECONDS, min_refresh_seconds=AUTH_JWKS_MIN_REFRESH_SECONDS,
+                 timeout=AUTH_JWKS_TIMEOUT_SECONDS):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self.timeout = timeout
+        self._keys = {}
+        self._attempted_at = float("-inf") # Last fetch attempt, successful or not: the unknown-kid rate limit
+        self._lock = threading.Lock()
+        self._started_pid = None
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def refresh(self):
+        """Reloads the key set. Returns True on success."""
+        self._attempted_at = time.monotonic() # Set first, so callers arriving mid-fetch don't queue up behind it
+        try:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+        except (requests.RequestException, ValueError, jwt.PyJWKSetError) as e:
+            self.fetch_errors += 1
+            print(f"Warning: Could not refresh JWKS from {self.url}: {e}")
+            return False
+        self._keys = {key.key_id: key for key in key_set.keys} # Swapped in whole; readers need no lock
+        self.fetches += 1
+        return True
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            self.refresh()
+
+    def _ensure_started(self):
+        # Per process: threads don't survive a fork (gunicorn --preload)
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid != os.getpid():
+                self.refresh()
+                threading.Thread(target=self._refresh_loop, name="jwks-refresh", daemon=True).start()
+                self._started_pid = os.getpid()
+
+    def get_key(self, key_id):
+        """
+        PyJWK for `key_id`, or None. An unknown id triggers one reload (key rotation), at most one
+        attempt per min_refresh_seconds, so an unreachable JWKS endpoint isn't hammered either.
+        """
+        self._ensure_started()
+        key = self._keys.get(key_id)
+        if key is None and time.monotonic() - self._attempted_at >= self.min_refresh_seconds:
+            with self._lock:
+                if key_id not in self._keys and time.monotonic() - self._attempted_at >= self.min_refresh_seconds:
+                    self.refresh()
+            key = self._keys.get(key_id)
+        return key
+
+
+class TokenVerifier:
+    """Verifies bearer JWTs against a JWKS, memoizing verified claims until the token expires."""
+
+    def __init__(self, jwks, issuer=AUTH_ISSUER, audience=AUTH_AUDIENCE, algorithms=AUTH_ALGORITHMS,
+                 leeway=AUTH_LEEWAY_SECONDS, cache_max_bytes=AUTH_TOKEN_CACHE_MAX_BYTES,
+                 cache_ttl_seconds=AUTH_TOKEN_CACHE_TTL_SECONDS):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = algorithms
+        self.leeway = leeway
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.token_cache = LRUCache(max_bytes=cache_max_bytes, name="token_cache")
+
+    def verify(self, token):
+        """Claims of a valid token; raises AuthenticationError otherwise."""
+        claims = self.token_cache.get(token)
+        if claims is not None:
+            return claims # Entries expire with the token, so no re-check is needed here
+
+        try:
+            key_id = jwt.get_unverified_header(token).get('kid')
+            signing_key = self.jwks.get_key(key_id)
+            if signing_key is None:
+                raise AuthenticationError("Unknown signing key")
+            claims = jwt.decode(
+                token, signing_key.key, algorithms=self.algorithms, audience=self.audience, issuer=self.issuer,
+                leeway=self.leeway, options={"require": ["exp"], "verify_aud": self.audience is not None},
+            )
+        except jwt.PyJWTError as e:
+            raise AuthenticationError(str(e)) from e
+
+        ttl = min(self.cache_ttl_seconds, claims['exp'] - time.time())
+        if ttl > 0:
+            self.token_cache.set(token, claims, ttl_seconds=ttl)
+        return claims
+
+    def stats(self):
+        return {**self.token_cache.stats(), "jwksFetches": self.jwks.fetches, "jwksFetchErrors": self.jwks.fetch_errors}
+
+
+token_verifier = TokenVerifier(JWKSCache(AUTH_JWKS_URL)) if AUTH_JWKS_URL else None
+if token_verifier is None:
+    print(f"Warning: AUTH_JWKS_URL not set. All requests are authenticated as '{AUTH_DEV_USER_ID}' (development only).")
+
+def user_id_from_authorization(authorization, verifier=None):
+    """User id from an 'Authorization: Bearer <jwt>' header value, or None if absent or invalid."""
+    verifier = verifier or token_verifier
+    if verifier is None:
+        return AUTH_DEV_USER_ID
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        return verifier.verify(token.strip()).get(AUTH_USER_ID_CLAIM)
+    except AuthenticationError:
+        return None
+
+def get_current_user_id():
+    """The authenticated user's id for this request (None if unauthenticated), resolved once per request."""
+    if 'user_id' not in g:
+        g.user_id = user_id_from_authorization(request.headers.get('Authorization'))
+    return g.user_id
 
 def require_auth(func):
-    """
-    (Placeholder Decorator) Example of how you might protect routes.
-    In a real app, this would integrate with your middleware/token verification.
-    """
-    # @functools.wraps(func) # Use wraps for better introspection
+    """Rejects requests without a valid bearer token with 401; the handler can read g.user_id."""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        try:
-            user_id = get_current_user_id() # Or check g.user_id directly if middleware sets it
-            if not user_id:
-                # This part might be redundant if middleware handles 401
-                return jsonify({"error": "Authentication required"}), 401
-            # You could add role checks here too if needed
-            # g.user_id = user_id # Optionally ensure 'g' is set if needed downstream
-            return func(*args, **kwargs)
-        except Exception as e:
-            # Catch potential errors from get_current_user_id or auth checks
-             return jsonify({"error": str(e)}), 401 # Or a more specific error code
-    # wrapper.__name__ = func.__name__ # Needed if not using functools.wraps
-    return wrapper
\ No newline at end of file
+        if not get_current_user_id():
+            return jsonify({"error": "Authentication required"}), 401
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,351 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from utils.metrics import CACHE_BYTES, CACHE_EVICTIONS, CACHE_LOOKUPS
+
+def estimate_json_size(value):
+    """Approximate in-memory cost of a JSON-like value, measured as its compact serialized size."""
+    return len(json.dumps(value, separators=(',', ':'), default=str))
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and a memory budget in bytes (not an entry count).
+    Entry sizes come from `size_func` (serialized JSON length by default), so one large
+    multi-leg transit response counts for what it actually weighs. Lookups, evictions and
+    byte usage are also exported to Prometheus, labelled with `name`.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds=None, size_func=estimate_json_size, name="cache"):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_func = size_func
+        self.name = name
+        self._entries = OrderedDict() # key -> (value, size_bytes, expires_at); oldest first
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_metric = CACHE_LOOKUPS.labels(name, "hit")
+        self._miss_metric = CACHE_LOOKUPS.labels(name, "miss")
+        self._lru_eviction_metric = CACHE_EVICTIONS.labels(name, "lru")
+        self._expiration_metric = CACHE_EVICTIONS.labels(name, "expired")
+        self._bytes_metric = CACHE_BYTES.labels(name)
+
+    def _remove(self, key):
+        _, size_bytes, _ = self._entries.pop(key)
+        self._bytes -= size_bytes
+
+    def get(self, key, default=None):
+        """Returns the cached value (refreshing its LRU position) or `default` if missing/expired."""
+        expired = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry, expired = None, True
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        # Prometheus counters are updated outside the lock
+        if entry is None:
+            self._miss_metric.inc()
+            if expired:
+                self._expiration_metric.inc()
+            return default
+        self._hit_metric.inc()
+        return entry[0]
+
+    def peek(self, key, default=None):
+        """Like get, but leaves the hit/miss counters and the LRU order alone (for re-checks)."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[2] is not None and entry[2] <= time.monotonic()):
+            return default
+        return entry[0]
+
+    def set(self, key, value, ttl_seconds=None):
+        """Stores a value, evicting least recently used entries until the byte budget fits."""
+        size_bytes = self.size_func(value)
+        if size_bytes > self.max_bytes:
+            print(f"{self.name}: not caching entry of {size_bytes} bytes (budget {self.max_bytes}).")
+            return False
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size_bytes, expires_at)
+            self._bytes += size_bytes
+            evicted = 0
+            while self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                evicted += 1
+            self.evictions += evicted
+            bytes_now = self._bytes
+        if evicted:
+            self._lru_eviction_metric.inc(evicted)
+        self._bytes_metric.set(bytes_now)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            bytes_now = self._bytes
+        self._bytes_metric.set(bytes_now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self._bytes_metric.set(0)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counter snapshot for monitoring (hits, misses, evictions, expirations, byte usage)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class TieredCache:
+    """
+    Per-worker LRUCache in front of a shared second-tier store (see services/cache_store.py).
+    Reads are read-through: an L1 miss checks the store and repopulates L1.
+    Writes are write-behind: L1 is updated immediately and the store write is queued for a
+    background thread, so a route computed by one worker is served by all of them without
+    the request paying for compression or the store round trip.
+    """
+
+    def __init__(self, l1, store=None, ttl_seconds=None, write_queue_size=1000, compress_level=6):
+        self.l1 = l1
+        self.store = store
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else l1.ttl_seconds
+        self.compress_level = compress_level
+        self.name = l1.name
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self.l2_writes = 0
+        self.l2_dropped_writes = 0
+        self._l2_hit_metric = CACHE_LOOKUPS.labels(f"{self.name}_l2", "hit")
+        self._l2_miss_metric = CACHE_LOOKUPS.labels(f"{self.name}_l2", "miss")
+        self._write_queue = queue.Queue(maxsize=write_queue_size)
+        self._writer = None
+        if store is not None:
+            self._writer = threading.Thread(target=self._write_loop, name=f"{self.name}-writer", daemon=True)
+            self._writer.start()
+
+    def get(self, key, default=None):
+        value = self.l1.get(key)
+        if value is not None or self.store is None:
+            return value if value is not None else default
+        payload = None
+        try:
+            payload = self.store.get(key)
+            if payload is None:
+                self.l2_misses += 1
+                self._l2_miss_metric.inc()
+                return default
+            value = json.loads(zlib.decompress(payload))
+        except Exception as e:
+            print(f"{self.name}: second-tier read of {key!r} failed: {e}")
+            self.l2_errors += 1
+            if payload is not None:
+                self._drop_corrupt(key)
+            return default
+        self.l2_hits += 1
+        self._l2_hit_metric.inc()
+        self.l1.set(key, value)
+        return value
+
+    def peek(self, key, default=None):
+        """L1 only, without counting a lookup. Values computed in this worker always land in L1."""
+        return self.l1.peek(key, default)
+
+    def _drop_corrupt(self, key):
+        """Deletes an entry that can't be decoded (e.g. truncated), so the recomputed value replaces it."""
+        try:
+            self.store.delete(key)
+        except Exception as e:
+            print(f"{self.name}: could not delete corrupt second-tier entry {key!r}: {e}")
+
+    def set(self, key, value, ttl_seconds=None):
+        stored = self.l1.set(key, value, ttl_seconds)
+        if self.store is not None:
+            ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+            try:
+                self._write_queue.put_nowait((key, value, time.time() + (ttl or 86400)))
+            except queue.Full:
+                self.l2_dropped_writes += 1 # It's a cache: shed writes rather than block requests
+        return stored
+
+    def delete(self, key):
+        self.l1.delete(key) # Store entries expire on their own TTL
+
+    def _write_loop(self):
+        while True:
+            batch = [self._write_queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                items = [
+                    (key, zlib.compress(json.dumps(value, separators=(',', ':'), default=str).encode(), self.compress_level), expires_at)
+                    for key, value, expires_at in batch
+                ]
+                self.store.set_many(items)
+                self.l2_writes += len(items)
+            except Exception as e:
+                print(f"{self.name}: second-tier write of {len(batch)} entries failed: {e}")
+                self.l2_errors += 1
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def flush(self):
+        """Blocks until all queued second-tier writes have been attempted."""
+        if self._writer is not None:
+            self._write_queue.join()
+
+    def __contains__(self, key):
+        return key in self.l1
+
+    def __len__(self):
+        return len(self.l1)
+
+    def stats(self):
+        stats = self.l1.stats()
+        if self.store is not None:
+            stats["secondTier"] = {
+                "backend": type(self.store).__name__,
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "errors": self.l2_errors,
+                "writes": self.l2_writes,
+                "droppedWrites": self.l2_dropped_writes,
+                "pendingWrites": self._write_queue.qsize(),
+            }
+        return stats
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller (the leader) runs the
+    function, later callers block until it finishes and receive the same result or exception.
+    """
+
+    class _Call:
+        __slots__ = ('done', 'result', 'error', 'waiters')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.waiters = 0
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, func, timeout=None):
+        """
+        Runs func() once per key among concurrent callers and returns its result.
+        Waiters raise TimeoutError if the leader takes longer than `timeout` seconds;
+        the leader itself is never interrupted.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = self._Call()
+                self.leaders += 1
+                is_leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                is_leader = False
+
+        if is_leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight call")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"inFlight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight: concurrent awaits for one key share a single coroutine run."""
+
+    def __init__(self):
+        self._futures = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_func, timeout=None):
+        future = self._futures.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so a waiter timing out doesn't cancel the leader's shared result
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        self.leaders += 1
+        try:
+            result = await coro_func()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # Mark retrieved; the leader re-raises it below
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._futures.pop(key, None)
+
+    def stats(self):
+        return {"inFlight": len(self._futures), "leaders": self.leaders, "coalesced": self.coalesced}
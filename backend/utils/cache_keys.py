@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import re
+
+# Coordinates are snapped before keying so nearby GPS fixes share cached routes.
+# Decimal places: 4 ~ 11 m, 3 ~ 110 m. A geohash precision > 0 takes precedence (7 ~ 150 m cells).
+ROUTE_CACHE_COORD_PRECISION = int(os.getenv("ROUTE_CACHE_COORD_PRECISION", "4"))
+ROUTE_CACHE_GEOHASH_PRECISION = int(os.getenv("ROUTE_CACHE_GEOHASH_PRECISION", "0"))
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_COORDINATE_STRING = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+def geohash_encode(lat, lng, precision):
+    """Standard geohash of a coordinate, `precision` characters long."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, value_range = (lng, lng_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def normalize_coordinates(lat, lng, precision=None, geohash_precision=None):
+    """Snaps a coordinate to its cache cell: a geohash string or a rounded 'lat,lng' string."""
+    precision = ROUTE_CACHE_COORD_PRECISION if precision is None else precision
+    geohash_precision = ROUTE_CACHE_GEOHASH_PRECISION if geohash_precision is None else geohash_precision
+    lat, lng = float(lat), float(lng)
+    if geohash_precision > 0:
+        return f"gh:{geohash_encode(lat, lng, geohash_precision)}"
+    # Adding 0.0 turns -0.0 into 0.0 so both sides of the equator/meridian key the same
+    return f"{round(lat, precision) + 0.0:.{precision}f},{round(lng, precision) + 0.0:.{precision}f}"
+
+def normalize_address(address):
+    """Canonicalizes a free-text address: case, whitespace, comma spacing and trailing punctuation."""
+    address = " ".join(address.lower().split())
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return address.strip(" .,;")
+
+def normalize_location(location, precision=None, geohash_precision=None):
+    """Normalizes an origin/destination given as {lat, lng}, a 'lat,lng' string or an address."""
+    if isinstance(location, dict):
+        return normalize_coordinates(location['lat'], location['lng'], precision, geohash_precision)
+    location = str(location)
+    match = _COORDINATE_STRING.match(location)
+    if match:
+        return normalize_coordinates(match.group(1), match.group(2), precision, geohash_precision)
+    return f"addr:{normalize_address(location)}"
+
+def build_route_cache_key(origin, destination, preferences):
+    """
+    Stable, hashed cache key for a route request. `preferences` should hold the effective
+    (defaulted) routing preferences; key order and formatting of the inputs don't matter.
+    """
+    canonical = json.dumps(
+        {"o": normalize_location(origin), "d": normalize_location(destination), "p": preferences},
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return "route:" + hashlib.sha1(canonical.encode()).hexdigest()
@@ -0,0 +1,68 @@
+import gzip
+import os
+from utils.timing import span
+
+try:
+    import brotli
+except ImportError: # Optional; gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024")) # Smaller bodies don't gain enough to pay for it
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5")) # 4-6 is the usual dynamic-content range
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+def negotiate_encoding(accept_encoding):
+    """Picks 'br' or 'gzip' from an Accept-Encoding header (honouring q=0), or None."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0) # mtime=0 keeps output deterministic
+
+def compress_response(response, accept_encoding):
+    """Compresses a buffered Flask response in place when the client accepts it and it's worth it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    with span("compress"):
+        response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ per encoding, so a strong validator must not be shared; a weak one still
+    # matches If-None-Match (werkzeug compares ETags weakly there)
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    from flask import request
+
+    @app.after_request
+    def compress_after_request(response):
+        return compress_response(response, request.headers.get('Accept-Encoding'))
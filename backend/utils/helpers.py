@@ -1,5 +1,9 @@
+import math
+import numpy as np
 import polyline
 
+EARTH_RADIUS_METERS = 6378100 # Radius MongoDB uses for $centerSphere / $nearSphere distances
+
 def decode_google_polyline(encoded_polyline):
     """
     Decodes a Google Maps encoded polyline string into list of (lat, lng) tuples.
@@ -16,5 +20,71 @@ def decode_google_polyline(encoded_polyline):
         print(f"Error decoding polyline: {e}")
         return []
 
+def haversine_meters(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in meters between two (lat, lng) points.
+    Uses the same earth radius as MongoDB's spherical geo queries.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+def decode_polyline_array(encoded_polyline, precision=5):
+    """
+    Vectorized polyline decoder. Returns a contiguous (n, 2) float64 array of [lat, lng] rows.
+    Produces the same coordinates as polyline.decode without building per-vertex tuples.
+    Returns an empty (0, 2) array on error or if input is None/empty.
+    """
+    if not encoded_polyline:
+        return np.empty((0, 2), dtype=np.float64)
+    try:
+        chunks = np.frombuffer(encoded_polyline.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+        if chunks.min() < 0:
+            raise ValueError("invalid character in encoded polyline")
+        # Each value is a run of 5-bit chunks; a chunk without the 0x20 continuation bit ends the run
+        value_ends = np.flatnonzero(chunks < 0x20)
+        if len(value_ends) < 2:
+            return np.empty((0, 2), dtype=np.float64)
+        value_ends = value_ends[:len(value_ends) // 2 * 2] # Drop a dangling lat without its lng
+        chunks = chunks[:value_ends[-1] + 1]
+        value_starts = np.concatenate(([0], value_ends[:-1] + 1))
+        shifts = np.arange(len(chunks)) - np.repeat(value_starts, value_ends - value_starts + 1)
+        raw = np.add.reduceat((chunks & 0x1f) << (5 * shifts), value_starts)
+        deltas = np.where(raw & 1, ~(raw >> 1), raw >> 1) # Undo the zig-zag sign encoding
+        return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10 ** precision
+    except Exception as e:
+        print(f"Error decoding polyline: {e}")
+        return np.empty((0, 2), dtype=np.float64)
+
+def haversine_meters_array(lats1, lngs1, lats2, lngs2):
+    """Vectorized haversine_meters over NumPy arrays (or scalars broadcast against arrays)."""
+    phi1, phi2 = np.radians(lats1), np.radians(lats2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.asarray(lngs2) - np.asarray(lngs1))
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def resample_route(route_points, spacing_meters):
+    """
+    Resamples a route to points spaced evenly by distance along it (rather than by vertex index),
+    so dense city sections are not over-sampled and long straight segments leave no gaps.
+    Accepts an (n, 2) array or list of (lat, lng); returns an (m, 2) array including both endpoints.
+    """
+    points = np.asarray(route_points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2 or spacing_meters <= 0:
+        return points
+    segment_lengths = haversine_meters_array(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+    cumulative = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+    total_length = cumulative[-1]
+    if total_length == 0:
+        return points[:1]
+    num_samples = int(np.ceil(total_length / spacing_meters)) + 1
+    targets = np.linspace(0.0, total_length, num_samples)
+    # Linear interpolation in lat/lng is accurate enough at overlay spacings (tens of meters)
+    return np.column_stack((np.interp(targets, cumulative, points[:, 0]),
+                            np.interp(targets, cumulative, points[:, 1])))
+
 # Add other general helper functions here if needed
-# e.g., def format_timestamp(ts): ...
\ No newline at end of file
+# e.g., def format_timestamp(ts): ...
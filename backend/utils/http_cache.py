@@ -0,0 +1,28 @@
+import hashlib
+from flask import current_app, jsonify, request
+
+# --- HTTP Caching (ETag / Cache-Control) ---
+# Per-user data is private and always revalidated (a 304 costs one small query)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+# --- Utilities for Conditional GET ---
+def etag_for(*parts):
+    """Strong ETag from the values that identify a representation (ids, updatedAt, ...)."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+def conditional_json(etag, cache_control, build_body):
+    """
+    JSON response carrying `etag` and `cache_control`. If the request's If-None-Match already holds
+    the ETag, answers 304 without calling build_body, so nothing is decompressed or serialized.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        # Echo the validator the client holds: compressed 200s carry it weakened (utils/compression.py)
+        response.set_etag(etag, weak=not request.if_none_match.contains(etag))
+    else:
+        response = jsonify(build_body())
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if cache_control.startswith('private'):
+        response.vary.add('Authorization')
+    return response
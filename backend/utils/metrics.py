@@ -0,0 +1,141 @@
+# backend/utils/metrics.py
+# Prometheus metrics, served at /metrics.
+#
+# Under gunicorn every worker records into its own mmap'd files in PROMETHEUS_MULTIPROC_DIR
+# (gunicorn.conf.py sets one up and cleans up after dead workers) and /metrics merges all of
+# them, so a scrape sees the whole instance whichever worker answers it. Without that directory
+# (flask run, a single uvicorn process) metrics live in the default in-process registry.
+# Recording a sample is a dict lookup plus a locked float add (and an mmap write in multiprocess
+# mode), about a microsecond, so instrumentation stays on in production.
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from pymongo import monitoring
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN") # When set, /metrics requires 'Authorization: Bearer <token>'
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+POLYLINE_POINT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+OVERLAY_ISSUE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint (URL rule), method and status.",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+GOOGLE_API_LATENCY = Histogram(
+    "google_api_request_duration_seconds", "Google Maps API call latency, retries included.",
+    ["api"], buckets=LATENCY_BUCKETS,
+)
+GOOGLE_API_RESPONSES = Counter(
+    "google_api_responses", "Google Maps API outcomes: the response 'status' (OK, ZERO_RESULTS, ...) or a transport failure.",
+    ["api", "status"],
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by call site and command (find, getMore, ...).",
+    ["call_site", "command"], buckets=MONGO_LATENCY_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures", "Failed MongoDB commands by call site and command.", ["call_site", "command"],
+)
+CACHE_LOOKUPS = Counter("cache_lookups", "Cache lookups by cache and result (hit or miss).", ["cache", "result"])
+CACHE_EVICTIONS = Counter(
+    "cache_evictions", "Entries dropped by cache and reason (lru: over the byte budget, expired: past TTL).", ["cache", "reason"],
+)
+CACHE_BYTES = Gauge("cache_bytes", "Estimated bytes held, summed over live workers.", ["cache"], multiprocess_mode="livesum")
+POLYLINE_POINTS = Histogram(
+    "route_polyline_points", "Points in each decoded route overview polyline.", buckets=POLYLINE_POINT_BUCKETS,
+)
+OVERLAY_ISSUES = Histogram(
+    "route_overlay_issues", "Accessibility issues found along a route, by lookup source.", ["source"], buckets=OVERLAY_ISSUE_BUCKETS,
+)
+
+# --- MongoDB Call Sites ---
+# Commands are timed by a pymongo CommandListener and labelled with the innermost active call
+# site: the Flask endpoint during a request, or a name set with mongo_call_site() by services
+# and background threads. The listener runs in the thread (or asyncio task) issuing the command.
+_call_site = ContextVar("mongo_call_site", default="other")
+
+@contextmanager
+def mongo_call_site(name):
+    """Labels MongoDB commands issued inside the block (or decorated function) with `name`."""
+    token = _call_site.set(name)
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.labels(_call_site.get(), event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        call_site = _call_site.get()
+        MONGO_COMMAND_LATENCY.labels(call_site, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(call_site, event.command_name).inc()
+
+
+def mongo_event_listeners():
+    """event_listeners for a (Async)MongoClient: command metrics, unless metrics are disabled."""
+    return [MongoCommandMetrics()] if METRICS_ENABLED else []
+
+def observe_google_call(api, status, seconds):
+    GOOGLE_API_LATENCY.labels(api).observe(seconds)
+    GOOGLE_API_RESPONSES.labels(api, status).inc()
+
+def observe_request(method, endpoint, status, seconds):
+    REQUEST_LATENCY.labels(method, endpoint, str(status)).observe(seconds)
+
+def render_metrics():
+    """Exposition text for every worker (multiprocess mode) or this process."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def init_metrics(app):
+    """
+    Times every request and serves /metrics. Register before other after_request hooks
+    (e.g. compression) so their work is included in the measured latency.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.mongo_call_site_token = _call_site.set(request.endpoint or "unmatched")
+
+    @app.after_request
+    def observe_request_latency(response):
+        started = g.get('request_started')
+        if started is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            observe_request(request.method, rule, response.status_code, time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def reset_mongo_call_site(error=None):
+        token = g.pop('mongo_call_site_token', None)
+        if token is not None:
+            _call_site.reset(token)
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint."""
+        if METRICS_AUTH_TOKEN:
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip(), METRICS_AUTH_TOKEN):
+                return Response("Unauthorized\n", status=401, mimetype='text/plain')
+        return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,144 @@
+# backend/utils/profiling.py
+# Opt-in profiler for 1 in N requests, writing flamegraph-ready files to PROFILE_DIR:
+#   - 'stack' (default): a daemon thread samples the request thread's stack every
+#     PROFILE_INTERVAL_MS and writes collapsed stacks (*.folded), the input format of
+#     flamegraph.pl, inferno and speedscope. Cheap enough to leave on at a low rate.
+#   - 'cprofile': deterministic cProfile of the whole request (*.prof, pstats format for
+#     snakeviz, flameprof or gprof2dot). Far more overhead; one request at a time per worker.
+# Off by default (PROFILE_EVERY_N=0). To turn it on or change N on a running server, with no
+# restart or redeploy, write N into PROFILE_DIR/enable (0 turns it off); each worker re-reads
+# the file every PROFILE_CONTROL_CHECK_SECONDS, and deleting it restores PROFILE_EVERY_N.
+
+import cProfile
+import functools
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BACKEND_DIR, "profiles"))
+PROFILE_EVERY_N = int(os.getenv("PROFILE_EVERY_N", "0")) # Profile every Nth request per worker; 0 = off
+PROFILE_MODE = os.getenv("PROFILE_MODE", "stack").lower() # 'stack' or 'cprofile'
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_CONTROL_CHECK_SECONDS = float(os.getenv("PROFILE_CONTROL_CHECK_SECONDS", "5"))
+
+@functools.lru_cache(maxsize=4096)
+def _frame_label(filename, name, first_line):
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:]) # e.g. 'flask/app.py'
+    return f"{name} ({filename}:{first_line})"
+
+def collapse_stack(frame):
+    """'outer;...;inner' labels for a frame and its callers (one line of a .folded file)."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Counts one thread's collapsed stacks, sampled every `interval` seconds on a daemon thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Decides which requests to profile (every Nth per worker) and writes their profiles."""
+
+    def __init__(self, directory=PROFILE_DIR, every_n=PROFILE_EVERY_N, mode=PROFILE_MODE, interval_ms=PROFILE_INTERVAL_MS):
+        self.directory = directory
+        self.every_n = every_n
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.control_file = os.path.join(directory, "enable")
+        self._override = None # N from the control file, if present
+        self._checked_at = float("-inf")
+        self._requests = itertools.count(1)
+        self._files = itertools.count(1)
+        self._cprofile_lock = threading.Lock() # Only one cProfile can be active at a time (Python 3.12+)
+
+    def current_every_n(self):
+        now = time.monotonic()
+        if now - self._checked_at >= PROFILE_CONTROL_CHECK_SECONDS:
+            self._checked_at = now
+            try:
+                with open(self.control_file) as f:
+                    self._override = int(f.read().strip() or "0")
+            except FileNotFoundError:
+                self._override = None
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring profiler control file {self.control_file}: {e}")
+                self._override = None
+        return self._override if self._override is not None else self.every_n
+
+    def maybe_start(self):
+        """Starts profiling the calling thread if this request is sampled. Returns a handle for stop(), or None."""
+        every_n = self.current_every_n()
+        if every_n <= 0 or next(self._requests) % every_n:
+            return None
+        if self.mode == "cprofile":
+            if not self._cprofile_lock.acquire(blocking=False):
+                return None
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        return StackSampler(threading.get_ident(), self.interval).start()
+
+    def stop(self, handle, label):
+        """Stops a profile from maybe_start() and writes it. Returns the file path (None if nothing was sampled)."""
+        if isinstance(handle, cProfile.Profile):
+            handle.disable()
+            self._cprofile_lock.release()
+        else:
+            handle.stop()
+            if not handle.stacks:
+                return None # Request finished within one sampling interval
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label or "request")
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._files)}-{safe_label}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if isinstance(handle, cProfile.Profile):
+                path = os.path.join(self.directory, f"{name}.prof")
+                handle.dump_stats(path)
+            else:
+                path = os.path.join(self.directory, f"{name}.folded")
+                handle.write(path)
+        except OSError as e:
+            print(f"Warning: Could not write profile to {self.directory}: {e}")
+            return None
+        return path
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,45 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to `capacity` tokens and regains `refill_per_second`
+    of them continuously. Shared by every request in a worker, so it caps the worker's total
+    rate however the work is split across requests.
+    """
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Takes `tokens` if available right now. Never blocks."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.granted += tokens
+                return True
+            self.denied += tokens
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                "available": round(self._tokens, 2),
+                "capacity": self.capacity,
+                "refillPerSecond": self.refill_per_second,
+                "granted": self.granted,
+                "denied": self.denied,
+            }
@@ -0,0 +1,127 @@
+# backend/utils/timing.py
+# Per-request stage timing. Code marks the stages of a request with `with span("directions"):`;
+# durations are summed per stage name and returned in a Server-Timing header (shown in the
+# browser's network panel) and logged as one JSON line per request, e.g.
+#   Server-Timing: cache;dur=0.1, directions;dur=212.4, decode;dur=0.9, overlay_query;dur=31.2, ...
+# Spans nest (decode and overlay_query are parts of overlay) and are no-ops outside a timed request:
+# CLI commands, background threads, and pool threads, which don't carry the request's context.
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from utils.profiling import request_profiler
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "True").lower() == "true"
+TIMING_LOG_ENABLED = os.getenv("TIMING_LOG_ENABLED", "True").lower() == "true"
+TIMING_LOG_MIN_MS = float(os.getenv("TIMING_LOG_MIN_MS", "0")) # Only log requests at least this slow
+
+# One JSON object per line on stdout, next to gunicorn's own output
+logger = logging.getLogger("accessible_nav.timing")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Stage durations of one request, summed per stage name (in first-seen order)."""
+
+    __slots__ = ('started', 'stages')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {} # name -> [seconds, count]
+
+    def add(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            stage[0] += seconds
+            stage[1] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value, durations in milliseconds."""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in self.stages.items()]
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def log(self, method, path, status, total_seconds, **fields):
+        if not TIMING_LOG_ENABLED or total_seconds * 1000 < TIMING_LOG_MIN_MS:
+            return
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "method": method,
+            "path": path,
+            "status": status,
+            "totalMs": round(total_seconds * 1000, 2),
+            "stages": {name: {"ms": round(seconds * 1000, 2), "count": count} for name, (seconds, count) in self.stages.items()},
+            **{key: value for key, value in fields.items() if value is not None},
+        }))
+
+
+def start_timing():
+    """Starts timing the current request (or asyncio task). Returns (timings, token for stop_timing)."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+def stop_timing(token):
+    _current.reset(token)
+
+@contextmanager
+def span(name):
+    """Adds the block's duration to stage `name` of the current request, if one is being timed."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+def init_request_timing(app):
+    """
+    Times every request, sampling 1 in PROFILE_EVERY_N into the profiler (utils/profiling.py).
+    Register before compression so its work falls inside the measured request.
+    """
+    @app.before_request
+    def start_request_timing():
+        g.request_timings, g.request_timings_token = start_timing()
+        g.request_profile = request_profiler.maybe_start()
+
+    @app.after_request
+    def finish_request_timing(response):
+        timings = g.get('request_timings')
+        if timings is None:
+            return response
+        total_seconds = timings.elapsed()
+        profile = g.pop('request_profile', None)
+        profile_path = request_profiler.stop(profile, request.endpoint) if profile is not None else None
+        if SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = timings.server_timing(total_seconds)
+        timings.log(request.method, request.path, response.status_code, total_seconds,
+                    endpoint=request.endpoint, profile=profile_path)
+        return response
+
+    @app.teardown_request
+    def reset_request_timing(error=None):
+        profile = g.pop('request_profile', None) # Only left over if after_request never ran
+        if profile is not None:
+            request_profiler.stop(profile, request.endpoint)
+        token = g.pop('request_timings_token', None)
+        if token is not None:
+            stop_timing(token)
@@ -1,7 +1,9 @@
 // frontend/src/components/MapComponent.jsx
 
-import React, { useState, useEffect, useCallback } from 'react'; // Removed unused useRef
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { GoogleMap, useJsApiLoader, Marker, DirectionsRenderer } from '@react-google-maps/api';
+import { getAccessibilityTile } from '../services/api';
+import { tilesForBounds } from '../utils/helpers';
 
 // Updated containerStyle to fill parent height
 const containerStyle = {
@@ -15,6 +17,46 @@ const defaultCenter = {
   lng: 3.3792
 };
 
+// Accessibility point tiles: kept in memory as long as the backend caches them (its max-age),
+// so panning back over a tile costs no request at all
+const TILE_FRESH_MS = 60 * 1000;
+const TILE_MEMORY_MAX = 64;
+const MAX_VIEWPORT_TILES = 64; // Skip loading points rather than flood the backend on a huge viewport
+
+const POINT_COLORS = {
+  ramp: '#16a34a',
+  elevator: '#2563eb',
+  step_free_entrance: '#0d9488',
+  accessible_restroom: '#7c3aed',
+  missing_curb_cut: '#ea580c',
+  hazard: '#dc2626',
+};
+const DEFAULT_POINT_COLOR = '#6b7280';
+
+const pointIcon = (type) => ({
+  path: window.google.maps.SymbolPath.CIRCLE,
+  scale: 6,
+  fillColor: POINT_COLORS[type] || DEFAULT_POINT_COLOR,
+  fillOpacity: 0.9,
+  strokeColor: '#ffffff',
+  strokeWeight: 1.5,
+});
+
+const clusterIcon = (count) => ({
+  path: window.google.maps.SymbolPath.CIRCLE,
+  scale: 10 + 4 * Math.log10(count), // Grows with the order of magnitude
+  fillColor: '#4f46e5',
+  fillOpacity: 0.75,
+  strokeColor: '#ffffff',
+  strokeWeight: 2,
+});
+
+const clusterTitle = (cluster) =>
+  Object.entries(cluster.types)
+    .sort(([, a], [, b]) => b - a)
+    .map(([type, count]) => `${type}: ${count}`)
+    .join('\n');
+
 // Simple Loading Spinner Component (or use a library like react-spinners)
 const LoadingSpinner = () => (
   <div className="flex flex-col justify-center items-center h-full text-gray-500">
@@ -36,6 +78,9 @@ function MapComponent({ routeResponse }) {
   const [map, setMap] = useState(null);
   // Center state can still be useful if you want to manually pan later
   const [center, setCenter] = useState(defaultCenter);
+  const [pointTiles, setPointTiles] = useState([]);
+  const tileMemory = useRef(new Map()); // "z/x/y" -> { tile, fetchedAt }, oldest first
+  const tileGeneration = useRef(0); // Drops tiles of a viewport the user already moved away from
 
   const onLoad = useCallback(function callback(mapInstance) {
     // Initial setup, maybe set slightly different zoom?
@@ -50,6 +95,47 @@ function MapComponent({ routeResponse }) {
   }, []); // Empty dependency array is correct here
 
 
+  const loadTile = useCallback(async ({ z, x, y }) => {
+    const key = `${z}/${x}/${y}`;
+    const remembered = tileMemory.current.get(key);
+    if (remembered && Date.now() - remembered.fetchedAt < TILE_FRESH_MS) {
+      return remembered.tile;
+    }
+    try {
+      const tile = await getAccessibilityTile({ z, x, y });
+      tileMemory.current.delete(key);
+      tileMemory.current.set(key, { tile, fetchedAt: Date.now() });
+      if (tileMemory.current.size > TILE_MEMORY_MAX) {
+        tileMemory.current.delete(tileMemory.current.keys().next().value);
+      }
+      return tile;
+    } catch (error) {
+      return remembered?.tile ?? null; // A stale tile beats a hole in the map
+    }
+  }, []);
+
+  // --- Accessibility points: load the tiles covering the viewport once the map settles ---
+  const onIdle = useCallback(async () => {
+    const bounds = map?.getBounds();
+    if (!bounds) return;
+    const ne = bounds.getNorthEast();
+    const sw = bounds.getSouthWest();
+    const tiles = tilesForBounds(
+      { north: ne.lat(), south: sw.lat(), east: ne.lng(), west: sw.lng() },
+      Math.round(map.getZoom()),
+    );
+    const generation = ++tileGeneration.current;
+    if (tiles.length > MAX_VIEWPORT_TILES) {
+      setPointTiles([]);
+      return;
+    }
+    const loaded = await Promise.all(tiles.map(loadTile));
+    if (generation === tileGeneration.current) {
+      setPointTiles(loaded.filter(Boolean));
+    }
+  }, [map, loadTile]);
+
+
   // --- Improvement: Fit Bounds to Route ---
   useEffect(() => {
     // Ensure map instance and route data with bounds exist
@@ -126,6 +212,7 @@ function MapComponent({ routeResponse }) {
             zoom={12}
             onLoad={onLoad}
             onUnmount={onUnmount}
+            onIdle={onIdle}
             options={{
                 // Optional controls customization
                 // streetViewControl: false,
@@ -143,8 +230,30 @@ function MapComponent({ routeResponse }) {
                 // gestureHandling: 'cooperative',
             }}
           >
-            {/* Markers, InfoWindows etc. can be added here */}
-            {/* Example: <Marker position={someLatLng} /> */}
+            {/* Accessibility points, or clusters of them when zoomed out */}
+            {pointTiles.flatMap((tile) => tile.clustered
+              ? tile.clusters.map((cluster, index) => (
+                  <Marker
+                    key={`${tile.z}/${tile.x}/${tile.y}/c${index}`}
+                    position={{ lat: cluster.lat, lng: cluster.lng }}
+                    icon={clusterIcon(cluster.count)}
+                    label={{ text: String(cluster.count), color: '#ffffff', fontSize: '11px', fontWeight: 'bold' }}
+                    title={clusterTitle(cluster)}
+                    onClick={() => {
+                      map?.panTo({ lat: cluster.lat, lng: cluster.lng });
+                      map?.setZoom(tile.z + 2);
+                    }}
+                  />
+                ))
+              : tile.points.map((point) => (
+                  <Marker
+                    key={point.id}
+                    position={{ lat: point.lat, lng: point.lng }}
+                    icon={pointIcon(point.type)}
+                    title={point.description ? `${point.type}: ${point.description}` : point.type}
+                  />
+                ))
+            )}
 
             {/* Display Directions using DirectionsRenderer */}
             {routeResponse && (
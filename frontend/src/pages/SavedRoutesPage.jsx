@@ -7,7 +7,9 @@ import SavedRouteItem from '../components/SavedRouteItem'; // Assuming this exis
 function SavedRoutesPage() {
   // const { isAuthenticated } = useAuth(); // Check if user is logged in
   const [routes, setRoutes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null); // null once the last page is loaded
   const [isLoading, setIsLoading] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   const fetchRoutes = async () => {
@@ -20,18 +22,36 @@ function SavedRoutesPage() {
     setError(null);
     try {
       console.log("Fetching saved routes...");
-      const data = await getSavedRoutes(); // Call API service
-      setRoutes(data || []);
+      const data = await getSavedRoutes(); // First page
+      setRoutes(data?.routes || []);
+      setNextCursor(data?.nextCursor || null);
       console.log("Fetched routes:", data);
     } catch (err) {
       console.error("Failed to fetch saved routes:", err);
       setError(err.message || "Could not load saved routes.");
       setRoutes([]);
+      setNextCursor(null);
     } finally {
       setIsLoading(false);
     }
   };
 
+  const fetchMoreRoutes = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    setError(null);
+    try {
+      const data = await getSavedRoutes({ cursor: nextCursor });
+      setRoutes(prev => [...prev, ...(data?.routes || [])]);
+      setNextCursor(data?.nextCursor || null);
+    } catch (err) {
+      console.error("Failed to fetch more saved routes:", err);
+      setError(err.message || "Could not load more saved routes.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Fetch routes on component mount
   useEffect(() => {
     fetchRoutes();
@@ -54,8 +74,8 @@ function SavedRoutesPage() {
      // setRoutes(prev => prev.filter(r => r._id !== routeId)); // Optimistic
      try {
          await deleteRoute(routeId);
-         // Refetch routes after successful deletion
-         fetchRoutes();
+         // Drop it locally; refetching would throw away the pages already loaded
+         setRoutes(prev => prev.filter(r => r._id !== routeId));
      } catch (err) {
           console.error("Failed to delete route:", err);
           setError(err.message || "Could not delete route.");
@@ -92,6 +112,19 @@ function SavedRoutesPage() {
           ))}
         </ul>
       )}
+
+      {!isLoading && nextCursor && (
+        <div className="mt-4 flex justify-center">
+          <button
+            type="button"
+            onClick={fetchMoreRoutes}
+            disabled={isLoadingMore}
+            className="bg-indigo-600 hover:bg-indigo-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-indigo-500 text-white font-semibold py-2 px-4 rounded-md transition duration-150 ease-in-out disabled:opacity-60 disabled:cursor-not-allowed"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more routes'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
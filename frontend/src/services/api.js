@@ -132,11 +132,16 @@ export const saveRoute = async (routeData) => {
 };
 
 /**
- * Retrieves a list of saved routes (summary) for the current user.
- * @returns {Promise<Array<object>>} - Array of saved route summary objects.
+ * Retrieves one page of saved routes (summary) for the current user, newest first.
+ * @param {object} [params] - { cursor?, limit? }; pass the previous page's nextCursor to get the next page.
+ * @returns {Promise<object>} - { routes: Array<object>, nextCursor: string|null } (null on the last page).
  */
-export const getSavedRoutes = async () => {
-  const endpoint = `${API_BASE_URL}/routes`;
+export const getSavedRoutes = async (params = {}) => {
+  const queryParams = new URLSearchParams();
+  if (params.cursor) queryParams.append('cursor', params.cursor);
+  if (params.limit) queryParams.append('limit', params.limit);
+  const query = queryParams.toString();
+  const endpoint = `${API_BASE_URL}/routes${query ? `?${query}` : ''}`;
   console.log(`Fetching saved routes from ${endpoint}`);
   try {
     const response = await fetch(endpoint, {
@@ -295,6 +300,28 @@ export const getAccessibilityPoints = async (params) => {
   }
 };
 
+/**
+ * Retrieves one web-map tile of accessibility points: individual points at high zoom, clusters
+ * with per-type counts when zoomed out. Each tile has its own URL, so the browser cache (ETag plus
+ * a short max-age) serves every tile the viewport already covered while panning.
+ * @param {object} params - Tile coordinates { z, x, y, type? } (standard z/x/y scheme).
+ * @returns {Promise<object>} - { z, x, y, bounds, clustered, points, clusters }.
+ */
+export const getAccessibilityTile = async (params) => {
+  const queryParams = new URLSearchParams();
+  if (params.type) queryParams.append('type', params.type);
+  const query = queryParams.toString();
+
+  const endpoint = `${API_BASE_URL}/accessibility-points/tiles/${params.z}/${params.x}/${params.y}${query ? `?${query}` : ''}`;
+  try {
+    const response = await fetch(endpoint, { method: 'GET' });
+    return await handleResponse(response);
+  } catch (error) {
+    console.error(`Error fetching accessibility tile from ${endpoint}:`, error);
+    throw error;
+  }
+};
+
 /**
  * Retrieves details for a single accessibility point.
  * @param {string} pointId - The ID of the accessibility point.
@@ -69,4 +69,37 @@ export function formatDate(dateInput, options = {}) {
   }
   
   
+  /**
+   * Lists the web-map tiles (standard z/x/y, Web Mercator) covering a map viewport, the same
+   * tiles the backend's tiles_covering picks. A viewport crossing the antimeridian (west > east)
+   * wraps around.
+   * @param {{north: number, south: number, east: number, west: number}} bounds - Viewport bounds.
+   * @param {number} zoom - Integer zoom level.
+   * @returns {Array<{z: number, x: number, y: number}>} - Tiles, row by row.
+   */
+  export function tilesForBounds({ north, south, east, west }, zoom) {
+    const n = 2 ** zoom;
+    const column = (lng) => Math.min(n - 1, Math.max(0, Math.floor((lng + 180) / 360 * n)));
+    const row = (lat) => {
+      const clamped = Math.max(-85.0511, Math.min(85.0511, lat)) * Math.PI / 180;
+      return Math.min(n - 1, Math.max(0, Math.floor((1 - Math.asinh(Math.tan(clamped)) / Math.PI) / 2 * n)));
+    };
+    // Tile edges are half-open, so bounds ending exactly on an edge don't pull in the next tile
+    const firstColumn = column(west);
+    const lastColumn = column(east - 1e-9);
+    const columns = [];
+    if (west <= east || lastColumn >= firstColumn) { // The second: wrapped all the way round
+      const [from, to] = west <= east ? [firstColumn, lastColumn] : [0, n - 1];
+      for (let x = from; x <= to; x++) columns.push(x);
+    } else {
+      for (let x = firstColumn; x < n; x++) columns.push(x);
+      for (let x = 0; x <= lastColumn; x++) columns.push(x);
+    }
+    const tiles = [];
+    for (let y = row(north); y <= row(south + 1e-9); y++) {
+      for (const x of columns) tiles.push({ z: zoom, x, y });
+    }
+    return tiles;
+  }
+  
   // Add other common helper functions as needed...
\ No newline at end of file